@@ -0,0 +1,211 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+from collections import defaultdict, namedtuple
+
+from config import log, scorer_log_path, scorer_audit_rate
+
+# Локальная оценка полноты ответа: grade в шкале GPT (1-10),
+# decided=False означает, что случай спорный и его нужно отдать GPT
+Score = namedtuple('Score', ['grade', 'decided', 'features'])
+
+# Очевидные случаи: короткий ответ без конкретики (не выше LOW)
+# или развернутый ответ с инструментами и цифрами (не ниже HIGH)
+LOW_THRESHOLD = 3
+HIGH_THRESHOLD = 8
+SHORT_ANSWER_WORDS = 15
+
+# Граница, по которой бот решает, задавать ли уточняющий вопрос
+GRADE_SPLIT = 5
+
+KNOWN_TOOLS = {
+    'python', 'java', 'javascript', 'typescript', 'go', 'c++', 'c#', 'php', 'kotlin', 'swift',
+    'sql', 'postgresql', 'postgres', 'mysql', 'clickhouse', 'mongodb', 'redis', 'kafka',
+    'docker', 'kubernetes', 'k8s', 'git', 'gitlab', 'github', 'linux', 'nginx', 'aws',
+    'django', 'flask', 'fastapi', 'react', 'vue', 'angular', 'spring', 'pandas', 'numpy',
+    'pytorch', 'tensorflow', 'airflow', 'spark', 'hadoop', 'tableau', 'excel', 'figma',
+    'jira', 'confluence', 'miro', 'notion', 'crm', 'erp', '1с', 'битрикс', 'bitrix',
+    'powerpoint', 'photoshop', 'api', 'rest', 'graphql', 'ci/cd', 'jenkins', 'terraform'
+}
+
+_REFUSAL = re.compile(r'\b(не знаю|не помню|нечего|не могу сказать|затрудняюсь|нет)\b', re.IGNORECASE)
+_WORD = re.compile(r"[\w+#/.-]+")
+_METRIC = re.compile(r'\d+(?:[.,]\d+)?')
+_LATIN = re.compile(r'^[A-Za-z][A-Za-z0-9+#.-]+$')
+_CAPITALIZED = re.compile(r'(?<![.!?]\s)(?<!^)\b[А-ЯЁ][а-яё]{2,}')
+
+_log_lock = threading.Lock()
+
+
+def parse_grade(text, default=GRADE_SPLIT):
+    """Извлекает оценку из ответа GPT.
+
+    Args:
+        text (str): Ответ GPT, например "8" или "Оценка: 8/10"
+        default (int): Оценка, если число не найдено
+
+    Returns:
+        int: Оценка от 1 до 10
+    """
+    numbers = re.findall(r'\d+', text or '')
+    if not numbers:
+        return default
+    return min(max(int(numbers[0]), 1), 10)
+
+
+def extract_features(text):
+    """Считает признаки полноты ответа.
+
+    Args:
+        text (str): Ответ пользователя
+
+    Returns:
+        dict: Число слов, метрик, инструментов и именованных сущностей
+    """
+    words = _WORD.findall(text)
+    lowered = [word.lower().strip('.,') for word in words]
+    tools = {
+        word for word, low in zip(words, lowered)
+        if low in KNOWN_TOOLS or _LATIN.match(word)
+    }
+    return {
+        'words': len(words),
+        'metrics': len(_METRIC.findall(text)),
+        'tools': len(tools),
+        'entities': len(_CAPITALIZED.findall(text)),
+        'refusal': len(words) < 8 and bool(_REFUSAL.search(text))
+    }
+
+
+def score_answer(text):
+    """Оценивает полноту ответа без обращения к GPT.
+
+    Args:
+        text (str): Ответ пользователя
+
+    Returns:
+        Score: Оценка, признак уверенности и признаки
+    """
+    features = extract_features(text or '')
+    words = features['words']
+
+    if words < 4 or features['refusal']:
+        return Score(1, True, features)
+
+    points = 1.0
+    points += 1 if words >= 15 else 0
+    points += 1 if words >= 40 else 0
+    points += 1 if words >= 80 else 0
+    points += 1.5 * min(features['metrics'], 2)
+    points += min(features['tools'], 3)
+    points += 0.5 * min(features['entities'], 2)
+    grade = min(max(int(round(points)), 1), 10)
+
+    decided = (
+        (grade <= LOW_THRESHOLD and words < SHORT_ANSWER_WORDS)
+        or grade >= HIGH_THRESHOLD
+    )
+    return Score(grade, decided, features)
+
+
+def needs_gpt(score):
+    """Решает, нужно ли перепроверить ответ через GPT.
+
+    Спорные ответы проверяются всегда, очевидные - с вероятностью
+    SCORER_AUDIT_RATE, чтобы копить данные для калибровки.
+
+    Args:
+        score (Score): Локальная оценка
+
+    Returns:
+        bool: True, если нужно спросить GPT
+    """
+    return not score.decided or random.random() < scorer_audit_rate
+
+
+def record_grade(text, score, gpt_grade):
+    """Дописывает пару локальной оценки и оценки GPT в журнал калибровки.
+
+    Журнал пишется, только если задан SCORER_LOG_PATH. Запись блокирующая,
+    из цикла рантайма функцию нужно вызывать через пул потоков.
+
+    Args:
+        text (str): Ответ пользователя
+        score (Score): Локальная оценка
+        gpt_grade (int): Оценка GPT
+    """
+    if not scorer_log_path:
+        return
+    record = {
+        'answer': text,
+        'local': score.grade,
+        'decided': score.decided,
+        'gpt': gpt_grade
+    }
+    try:
+        os.makedirs(os.path.dirname(scorer_log_path) or '.', exist_ok=True)
+        with _log_lock, open(scorer_log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except OSError as e:
+        log.warning(f"Не удалось записать журнал калибровки: {e}")
+
+
+def calibrate(records):
+    """Сравнивает локальные оценки с оценками GPT.
+
+    Оценки пересчитываются текущим score_answer, поэтому после правки
+    порогов и признаков журнал можно прогнать заново.
+
+    Args:
+        records (list): Записи журнала с полями 'answer' и 'gpt'
+
+    Returns:
+        dict: Доля решенных локально ответов, согласие с GPT по решению
+              "задавать ли уточняющий вопрос" и средняя оценка GPT
+              для каждой локальной оценки
+    """
+    decided = agreed = 0
+    by_local = defaultdict(list)
+    for record in records:
+        score = score_answer(record['answer'])
+        gpt_grade = record['gpt']
+        by_local[score.grade].append(gpt_grade)
+        if score.decided:
+            decided += 1
+            agreed += (score.grade > GRADE_SPLIT) == (gpt_grade > GRADE_SPLIT)
+
+    total = len(records)
+    return {
+        'total': total,
+        'coverage': decided / total if total else 0.0,
+        'agreement': agreed / decided if decided else 0.0,
+        'gpt_mean_by_local': {
+            grade: sum(values) / len(values)
+            for grade, values in sorted(by_local.items())
+        }
+    }
+
+
+def load_records(path):
+    """Читает журнал калибровки в формате JSONL.
+
+    Args:
+        path (str): Путь к журналу
+
+    Returns:
+        list: Записи журнала
+    """
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == '__main__':
+    report = calibrate(load_records(sys.argv[1] if len(sys.argv) > 1 else scorer_log_path))
+    print(f"Записей: {report['total']}")
+    print(f"Решено локально: {report['coverage']:.1%}")
+    print(f"Согласие с GPT: {report['agreement']:.1%}")
+    for grade, mean in report['gpt_mean_by_local'].items():
+        print(f"  локально {grade:>2} -> GPT в среднем {mean:.1f}")
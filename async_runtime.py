@@ -0,0 +1,188 @@
+import asyncio
+import threading
+
+from config import log, runtime_max_tasks
+
+
+class AsyncRuntime:
+    """Долгоживущий событийный цикл в фоновом потоке.
+
+    Все асинхронные обработчики бота и HTTP-клиенты выполняются в одном
+    цикле, поэтому разговоры разных пользователей идут параллельно.
+    Число одновременно выполняющихся задач ограничено: при переполнении
+    submit блокирует вызывающий поток до освобождения места. Задачи с
+    одним ключом (например, chat_id) submit_ordered выполняет строго по
+    очереди, не блокируя вызывающий поток.
+    """
+
+    def __init__(self, max_tasks):
+        self.max_tasks = max_tasks
+        self.loop = None
+        self._thread = None
+        self._slots = threading.BoundedSemaphore(max_tasks)
+        self._lock = threading.Lock()
+        self._tasks = set()
+        self._shutdown_callbacks = []
+        # Последняя задача каждого ключа для submit_ordered
+        self._ordered = {}
+        self._ordered_lock = threading.Lock()
+
+    def start(self):
+        """Запускает цикл, если он еще не запущен.
+
+        Returns:
+            asyncio.AbstractEventLoop: Цикл рантайма
+        """
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self.loop.run_forever,
+                    name='async-runtime',
+                    daemon=True
+                )
+                self._thread.start()
+        return self.loop
+
+    def in_loop(self):
+        """Проверяет, выполняется ли код внутри цикла рантайма.
+
+        Returns:
+            bool: True, если текущий поток - поток рантайма
+        """
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    @property
+    def pending(self):
+        """int: Количество выполняющихся задач."""
+        return len(self._tasks)
+
+    def submit(self, coro):
+        """Передает корутину на выполнение в цикл рантайма.
+
+        Args:
+            coro (coroutine): Корутина для выполнения
+
+        Returns:
+            concurrent.futures.Future: Результат выполнения корутины
+        """
+        loop = self.start()
+        if self.in_loop():
+            raise RuntimeError("submit() нельзя вызывать из цикла рантайма, используйте await")
+
+        self._slots.acquire()
+        future = asyncio.run_coroutine_threadsafe(self._track(coro), loop)
+        future.add_done_callback(self._release)
+        return future
+
+    def submit_ordered(self, key, factory):
+        """Выполняет корутину после всех ранее переданных с тем же ключом.
+
+        Args:
+            key: Ключ очереди, например chat_id
+            factory (function): Функция без аргументов, возвращающая awaitable
+
+        Returns:
+            concurrent.futures.Future: Результат корутины
+        """
+        with self._ordered_lock:
+            previous = self._ordered.get(key)
+            future = self.submit(self._after(previous, factory))
+            self._ordered[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def busy(self, key):
+        """Проверяет, есть ли невыполненные задачи с ключом.
+
+        Args:
+            key: Ключ очереди submit_ordered
+
+        Returns:
+            bool: True, пока последняя задача ключа не завершилась
+        """
+        with self._ordered_lock:
+            return key in self._ordered
+
+    async def _after(self, previous, factory):
+        if previous is not None:
+            # Ошибку предыдущей задачи уже записал _release
+            waiter = asyncio.wrap_future(previous)
+            await asyncio.wait([waiter])
+            if not waiter.cancelled():
+                waiter.exception()
+        return await factory()
+
+    def _forget(self, key, future):
+        with self._ordered_lock:
+            if self._ordered.get(key) is future:
+                del self._ordered[key]
+
+    def run(self, coro, timeout=None):
+        """Выполняет корутину в рантайме и ждет результат.
+
+        Args:
+            coro (coroutine): Корутина для выполнения
+            timeout (float): Максимальное время ожидания в секундах
+
+        Returns:
+            Результат корутины
+        """
+        return self.submit(coro).result(timeout)
+
+    async def _track(self, coro):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            return await coro
+        finally:
+            self._tasks.discard(task)
+
+    def _release(self, future):
+        self._slots.release()
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            log.error("Ошибка в асинхронном обработчике", exc_info=exc)
+
+    def shutdown(self, timeout=10):
+        """Дожидается текущих задач, отменяет зависшие и закрывает цикл.
+
+        Args:
+            timeout (float): Сколько секунд ждать завершения задач
+        """
+        with self._lock:
+            loop, self.loop = self.loop, None
+        if loop is None:
+            return
+
+        async def drain():
+            tasks = list(self._tasks)
+            if tasks:
+                _, stuck = await asyncio.wait(tasks, timeout=timeout)
+                for task in stuck:
+                    task.cancel()
+                await asyncio.gather(*stuck, return_exceptions=True)
+            for callback in self._shutdown_callbacks:
+                await callback()
+            await loop.shutdown_asyncgens()
+
+        try:
+            asyncio.run_coroutine_threadsafe(drain(), loop).result()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join()
+            loop.close()
+            log.info("Async runtime stopped")
+
+    def on_shutdown(self, callback):
+        """Регистрирует корутинную функцию, вызываемую при остановке.
+
+        Args:
+            callback (function): Асинхронная функция без аргументов
+        """
+        self._shutdown_callbacks.append(callback)
+
+
+runtime = AsyncRuntime(runtime_max_tasks)
@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import resource
+import statistics
+import time
+import tracemalloc
+
+from resume_model import ResumeModel, Role
+from resume_render import LAYOUTS, ResumeRenderer, load_templates, render_resume
+
+
+def sample_resume(number):
+    """Собирает типичное резюме для замеров.
+
+    Args:
+        number (int): Номер резюме, чтобы документы отличались
+
+    Returns:
+        ResumeModel: Резюме с пятью местами работы и тремя проектами
+    """
+    return ResumeModel(
+        name=f"Иван Петров {number}",
+        contacts=(('email', f'ivan{number}@mail.ru'), ('phone', '+7 916 123-45-67')),
+        summary="Backend-разработчик, люблю асинхронные сервисы и понятный код. " * 3,
+        skills=tuple(f"Навык {i}" for i in range(20)),
+        roles=tuple(
+            Role(f"Компания {i}", f"{2015 + i} — {2016 + i}", "Разрабатывал API и очереди задач. " * 5)
+            for i in range(5)
+        ),
+        education=("МГУ, факультет ВМК, 2015",),
+        projects=tuple("Описание проекта.\n\nЧем занимался: " + "проектировал и писал код. " * 10 for _ in range(3)),
+        achievements="Ускорил сборку отчетов в два раза"
+    )
+
+
+def bench_layout(layout, count):
+    """Замеряет сборку резюме подряд в текущем процессе.
+
+    Args:
+        layout (str): Название макета
+        count (int): Сколько резюме собрать
+
+    Returns:
+        dict: Медиана и 95-й перцентиль времени на резюме (мс), пик памяти Python (КБ)
+    """
+    models = [sample_resume(number) for number in range(count)]
+    timings = []
+    for model in models:
+        started = time.perf_counter()
+        render_resume(model, layout)
+        timings.append((time.perf_counter() - started) * 1000)
+    # Память меряется отдельным проходом: tracemalloc сильно замедляет сборку
+    tracemalloc.start()
+    for model in models[:10]:
+        render_resume(model, layout)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    return {
+        'p50_ms': statistics.median(timings),
+        'p95_ms': timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0],
+        'peak_kb': peak / 1024
+    }
+
+
+async def bench_pool(layout, count, workers):
+    """Замеряет пропускную способность пула процессов.
+
+    Args:
+        layout (str): Название макета
+        count (int): Сколько резюме собрать
+        workers (int): Число процессов пула
+
+    Returns:
+        float: Собранных резюме в секунду
+    """
+    renderer = ResumeRenderer(workers)
+    try:
+        # Первая сборка запускает процессы и загружает шаблоны, ее не считаем
+        await renderer.render(sample_resume(0), layout)
+        started = time.perf_counter()
+        await asyncio.gather(*(renderer.render(sample_resume(number), layout) for number in range(count)))
+        return count / (time.perf_counter() - started)
+    finally:
+        renderer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер сборки DOCX-резюме")
+    parser.add_argument('--count', type=int, default=200, help="Резюме на каждый замер")
+    parser.add_argument('--workers', type=int, default=2, help="Процессов в пуле")
+    parser.add_argument('--layout', choices=sorted(LAYOUTS), action='append', help="Макет; по умолчанию все")
+    args = parser.parse_args()
+
+    load_templates()
+    for layout in args.layout or sorted(LAYOUTS):
+        result = bench_layout(layout, args.count)
+        throughput = asyncio.run(bench_pool(layout, args.count, args.workers))
+        print(
+            f"{layout}: p50 {result['p50_ms']:.1f} мс, p95 {result['p95_ms']:.1f} мс на резюме, "
+            f"пик памяти Python {result['peak_kb']:.0f} КБ, "
+            f"пул из {args.workers}: {throughput:.0f} резюме/с"
+        )
+
+    # ru_maxrss в Linux в килобайтах
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(f"Пиковый RSS: процесс {own / 1024:.1f} МБ, процесс пула {children / 1024:.1f} МБ")
+
+
+if __name__ == '__main__':
+    main()
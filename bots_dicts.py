@@ -1,49 +0,0 @@
-# Словари для хранения состояний пользователей
-user_states = {}
-resume = {}
-vacancy = {}
-name = {}
-res_skills = {}
-res_exp = {}
-vac_skill_req = {}
-vac_resp = {}
-intersect = {}
-answers = {}
-questions = {}
-flag = {}
-clicked_flag = {}
-current_question_index = {}
-last_responses = {}
-
-# Словари для resume_bot
-summary = {}
-answers_X = {}
-answers_Y = {}
-answers_Z = {}
-dialogue = {}
-previous_question = {}
-projects = {}
-follow_up = {}
-role = {}
-proj_desc = {}
-context = {}
-index = {}
-role_length = {}
-previous_message_id = {}
-question_counter = {}
-counter = {}
-check = {}
-previous_message_content = {}
-previous_message_markup = {}
-prompt_ask = {}
-prompt_compl = {}
-prompt_compile = {}
-prompt_resume_proj = {}
-prompt_tools = {}
-prompt_results = {}
-prompt_Z_add = {}
-prompt_roles = {}
-prompt_proj = {}
-prompt_XYZ = {}
-skills = {}
-achievements = {}
\ No newline at end of file
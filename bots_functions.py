@@ -1,26 +1,41 @@
 from imports import (
     asyncio,
-    json,
-    os,
-    fitz,
     requests,
     types
 )
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from io import BytesIO
-from config import bot, api_key, log
-from bots_dicts import *
-
-# Словарь для хранения текущего режима пользователя
-current_mode = {}
-
-# Словари для хранения данных пользователя в режиме сопроводительного письма
-resume = {}
-profession = {}
-company = {}
-description = {}
+from async_runtime import runtime
+from config import (
+    bot,
+    log,
+    gpt_streaming,
+    speculative_follow_up,
+    end_user_concurrency,
+    end_global_concurrency
+)
+from fsm import fsm
+from gpt_client import StreamInterrupted, gpt_client
+from gpt_routes import trim_for
+from outbox import delivered, send_editable
+from resume_ingest import UnsupportedDocument, ingest_document, ingest_executor
+from resume_model import ResumeModel, analyze_resume
+from resume_render import renderer
+from jobs import jobs
+from sessions import sessions
+from answer_scorer import GRADE_SPLIT, score_answer, needs_gpt, parse_grade, record_grade
+from telegram_stream import stream_to_chat
+
+COMPLETENESS_QUESTION = "Оцени числом от 1 до 10 насколько полно я ответил на первоначальный вопрос."
+FOLLOW_UP_QUESTION = (
+    "Придумай дополнительный вопрос, который бы лучше раскрывал "
+    "мой ответ на первоначальный вопрос."
+)
+PROJECT_QUESTION = "Расскажи о каком-нибудь своем проекте. Опиши его и расскажи, чем ты в нем занимался."
+
+# Поля структуры резюме, которые нужны промптам
+COVER_LETTER_FIELDS = (
+    'summary', 'roles', 'experience', 'projects', 'skills', 'education', 'languages', 'achievements', 'extra'
+)
+INTERVIEW_FIELDS = ('roles', 'experience', 'projects', 'skills', 'achievements', 'extra')
 
 def return_to_main_menu(message):
     """Возвращает пользователя в главное меню.
@@ -30,9 +45,8 @@ def return_to_main_menu(message):
     """
     log.info(f"User {message.from_user.id} returned to main menu")
     
-    # Очищаем текущий режим
-    if message.from_user.id in current_mode:
-        del current_mode[message.from_user.id]
+    # Данные режима больше не нужны
+    sessions.drop(message.chat.id)
         
     welcome_text = (
         "👋 Привет! Я главный бот YourOffer.\n\n"
@@ -93,6 +107,12 @@ def add_main_menu_button(message):
 def async_handler(f):
     """Декоратор для асинхронных обработчиков сообщений.
 
+    Корутина обработчика передается в общий долгоживущий цикл рантайма,
+    поток шарда диспетчера ее не ждет. Обработчики одного чата идут в
+    рантайме по очереди, а следующие обновления чата, пока его
+    обработчик не завершился, откладываются in_chat_order. Ошибки
+    записывает в лог рантайм, сессия сохраняется после обработчика.
+
     Args:
         f (function): Асинхронная функция-обработчик
 
@@ -100,85 +120,78 @@ def async_handler(f):
         function: Обертка для асинхронной функции
     """
 
-    def wrapper(*args):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(f(*args))
+    def wrapper(message, *args):
+        chat_id = message.chat.id
+        return runtime.submit_ordered(chat_id, lambda: _with_session(chat_id, f(message, *args)))
 
     return wrapper
 
 
-def process_pdf(file_path: str) -> str:
-    """Извлекает текст из PDF файла.
+async def _with_session(chat_id, coro):
+    session = sessions.get(chat_id)
+    try:
+        return await coro
+    finally:
+        # Обработчик обновления уже сохранил сессию, сохраняем изменения корутины
+        if sessions.peek(chat_id) is session:
+            await asyncio.get_running_loop().run_in_executor(None, sessions.save, session)
+
 
-    Args:
-        file_path (str): Путь к PDF файлу
+def in_chat_order(chat_id, handler, *args):
+    """Обрабатывает обновление после асинхронных обработчиков того же чата.
 
-    Returns:
-        str: Извлеченный текст из PDF
+    Если у чата нет незавершенного асинхронного обработчика, handler
+    выполняется сразу в текущем потоке. Иначе обновление встает в очередь
+    чата в рантайме и выполняется в пуле потоков после него, чтобы
+    увидеть заданный им следующий шаг.
+
+    Args:
+        chat_id (int): ID чата
+        handler (function): Синхронный обработчик обновления
+        *args: Аргументы обработчика
     """
-    doc = fitz.open(file_path)
-    text = ""
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        text += page.get_text()
-    return text
+    if not runtime.busy(chat_id):
+        handler(*args)
+        return
+    runtime.submit_ordered(chat_id, lambda: asyncio.get_running_loop().run_in_executor(None, handler, *args))
 
 
-async def send_prompt_to_gpt(prompt):
+async def send_prompt_to_gpt(prompt, call_type='default'):
     """Отправляет запрос к GPT API и получает ответ.
 
+    Повторные запросы с тем же промптом и параметрами обслуживаются из кэша.
+
     Args:
         prompt (str): Текст запроса к GPT
+        call_type (str): Тип вызова, определяет время жизни ответа в кэше
 
     Returns:
         str: Ответ от GPT или None в случае ошибки
     """
-    endpoint = 'https://api.openai.com/v1/chat/completions'
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {api_key}'
-    }
-
-    data = {
-        'model': 'gpt-4o-mini',
-        'messages': [{'role': 'user', 'content': prompt}],
-        'max_tokens': 3000,
-        'top_p': 1.0,
-        'temperature': 0.6
-    }
-
-    response = requests.post(endpoint, headers=headers, json=data)
-
-    if response.status_code == 200:
-        response_data = json.loads(response.text)
-        return response_data['choices'][0]['message']['content']
-    else:
-        print("Error:", response.text)
-        return None
+    return await gpt_client.complete(prompt, call_type)
 
 
-def cover_letter_start(message):
+def cover_letter_start(message, intro="Привет! Я помогу тебе написать сопроводительное письмо.\n"):
     """Начинает процесс создания сопроводительного письма.
 
     Args:
         message (types.Message): Объект сообщения от пользователя
+        intro (str): Начало приветственного сообщения
     """
     log.info(f"Starting cover letter bot for user {message.from_user.id}")
     
-    # Сохраняем текущий режим
-    current_mode[message.from_user.id] = "cover_letter"
+    # Начинаем режим с чистой сессии
+    sessions.get(message.chat.id).reset("cover_letter")
     
     # Добавляем только кнопку главного меню при старте
     markup = create_main_menu_button()
     bot.send_message(
         message.chat.id,
-        "Привет! Я помогу тебе написать сопроводительное письмо.\n"
-        "Отправь, пожалуйста, свое резюме в текстовом формате, или в форматах pdf или doc",
+        intro +
+        "Отправь, пожалуйста, свое резюме в текстовом формате, или в форматах pdf или docx",
         reply_markup=markup
     )
-    bot.register_next_step_handler(message, ask_resume_async)
+    fsm.set(message.chat.id, 'cover_resume')
 
 
 async def ask_resume(message):
@@ -187,31 +200,21 @@ async def ask_resume(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
+    session = sessions.get(message.chat.id)
     if message.content_type == 'text':
-        resume[message.chat.id] = message.text
-    elif message.content_type == 'document' and (
-            message.document.file_name.lower().endswith('.pdf') or
-            message.document.file_name.lower().endswith('.doc')
-    ):
+        session.resume = analyze_resume(message.text)
+    else:
         try:
-            file_info = bot.get_file(message.document.file_id)
-            downloaded_file = bot.download_file(file_info.file_path)
-
-            local_file_path = os.path.join(
-                "Documents",
-                file_info.file_path.split('/')[-1]
+            # Скачивание и разбор блокирующие, выполняем их вне цикла рантайма
+            text = await asyncio.get_running_loop().run_in_executor(ingest_executor, ingest_document, message.document)
+            session.resume = analyze_resume(text)
+        except UnsupportedDocument as e:
+            bot.send_message(
+                message.chat.id,
+                f"{e}. Пожалуйста, отправьте резюме в текстовом формате или в форматах PDF/DOCX"
             )
-            os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
-
-            with open(local_file_path, 'wb') as new_file:
-                new_file.write(downloaded_file)
-
-            resume[message.chat.id] = process_pdf(local_file_path)
-            os.remove(local_file_path)
+            fsm.set(message.chat.id, 'cover_resume')
+            return
         except Exception as e:
             log.error(f"Error processing document: {e}")
             bot.send_message(
@@ -220,19 +223,12 @@ async def ask_resume(message):
             )
             return_to_main_menu(message)
             return
-    else:
-        bot.send_message(
-            message.chat.id,
-            "Пожалуйста, отправьте резюме в текстовом формате или в форматах PDF/DOC"
-        )
-        bot.register_next_step_handler(message, ask_resume_async)
-        return
 
     bot.send_message(
         message.chat.id,
         "Введите название искомой профессии:"
     )
-    bot.register_next_step_handler(message, ask_profession)
+    fsm.set(message.chat.id, 'cover_profession')
 
 
 ask_resume_async = async_handler(ask_resume)
@@ -244,24 +240,12 @@ def ask_profession(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
-    if message.content_type != 'text':
-        bot.send_message(
-            message.chat.id,
-            "Пожалуйста, введите название профессии текстом."
-        )
-        bot.register_next_step_handler(message, ask_profession)
-        return
-
-    profession[message.chat.id] = message.text
+    sessions.get(message.chat.id).profession = message.text
     bot.send_message(
         message.chat.id,
         "Введите название компании, в которую хотите устроиться:"
     )
-    bot.register_next_step_handler(message, ask_company)
+    fsm.set(message.chat.id, 'cover_company')
 
 
 def ask_company(message):
@@ -270,24 +254,12 @@ def ask_company(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
-    if message.content_type != 'text':
-        bot.send_message(
-            message.chat.id,
-            "Пожалуйста, введите название компании текстом."
-        )
-        bot.register_next_step_handler(message, ask_company)
-        return
-
-    company[message.chat.id] = message.text
+    sessions.get(message.chat.id).company = message.text
     bot.send_message(
         message.chat.id,
         "Расскажите о себе в 2-3 предложениях:"
     )
-    bot.register_next_step_handler(message, ask_description)
+    fsm.set(message.chat.id, 'cover_description')
 
 
 def ask_description(message):
@@ -296,116 +268,97 @@ def ask_description(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
-    if message.content_type != 'text':
-        bot.send_message(
-            message.chat.id,
-            "Пожалуйста, введите описание текстом."
-        )
-        bot.register_next_step_handler(message, ask_description)
-        return
-
-    description[message.chat.id] = message.text
+    session = sessions.get(message.chat.id)
+    session.description = message.text
     
     # Генерируем сопроводительное письмо
-    prompt = f"""Напиши сопроводительное письмо для соискателя на должность {profession[message.chat.id]} в компанию {company[message.chat.id]}.
+    prompt = f"""Напиши сопроводительное письмо для соискателя на должность {session.profession} в компанию {session.company}.
     
     Резюме соискателя:
-    {resume[message.chat.id]}
+    {trim_for('cover_letter', session.resume.render(*COVER_LETTER_FIELDS))}
     
     Описание соискателя:
-    {description[message.chat.id]}
+    {session.description}
     
     Письмо должно быть профессиональным, но не слишком формальным. Включи описание пользователя из последнего запроса.
     """
     
-    cover_letter = send_prompt_to_gpt_sync(prompt)
-    
-    # Отправляем сопроводительное письмо
-    bot.send_message(
-        message.chat.id,
-        f"Вот ваше сопроводительное письмо:\n\n{cover_letter}"
-    )
-    
-    # Добавляем кнопки рестарта и главного меню
-    markup = create_restart_menu()
-    bot.send_message(
-        message.chat.id,
-        "Выберите действие:",
-        reply_markup=markup
-    )
+    jobs.enqueue('cover_letter', message.chat.id, {
+        'prompt': prompt,
+        'call_type': 'cover_letter',
+        'header': "Вот ваше сопроводительное письмо:\n\n",
+        'menu_text': "Выберите действие:"
+    })
 
 
-def restart_cover_letter(message):
-    """Перезапускает режим создания сопроводительного письма."""
-    try:
-        log.info(f"Пользователь {message.from_user.id} начал перезапуск режима сопроводительного письма")
-        
-        # Очищаем все данные пользователя
-        log.info(f"Очистка данных пользователя {message.from_user.id} в режиме сопроводительного письма")
-        if message.chat.id in resume:
-            del resume[message.chat.id]
-        if message.chat.id in profession:
-            del profession[message.chat.id]
-        if message.chat.id in company:
-            del company[message.chat.id]
-        if message.chat.id in description:
-            del description[message.chat.id]
-        
-        # Перезапускаем режим с сохранением текущего режима
-        current_mode[message.from_user.id] = "cover_letter"
-        log.info(f"Установлен режим 'cover_letter' для пользователя {message.from_user.id}")
-        
-        # Отправляем приветственное сообщение с кнопкой главного меню
-        markup = create_main_menu_button()
-        log.info(f"Отправка приветственного сообщения пользователю {message.from_user.id}")
+async def send_long_reply(chat_id, prompt, call_type, header, menu_text):
+    """Отправляет пользователю длинный ответ GPT и меню рестарта.
+
+    При включенном GPT_STREAMING ответ показывается по мере генерации
+    в одном сообщении, которое редактируется на лету. Если поток оборвался,
+    после показанной части пользователь получает сообщение об ошибке.
+    При повторе фоновой задачи отправленный ответ и меню не дублируются.
+
+    Args:
+        chat_id (int): ID чата пользователя
+        prompt (str): Текст запроса к GPT
+        call_type (str): Тип вызова
+        header (str): Текст перед ответом
+        menu_text (str): Текст сообщения с кнопками рестарта и главного меню
+    """
+    async def reply():
+        if gpt_streaming:
+            try:
+                result = await stream_to_chat(chat_id, prompt, call_type, header)
+            except StreamInterrupted:
+                result = ''
+                bot.send_message(chat_id, gpt_error_text(
+                    "Ответ прервался из-за ошибки, текст выше неполный. Пожалуйста, попробуйте еще раз."
+                ))
+        else:
+            result = await send_prompt_to_gpt(prompt, call_type)
+            if result is not None:
+                bot.send_message(chat_id, header + result)
+
+        if result is None:
+            bot.send_message(chat_id, gpt_error_text("Извините, произошла ошибка при генерации ответа."))
+
+    async def menu():
+        # Добавляем кнопки рестарта и главного меню
+        markup = create_restart_menu()
         bot.send_message(
-            message.chat.id,
-            "Давайте начнем заново!\n\n"
-            "Отправь, пожалуйста, свое резюме в текстовом формате, или в форматах pdf или doc",
+            chat_id,
+            menu_text,
             reply_markup=markup
         )
-        bot.register_next_step_handler(message, ask_resume_async)
-        log.info(f"Установлен обработчик следующего шага для пользователя {message.from_user.id}")
-        
-    except Exception as e:
-        log.error(f"Ошибка при перезапуске режима сопроводительного письма для пользователя {message.from_user.id}: {str(e)}")
-        # В случае ошибки возвращаем в главное меню
-        return_to_main_menu(message)
+
+    # При повторе задачи уже показанный ответ не отправляется второй раз
+    await jobs.once('reply', reply)
+    await jobs.once('menu', menu)
 
 
 # Функции для resume_bot
-def resume_bot_start(message):
+def resume_bot_start(message, intro="Привет! Я помогу тебе составить резюме. Давай для начала познакомимся. "):
     """Начинает процесс создания резюме.
 
     Args:
         message (types.Message): Объект сообщения от пользователя
+        intro (str): Начало приветственного сообщения
     """
     log.info(f"Starting resume bot for user {message.from_user.id}")
 
-    # Сохраняем текущий режим
-    current_mode[message.from_user.id] = "resume"
+    # Начинаем режим с чистой сессии
+    sessions.get(message.chat.id).reset("resume")
     
     # Добавляем только кнопку главного меню при старте
     markup = create_main_menu_button()
     bot.send_message(
         message.chat.id,
-        "Привет! Я помогу тебе составить резюме. Давай для начала познакомимся. "
+        intro +
         "Напиши, пожалуйста, свое ФИО.",
         reply_markup=markup
     )
-    
-    answers_X[message.chat.id] = ''
-    answers_Y[message.chat.id] = ''
-    answers_Z[message.chat.id] = ''
-    dialogue[message.chat.id] = ''
-    projects[message.chat.id] = []
-    context[message.chat.id] = []
-    question_counter[message.chat.id] = 1
-    bot.register_next_step_handler(message, user_name)
+    fsm.set(message.chat.id, 'resume_name')
 
 
 def user_name(message):
@@ -414,25 +367,12 @@ def user_name(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
-    if message.content_type != 'text':
-        bot.send_message(
-            message.chat.id,
-            "Пожалуйста, отправь свое ФИО текстом."
-        )
-        bot.register_next_step_handler(message, user_name)
-        return
-    else:
-        name[message.chat.id] = message.text
-        bot.send_message(
-            message.chat.id,
-            "Расскажи о себе в двух-трех предложениях."
-        )
-        bot.register_next_step_handler(message, user_summary_async)
-        return
+    sessions.get(message.chat.id).name = message.text
+    bot.send_message(
+        message.chat.id,
+        "Расскажи о себе в двух-трех предложениях."
+    )
+    fsm.set(message.chat.id, 'resume_summary')
 
 
 async def user_summary(message):
@@ -441,118 +381,65 @@ async def user_summary(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
-    if message.content_type not in ('text', 'voice'):
-        bot.send_message(
-            message.chat.id,
-            "Пожалуйста, отправь либо текст, либо голосовое сообщение."
-        )
-        bot.register_next_step_handler(message, user_summary_async)
-        return
-    else:
-        summary[message.chat.id] = message.text
-        bot.send_message(
-            message.chat.id,
-            "Расскажи о каком-нибудь своем проекте. Опиши его и расскажи, "
-            "чем ты в нем занимался."
-        )
-        dialogue[message.chat.id] = (
-            "Вопрос №1: Расскажи о каком-нибудь своем проекте. Опиши его и "
-            "расскажи, чем ты в нем занимался."
-        )
-        answers_X[message.chat.id] = (
-            "Вопрос №1: Расскажи о каком-нибудь своем проекте. Опиши его и "
-            "расскажи, чем ты в нем занимался."
-        )
-        bot.register_next_step_handler(message, ask_questions_X_async)
-        return
+    sessions.get(message.chat.id).summary = message.text
+    start_project(message.chat.id)
 
 
 user_summary_async = async_handler(user_summary)
 
 
+def start_project(chat_id):
+    """Задает первый вопрос о новом проекте.
+
+    Args:
+        chat_id (int): ID чата пользователя
+    """
+    session = sessions.get(chat_id)
+    bot.send_message(chat_id, PROJECT_QUESTION)
+    for transcript in (session.dialogue, session.answers_X, session.answers_Y, session.answers_Z):
+        transcript.clear()
+    session.dialogue.ask(PROJECT_QUESTION, 1)
+    session.answers_X.ask(PROJECT_QUESTION, 1)
+    fsm.set(chat_id, 'resume_project')
+
+
 async def ask_questions_X(message):
     """Задает вопросы о проектах пользователя и обрабатывает ответы.
 
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
+    session = sessions.get(message.chat.id)
+    text = message.text
+    session.dialogue.answer(text)
+    session.answers_X.answer(text)
+
+    grade, question = await grade_and_follow_up(
+        text,
+        session.answers_X.render(),
+        message.chat.id
+    )
+
+    if question:
+        session.question_counter += 1
 
-    if message.content_type not in ('text', 'voice'):
         bot.send_message(
             message.chat.id,
-            "Пожалуйста, отправь либо текст, либо голосовое сообщение."
+            question
         )
-        bot.register_next_step_handler(message, ask_questions_X_async)
-        return
-    else:
-        text = message.text
-        dialogue[message.chat.id] += f"\nОтвет: {text}\n\n"
-        answers_X[message.chat.id] += f"\nОтвет: {text}\n\n"
-
-        grade = await completeness(
-            "Оцени числом от 1 до 10 насколько полно я ответил на первоначальный вопрос.",
-            answers_X[message.chat.id],
-            message.chat.id
-        )
-        try:
-            # Извлекаем число из ответа GPT
-            import re
-            numbers = re.findall(r'\d+', grade)
-            if numbers:
-                grade = int(numbers[0])
-            else:
-                grade = 5  # Значение по умолчанию, если число не найдено
-        except (ValueError, IndexError):
-            grade = 5  # Значение по умолчанию при любой ошибке
-
-        if grade > 5:
-            follow_up[message.chat.id] = await ask_follow_up(
-                "Придумай дополнительный вопрос, который бы лучше раскрывал "
-                "мой ответ на первоначальный вопрос.",
-                answers_X[message.chat.id],
-                '',
-                message.chat.id
-            )
-            question_counter[message.chat.id] += 1
-
-            sent_message = bot.send_message(
-                message.chat.id,
-                follow_up[message.chat.id]
-            )
-            dialogue[message.chat.id] += (
-                f"Вопрос №{question_counter[message.chat.id]}: "
-                f"{sent_message.text}"
-            )
-            answers_X[message.chat.id] += (
-                f"Вопрос №{question_counter[message.chat.id]}: "
-                f"{sent_message.text}"
-            )
+        session.dialogue.ask(question, session.question_counter)
+        session.answers_X.ask(question, session.question_counter)
 
-            bot.register_next_step_handler(message, ask_questions_X_async)
-        else:
-            question_counter[message.chat.id] += 1
-            sent_message = bot.send_message(
-                message.chat.id,
-                "Какие инструменты ты использовал при реализации этого проекта?"
-            )
+        fsm.set(message.chat.id, 'resume_project')
+    else:
+        session.question_counter += 1
+        next_question = "Какие инструменты ты использовал при реализации этого проекта?"
+        bot.send_message(message.chat.id, next_question)
 
-            dialogue[message.chat.id] += (
-                f"Вопрос №{question_counter[message.chat.id]}: "
-                f"{sent_message.text}"
-            )
-            answers_Y[message.chat.id] += (
-                f"Вопрос №{question_counter[message.chat.id]}: "
-                f"{sent_message.text}"
-            )
+        session.dialogue.ask(next_question, session.question_counter)
+        session.answers_Y.ask(next_question, session.question_counter)
 
-            bot.register_next_step_handler(message, ask_questions_Y_async)
+        fsm.set(message.chat.id, 'resume_tools')
 
 
 ask_questions_X_async = async_handler(ask_questions_X)
@@ -564,78 +451,37 @@ async def ask_questions_Y(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
+    session = sessions.get(message.chat.id)
+    text = message.text
+    session.dialogue.answer(text)
+    session.answers_Y.answer(text)
+
+    grade, question = await grade_and_follow_up(
+        text,
+        session.answers_Y.render(),
+        message.chat.id
+    )
+
+    if question:
+        session.question_counter += 1
 
-    if message.content_type not in ('text', 'voice'):
         bot.send_message(
             message.chat.id,
-            "Пожалуйста, отправь либо текст, либо голосовое сообщение"
-        )
-        bot.register_next_step_handler(message, ask_questions_Y_async)
-    else:
-        text = message.text
-        dialogue[message.chat.id] += f"\nОтвет: {text}\n\n"
-        answers_Y[message.chat.id] += f"\nОтвет: {text}\n\n"
-
-        grade = await completeness(
-            "Оцени числом от 1 до 10 насколько полно я ответил на первоначальный вопрос.",
-            answers_Y[message.chat.id],
-            message.chat.id
+            question
         )
-        try:
-            # Извлекаем число из ответа GPT
-            import re
-            numbers = re.findall(r'\d+', grade)
-            if numbers:
-                grade = int(numbers[0])
-            else:
-                grade = 5  # Значение по умолчанию, если число не найдено
-        except (ValueError, IndexError):
-            grade = 5  # Значение по умолчанию при любой ошибке
-
-        if grade > 5:
-            follow_up[message.chat.id] = await ask_follow_up(
-                "Придумай дополнительный вопрос, который бы лучше раскрывал "
-                "мой ответ на первоначальный вопрос.",
-                answers_Y[message.chat.id],
-                '',
-                message.chat.id
-            )
-            question_counter[message.chat.id] += 1
+        session.dialogue.ask(question, session.question_counter)
+        session.answers_Y.ask(question, session.question_counter)
 
-            sent_message = bot.send_message(
-                message.chat.id,
-                follow_up[message.chat.id]
-            )
-            dialogue[message.chat.id] += (
-                f"Вопрос №{question_counter[message.chat.id]}: "
-                f"{sent_message.text}"
-            )
-            answers_Y[message.chat.id] += (
-                f"Вопрос №{question_counter[message.chat.id]}: "
-                f"{sent_message.text}"
-            )
-
-            bot.register_next_step_handler(message, ask_questions_Y_async)
-        else:
-            question_counter[message.chat.id] += 1
-            sent_message = bot.send_message(
-                message.chat.id,
-                "К чему привел этот проект? Можно ли как-то измерить степень его успешности?"
-            )
+        fsm.set(message.chat.id, 'resume_tools')
+    else:
+        session.question_counter += 1
+        next_question = "К чему привел этот проект? Можно ли как-то измерить степень его успешности?"
+        bot.send_message(message.chat.id, next_question)
 
-            dialogue[message.chat.id] += (
-                f"Вопрос №{question_counter[message.chat.id]}: "
-                f"{sent_message.text}"
-            )
-            answers_Y[message.chat.id] += (
-                f"Вопрос №{question_counter[message.chat.id]}: "
-                f"{sent_message.text}"
-            )
+        session.dialogue.ask(next_question, session.question_counter)
+        session.answers_Z.ask(next_question, session.question_counter)
 
-            bot.register_next_step_handler(message, ask_questions_Z_async)
+        fsm.set(message.chat.id, 'resume_results')
 
 
 ask_questions_Y_async = async_handler(ask_questions_Y)
@@ -647,84 +493,50 @@ async def ask_questions_Z(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
+    session = sessions.get(message.chat.id)
+    text = message.text
+    session.dialogue.answer(text)
+    session.answers_Z.answer(text)
+
+    grade, question = await grade_and_follow_up(
+        text,
+        session.answers_Z.render(),
+        message.chat.id
+    )
+
+    if question:
+        session.question_counter += 1
 
-    if message.content_type not in ('text', 'voice'):
         bot.send_message(
             message.chat.id,
-            "Пожалуйста, отправь либо текст, либо голосовое сообщение"
+            question
         )
-        bot.register_next_step_handler(message, ask_questions_Z_async)
-    else:
-        text = message.text
-        dialogue[message.chat.id] += f"\nОтвет: {text}\n\n"
-        answers_Z[message.chat.id] += f"\nОтвет: {text}\n\n"
-
-        grade = await completeness(
-            "Оцени числом от 1 до 10 насколько полно я ответил на первоначальный вопрос.",
-            answers_Y[message.chat.id],
-            message.chat.id
-        )
-        try:
-            # Извлекаем число из ответа GPT
-            import re
-            numbers = re.findall(r'\d+', grade)
-            if numbers:
-                grade = int(numbers[0])
-            else:
-                grade = 5  # Значение по умолчанию, если число не найдено
-        except (ValueError, IndexError):
-            grade = 5  # Значение по умолчанию при любой ошибке
-
-        if grade > 5:
-            follow_up[message.chat.id] = await ask_follow_up(
-                "Придумай дополнительный вопрос, который бы лучше раскрывал "
-                "мой ответ на первоначальный вопрос.",
-                answers_Z[message.chat.id],
-                '',
-                message.chat.id
-            )
-            question_counter[message.chat.id] += 1
-
-            sent_message = bot.send_message(
-                message.chat.id,
-                follow_up[message.chat.id]
-            )
-            dialogue[message.chat.id] += (
-                f"Вопрос №{question_counter[message.chat.id]}: "
-                f"{sent_message.text}"
-            )
-            answers_Z[message.chat.id] += (
-                f"Вопрос №{question_counter[message.chat.id]}: "
-                f"{sent_message.text}"
-            )
+        session.dialogue.ask(question, session.question_counter)
+        session.answers_Z.ask(question, session.question_counter)
 
-            bot.register_next_step_handler(message, ask_questions_Z_async)
-        else:
-            markup = types.InlineKeyboardMarkup()
-            markup.add(
-                types.InlineKeyboardButton(
-                    'Да',
-                    callback_data=f'да\n{message.chat.id}'
-                )
+        fsm.set(message.chat.id, 'resume_results')
+    else:
+        markup = types.InlineKeyboardMarkup()
+        markup.add(
+            types.InlineKeyboardButton(
+                'Да',
+                callback_data=f'да\n{message.chat.id}'
             )
-            markup.add(
-                types.InlineKeyboardButton(
-                    'Нет',
-                    callback_data=f'нет\n{message.chat.id}'
-                )
+        )
+        markup.add(
+            types.InlineKeyboardButton(
+                'Нет',
+                callback_data=f'нет\n{message.chat.id}'
             )
+        )
 
-            projects[message.chat.id].append(dialogue[message.chat.id])
-            sent_message = bot.send_message(
-                message.chat.id,
-                "Отлично! Спасибо за твои ответы. Хочешь рассказать о каком-нибудь "
-                "еще из своих проектов?",
-                reply_markup=markup
-            )
-            previous_message_id[message.chat.id] = sent_message.message_id
+        session.projects.append(session.dialogue.render())
+        bot.send_message(
+            message.chat.id,
+            "Отлично! Спасибо за твои ответы. Хочешь рассказать о каком-нибудь "
+            "еще из своих проектов?",
+            reply_markup=markup
+        )
 
 
 ask_questions_Z_async = async_handler(ask_questions_Z)
@@ -736,24 +548,12 @@ async def user_achievements(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
-    if message.content_type not in ('text', 'voice'):
-        bot.send_message(
-            message.chat.id,
-            "Пожалуйста, отправь либо текст, либо голосовое сообщение"
-        )
-        bot.register_next_step_handler(message, user_achievements_async)
-    else:
-        achievements[message.chat.id] = message.text
-        bot.send_message(
-            message.chat.id,
-            "Какими навыками ты обладаешь?"
-        )
-        bot.register_next_step_handler(message, user_skills_async)
-    return
+    sessions.get(message.chat.id).achievements = message.text
+    bot.send_message(
+        message.chat.id,
+        "Какими навыками ты обладаешь?"
+    )
+    fsm.set(message.chat.id, 'resume_skills')
 
 
 user_achievements_async = async_handler(user_achievements)
@@ -765,23 +565,15 @@ async def user_skills(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
-    if message.content_type not in ('text', 'voice'):
-        bot.send_message(
-            message.chat.id,
-            "Пожалуйста, отправь либо текст, либо голосовое сообщение"
-        )
-        bot.register_next_step_handler(message, user_skills_async)
-    else:
-        skills[message.chat.id] = message.text
-        await end(message.chat.id)
-        return
+    sessions.get(message.chat.id).skills = message.text
+    end(message.chat.id)
 
 user_skills_async = async_handler(user_skills)
 
+# Глобальное ограничение параллельной сборки проектов, создается в цикле рантайма
+_project_slots = None
+
+
 def create_restart_menu():
     """Создает меню с кнопками рестарта и главного меню.
 
@@ -808,35 +600,55 @@ def add_restart_menu(message):
         reply_markup=create_restart_menu()
     )
 
-async def end(user_id):
-    """Завершает процесс создания резюме и отправляет результат пользователю."""
-    try:
-        bot.send_message(user_id, 'Создаю резюме...')
-        _proj = ''
-        for i in range(len(projects[user_id])):
-            _comp = await compile(projects[user_id][i], user_id)
-            _res_proj = await resume_proj(_comp, user_id)
-            _proj += "\n\n" + _res_proj
-
-        _proj = _proj.split("\n\n")
-
-        resume_file = create_resume(
-            name[user_id],
-            'phone',
-            'age',
-            'email',
-            'education',
-            _proj,
-            skills[user_id],
-            achievements[user_id],
-            'additional_info'
-        )
-        bot.send_document(
+def end(user_id):
+    """Ставит сборку резюме в очередь фоновых задач.
+
+    Args:
+        user_id (int): ID пользователя
+    """
+    session = sessions.get(user_id)
+    bot.send_message(user_id, 'Создаю резюме...')
+    jobs.enqueue('build_resume', user_id, {
+        'user_name': session.name,
+        'user_projects': session.projects,
+        'user_skills': session.skills,
+        'user_achievements': session.achievements
+    })
+
+
+async def build_resume(user_id, user_name, user_projects, user_skills, user_achievements):
+    """Собирает резюме и отправляет его пользователю (фоновая задача).
+
+    При повторе задачи уже выполненные шаги (описания проектов с
+    прогрессом, документ, меню) пропускаются.
+
+    Args:
+        user_id (int): ID пользователя
+        user_name (str): Имя пользователя
+        user_projects (list): Диалоги о проектах
+        user_skills (str): Навыки
+        user_achievements (str): Достижения
+    """
+    # При повторе задачи описания проектов и прогресс не готовятся заново
+    _res_projs = await jobs.once('projects', lambda: build_projects(user_projects, user_id))
+    model = ResumeModel(
+        name=user_name,
+        # Навыки пользователь пишет свободным текстом, он идет в резюме как есть
+        skills=tuple(skill.strip() for skill in (user_skills or '').split(',') if skill.strip()),
+        projects=tuple(project for project in _res_projs if project),
+        achievements=user_achievements or ''
+    )
+
+    async def send_resume():
+        resume_file = await renderer.render(model)
+        # Загрузка документа блокирующая, ждем ее в пуле потоков
+        await delivered(await asyncio.get_running_loop().run_in_executor(None, lambda: bot.send_document(
             chat_id=user_id,
             document=resume_file,
-            visible_file_name=f"{name[user_id]}_Резюме.docx"
-        )
-        
+            visible_file_name=f"{user_name}_Резюме.docx"
+        )))
+
+    async def menu():
         # Отправляем сообщение с кнопками рестарта и главного меню
         markup = create_restart_menu()
         bot.send_message(
@@ -844,17 +656,76 @@ async def end(user_id):
             "Резюме готово! Выберите действие:",
             reply_markup=markup
         )
-        
-    except Exception as e:
-        log.error(f"Error in end function: {str(e)}")
-        bot.send_message(user_id, "Произошла ошибка при создании резюме. Пожалуйста, попробуйте позже.")
-        # В случае ошибки также добавляем кнопки рестарта и главного меню
-        markup = create_restart_menu()
-        bot.send_message(
-            user_id,
-            "Выберите действие:",
-            reply_markup=markup
-        )
+
+    await jobs.once('document', send_resume)
+    await jobs.once('menu', menu)
+
+
+async def job_failed(user_id):
+    """Сообщает пользователю, что фоновая задача не выполнилась.
+
+    Args:
+        user_id (int): ID пользователя
+    """
+    bot.send_message(user_id, "Произошла ошибка при подготовке ответа. Пожалуйста, попробуйте позже.")
+    # В случае ошибки также добавляем кнопки рестарта и главного меню
+    markup = create_restart_menu()
+    bot.send_message(
+        user_id,
+        "Выберите действие:",
+        reply_markup=markup
+    )
+
+
+async def build_projects(user_projects, user_id):
+    """Готовит описания всех проектов пользователя для резюме.
+
+    Проекты обрабатываются параллельно: не больше END_USER_CONCURRENCY на
+    пользователя и END_GLOBAL_CONCURRENCY на весь бот. Порядок описаний
+    совпадает с порядком проектов, прогресс показывается в чате.
+
+    Args:
+        user_projects (list): Диалоги о проектах
+        user_id (int): ID пользователя
+
+    Returns:
+        list: Описания проектов для резюме
+    """
+    global _project_slots
+    if _project_slots is None:
+        _project_slots = asyncio.Semaphore(end_global_concurrency)
+    user_slots = asyncio.Semaphore(end_user_concurrency)
+    total = len(user_projects)
+    done = 0
+    progress_message = None
+    progress_lock = asyncio.Lock()
+
+    async def build(project):
+        nonlocal done, progress_message
+        async with user_slots, _project_slots:
+            _comp = await compile(project, user_id)
+            _res_proj = await resume_proj(_comp, user_id) if _comp else None
+
+        done += 1
+        if total > 1:
+            progress_text = f"{done}/{total} проектов готово"
+            # Вызовы Bot API блокирующие и идут в пуле потоков; блокировка
+            # сохраняет порядок правок и не дает отправить прогресс дважды
+            async with progress_lock:
+                loop = asyncio.get_running_loop()
+                if progress_message is None:
+                    # Прогресс потом правится, склеивать его с соседними сообщениями нельзя
+                    progress_message = await loop.run_in_executor(None, send_editable, bot, user_id, progress_text)
+                else:
+                    sent_message = await delivered(progress_message)
+                    await loop.run_in_executor(None, lambda: bot.edit_message_text(
+                        progress_text,
+                        chat_id=user_id,
+                        message_id=sent_message.message_id
+                    ))
+        return _res_proj or ''
+
+    return await asyncio.gather(*(build(project) for project in user_projects))
 
 
 async def compile(answers, chat_id):
@@ -867,7 +738,7 @@ async def compile(answers, chat_id):
     Returns:
         str: Структурированное описание проекта
     """
-    prompt_compile[chat_id] = (
+    prompt = (
         "Ты - опытный составитель резюме. Я - кандидат на должность в компанию. "
         "Вот, что я сказал в беседе с тобой о своих проектах:\n"
         f'"{answers}"\n'
@@ -876,7 +747,7 @@ async def compile(answers, chat_id):
         "информацию.\n"
         "Формат вывода: три bullet-point'а, разделенных символом переноса строки"
     )
-    result = await send_prompt_to_gpt(prompt_compile[chat_id])
+    result = await send_prompt_to_gpt(prompt, 'compile')
     return result
 
 
@@ -892,15 +763,58 @@ async def ask_follow_up(question_type, dialogue, context, chat_id):
     Returns:
         str: Сгенерированный вопрос
     """
-    prompt_ask[chat_id] = (
+    prompt = (
         "Ты - опытный собеседующий в компанию. Я - кандидат на должность в "
         "компанию. Между нами состоялся следующий диалог:\n\n"
         f"{dialogue}\n\n{question_type}\n{context}"
     )
-    result = await send_prompt_to_gpt(prompt_ask[chat_id])
+    result = await send_prompt_to_gpt(prompt, 'ask_follow_up')
     return result
 
 
+async def grade_and_follow_up(answer, dialogue, chat_id):
+    """Оценивает полноту ответа и при необходимости готовит уточняющий вопрос.
+
+    Очевидные ответы оцениваются локально. Для спорных при включенном
+    SPECULATIVE_FOLLOW_UP уточняющий вопрос генерируется параллельно с
+    оценкой GPT и отбрасывается, если он не понадобился: ход занимает
+    один запрос по времени ценой лишних токенов.
+
+    Args:
+        answer (str): Последний ответ пользователя
+        dialogue (str): Текст диалога по текущему вопросу
+        chat_id (int): ID чата пользователя
+
+    Returns:
+        tuple: Оценка от 1 до 10 и уточняющий вопрос или None,
+               если оценка не выше 5 или вопрос не удалось получить
+    """
+    score = score_answer(answer)
+    if not needs_gpt(score):
+        question = None
+        if score.grade > GRADE_SPLIT:
+            question = await ask_follow_up(FOLLOW_UP_QUESTION, dialogue, '', chat_id)
+        return score.grade, question
+
+    question_task = None
+    if speculative_follow_up:
+        question_task = asyncio.ensure_future(
+            ask_follow_up(FOLLOW_UP_QUESTION, dialogue, '', chat_id)
+        )
+
+    grade = parse_grade(await completeness(COMPLETENESS_QUESTION, dialogue, chat_id))
+    # Журнал калибровки пишется в файл, вне цикла рантайма
+    await asyncio.get_running_loop().run_in_executor(None, record_grade, answer, score, grade)
+
+    if grade <= GRADE_SPLIT:
+        if question_task is not None:
+            question_task.cancel()
+        return grade, None
+    if question_task is not None:
+        return grade, await question_task
+    return grade, await ask_follow_up(FOLLOW_UP_QUESTION, dialogue, '', chat_id)
+
+
 async def completeness(question_type, dialogue, chat_id):
     """Оценивает полноту ответа на вопрос.
 
@@ -912,12 +826,13 @@ async def completeness(question_type, dialogue, chat_id):
     Returns:
         str: Оценка полноты ответа
     """
-    prompt_compl[chat_id] = (
+    prompt = (
         "Ты - опытный составитель резюме. Я - кандидат на должность в компанию. "
         "В процессе составления резюме между нами состоял следующий диалог:\n\n"
-        f"{dialogue}\n\n{question_type}"
+        f"{dialogue}\n\n{question_type}\n"
+        "В ответе укажи только число."
     )
-    result = await send_prompt_to_gpt(prompt_compl[chat_id])
+    result = await send_prompt_to_gpt(prompt, 'completeness')
     return result
 
 
@@ -931,7 +846,7 @@ async def resume_proj(text, chat_id):
     Returns:
         str: Отформатированное описание проекта
     """
-    prompt_resume_proj[chat_id] = (
+    prompt = (
         "Ты - опытный составитель резюме с опытом работы более 10 лет. "
         "Представь, что тебе нужно написать свое резюме, а именно ту часть, "
         "где ты рассказываешь о своих проектах. Вот твои проекты:\n"
@@ -939,75 +854,20 @@ async def resume_proj(text, chat_id):
         "Формат вывода: напиши от своего лица часть твоего резюме, описывающая "
         "твои проекты. Будь краток и используй формальный стиль написания."
     )
-    result = await send_prompt_to_gpt(prompt_resume_proj[chat_id])
+    result = await send_prompt_to_gpt(prompt, 'resume_proj')
     return result
 
 
-def create_resume(name, phone, age, email, education, work_experience, skills,
-                  achievements, additional_info):
-    """Создает документ резюме в формате DOCX.
-
-    Args:
-        name (str): ФИО кандидата
-        phone (str): Номер телефона
-        age (str): Возраст
-        email (str): Email
-        education (str): Образование
-        work_experience (list): Список опыта работы
-        skills (str): Навыки
-        achievements (str): Достижения
-        additional_info (str): Дополнительная информация
-
-    Returns:
-        BytesIO: Объект с документом резюме
-    """
-    doc = Document()
-
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Times New Roman'
-    font.size = Pt(12)
-
-    title = doc.add_paragraph(name)
-    title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    title_style = title.style
-    title_font = title_style.font
-    title_font.bold = True
-    title_font.size = Pt(14)
-
-    contact_info = doc.add_paragraph(
-        f"Тел.: {phone}  {age} лет  Mail: {email}"
-    )
-    contact_info.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-
-    doc.add_paragraph("ОБРАЗОВАНИЕ", style='Heading 1')
-    doc.add_paragraph(education, style='List Bullet')
-
-    doc.add_paragraph("ОПЫТ РАБОТЫ", style='Heading 1')
-    for exp in work_experience:
-        doc.add_paragraph(exp, style='List Bullet')
-
-    doc.add_paragraph("НАВЫКИ", style='Heading 1')
-    doc.add_paragraph(skills, style='List Bullet')
-
-    doc.add_paragraph("ДОСТИЖЕНИЯ", style='Heading 1')
-    doc.add_paragraph(achievements, style='List Bullet')
-
-    doc.add_paragraph("ДОПОЛНИТЕЛЬНАЯ ИНФОРМАЦИЯ", style='Heading 1')
-    doc.add_paragraph(additional_info, style='List Bullet')
-
-    file_stream = BytesIO()
-    doc.save(file_stream)
-    file_stream.seek(0)
-    return file_stream
-
-
 # Функции для AI интервьюера
-def ai_interviewer_start(start_message):
+def ai_interviewer_start(start_message, intro=(
+        "Привет! Я бот от компании <a href='https://youroffer.ru/'>YourOffer</a>, мы помогаем найти работу "
+        "мечты. Давай проведем с тобой пробное собеседование, чтобы лучше подготовить тебя к реальному интервью "
+        "и добавить уверенности в себе!\n\n")):
     """Начинает процесс AI-интервью.
 
     Args:
         start_message (types.Message): Объект сообщения от пользователя
+        intro (str): Начало приветственного сообщения (HTML)
     """
     if hasattr(start_message, 'from_user'):
         pass
@@ -1016,30 +876,20 @@ def ai_interviewer_start(start_message):
     user_id = start_message.from_user.id
     log.info(f"Starting AI interviewer bot for user {user_id}")
 
-    # Сохраняем текущий режим
-    current_mode[user_id] = "interviewer"
-
-    answers[user_id] = ''
-    questions[user_id] = ''
-    resume[user_id] = ''
-    vacancy[user_id] = ''
-    flag[user_id] = -1
-    clicked_flag[user_id] = 0
-    current_question_index[user_id] = 0
+    # Начинаем режим с чистой сессии
+    sessions.get(start_message.chat.id).reset("interviewer")
 
     # Добавляем только кнопку главного меню при старте
     markup = create_main_menu_button()
     bot.send_message(
         user_id,
-        "Привет! Я бот от компании <a href='https://youroffer.ru/'>YourOffer</a>, мы помогаем найти работу "
-        "мечты. Давай проведем с тобой пробное собеседование, чтобы лучше подготовить тебя к реальному интервью "
-        "и добавить уверенности в себе!\n\n"
-        "Отправь, пожалуйста, свое резюме в виде .pdf или .doc документа или в виде текстового сообщения",
+        intro +
+        "Отправь, пожалуйста, свое резюме в виде .pdf или .docx документа или в виде текстового сообщения",
         reply_markup=markup,
         parse_mode='HTML'
     )
 
-    bot.register_next_step_handler(start_message, ask_resume, user_id)
+    fsm.set(start_message.chat.id, 'interview_resume', user_id)
 
 
 def ask_resume(message, user_id):
@@ -1049,65 +899,39 @@ def ask_resume(message, user_id):
         message (types.Message): Объект сообщения от пользователя
         user_id (int): ID пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
-    if (message.content_type != 'text' and
-            message.content_type != 'document'):
-        bot.send_message(message.from_user.id,
-                         "Пожалуйста, отправь резюме в виде текстового сообщения или документа.")
-        bot.register_next_step_handler(message, ask_resume, user_id)
-        return
-
+    session = sessions.get(message.chat.id)
     if message.content_type == 'text':
-        resume[user_id] = message.text
-    elif message.content_type == 'document' and (
-            message.document.file_name.lower().endswith('.pdf') or
-            message.document.file_name.lower().endswith('.doc')
-    ):
+        session.resume = analyze_resume(message.text)
+    else:
         try:
-            file_info = bot.get_file(message.document.file_id)
-            downloaded_file = bot.download_file(file_info.file_path)
-
-            local_file_path = os.path.join("Documents", file_info.file_path.split('/')[-1])
-            os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
-
-            with open(local_file_path, 'wb') as new_file:
-                new_file.write(downloaded_file)
-
-            resume[user_id] = process_pdf(local_file_path)
-            os.remove(local_file_path)
+            session.resume = analyze_resume(ingest_document(message.document))
+        except UnsupportedDocument as e:
+            bot.send_message(message.chat.id, f"{e}. Пожалуйста, отправь резюме в формате PDF/DOCX или текстом.")
+            fsm.set(message.chat.id, 'interview_resume', user_id)
+            return
         except Exception as e:
+            log.error(f"Error processing document: {e}")
             bot.send_message(message.from_user.id,
                              "Произошла ошибка :( Пожалуйста, вернитесь в главное меню")
             return_to_main_menu(message)
             return
 
     bot.send_message(user_id, "Отправь, пожалуйста, описание вакансии в текстовом формате.")
-    bot.register_next_step_handler(message, ask_vacancy, user_id)
+    fsm.set(message.chat.id, 'interview_vacancy', user_id)
 
 
 def ask_vacancy(message, user_id=None):
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
-    if message.content_type != 'text':
-        bot.send_message(message.chat.id, "Пожалуйста, отправь описание вакансии в виде текстового сообщения.")
-        bot.register_next_step_handler(message, ask_vacancy)
-        return
-
-    vacancy[message.chat.id] = message.text
+    session = sessions.get(message.chat.id)
+    session.vacancy = message.text
     bot.send_message(message.chat.id,
                      "Спасибо! Теперь я подготовлю для тебя вопросы на основе твоего резюме и описания вакансии.")
 
-    # Генерация вопросов на основе резюме и вакансии
-    generate_questions(message.chat.id)
-
-    bot.send_message(message.chat.id, "Вот мои вопросы:\n\n" + questions[message.chat.id])
-    bot.send_message(message.chat.id, "Пожалуйста, ответь на первый вопрос.")
-    bot.register_next_step_handler(message, process_answer, message.chat.id)
+    # Генерация вопросов на основе резюме и вакансии идет в фоне
+    jobs.enqueue('generate_questions', message.chat.id, {
+        'resume_text': session.resume.render(*INTERVIEW_FIELDS),
+        'vacancy_text': session.vacancy
+    })
+    fsm.set(message.chat.id, 'interview_answer', message.chat.id)
 
 
 def process_answer(message, user_id):
@@ -1117,53 +941,35 @@ def process_answer(message, user_id):
         message (types.Message): Объект сообщения от пользователя
         user_id (int): ID пользователя
     """
-    log.info(f"Получен ответ от пользователя {user_id} на вопрос {current_question_index.get(user_id, 0) + 1}")
+    session = sessions.get(message.chat.id)
+    log.info(f"Получен ответ от пользователя {user_id} на вопрос {session.current_question_index + 1}")
     log.info(f"Тип сообщения: {message.content_type}")
     log.info(f"Текст ответа: {message.text if message.content_type == 'text' else 'Голосовое сообщение'}")
 
-    if message.text == "🏠 Главное меню":
-        log.info(f"Пользователь {user_id} вернулся в главное меню")
-        return_to_main_menu(message)
-        return
-
-    if message.content_type not in ('text', 'voice'):
-        log.warning(f"Пользователь {user_id} отправил неподдерживаемый тип сообщения: {message.content_type}")
-        bot.send_message(user_id, "Пожалуйста, отправь ответ в виде текстового сообщения или голосового сообщения.")
-        bot.register_next_step_handler(message, process_answer, user_id)
-        return
-
     if message.content_type == 'text':
         answer = message.text
     else:
         answer = "Голосовое сообщение получено"
 
-    # Инициализируем словарь, если его нет
-    if user_id not in answers:
-        answers[user_id] = ''
-        log.info(f"Инициализация словаря ответов для пользователя {user_id}")
-    if user_id not in current_question_index:
-        current_question_index[user_id] = 0
-        log.info(f"Инициализация счетчика вопросов для пользователя {user_id}")
-
     # Добавляем ответ в список ответов
-    answers[user_id] += f"\nВопрос {current_question_index[user_id] + 1}: {answer}"
-    log.info(f"Добавлен ответ на вопрос {current_question_index[user_id] + 1} для пользователя {user_id}")
+    session.answers.answer(answer, session.current_question_index + 1)
+    log.info(f"Добавлен ответ на вопрос {session.current_question_index + 1} для пользователя {user_id}")
 
     # Увеличиваем счетчик вопросов
-    current_question_index[user_id] += 1
-    log.info(f"Текущий индекс вопроса для пользователя {user_id}: {current_question_index[user_id]}")
+    session.current_question_index += 1
+    log.info(f"Текущий индекс вопроса для пользователя {user_id}: {session.current_question_index}")
 
     # Если это не последний вопрос
-    if current_question_index[user_id] < 3:
-        log.info(f"Запрашиваем следующий вопрос ({current_question_index[user_id] + 1}) у пользователя {user_id}")
-        bot.send_message(user_id, f"Спасибо! Теперь ответь на вопрос {current_question_index[user_id] + 1}.")
-        bot.register_next_step_handler(message, process_answer, user_id)
+    if session.current_question_index < 3:
+        log.info(f"Запрашиваем следующий вопрос ({session.current_question_index + 1}) у пользователя {user_id}")
+        bot.send_message(user_id, f"Спасибо! Теперь ответь на вопрос {session.current_question_index + 1}.")
+        fsm.set(message.chat.id, 'interview_answer', user_id)
     else:
         log.info(f"Все вопросы пройдены для пользователя {user_id}. Начинаем анализ.")
         # Если это последний вопрос, анализируем все ответы
-        analyze_interview(user_id)
+        analyze_interview(message.chat.id)
         # Сбрасываем счетчик вопросов для следующего использования
-        current_question_index[user_id] = 0
+        session.current_question_index = 0
         log.info(f"Сброшен счетчик вопросов для пользователя {user_id}")
 
 
@@ -1176,47 +982,42 @@ def analyze_interview(user_id):
     prompt = f"""Проанализируй следующие ответы кандидата на вопросы собеседования и составь рекомендации по улучшению.
 
     Вопросы и ответы:
-    {answers[user_id]}
+    {sessions.get(user_id).answers.render()}
 
     Составь краткий анализ и рекомендации по улучшению ответов.
     """
 
-    analysis = send_prompt_to_gpt_sync(prompt)
-
-    # Отправляем анализ и рекомендации
-    bot.send_message(user_id, "Спасибо за участие в собеседовании! Вот мой анализ и рекомендации:\n\n" + analysis)
-    
-    # Добавляем кнопки рестарта и главного меню
-    markup = create_restart_menu()
-    bot.send_message(
-        user_id,
-        "Собеседование завершено! Выберите действие:",
-        reply_markup=markup
-    )
+    jobs.enqueue('analyze_interview', user_id, {
+        'prompt': prompt,
+        'call_type': 'analyze_interview',
+        'header': "Спасибо за участие в собеседовании! Вот мой анализ и рекомендации:\n\n",
+        'menu_text': "Собеседование завершено! Выберите действие:"
+    })
 
 
 # Функции для parser_bot
-def parser_start(message):
+def parser_start(message, intro="Привет! Я помогу тебе найти подходящие вакансии.\n"):
     """
     Начинает процесс поиска вакансий.
 
     Args:
         message (types.Message): Объект сообщения от пользователя
+        intro (str): Начало приветственного сообщения
     """
     log.info(f"Starting parser bot for user {message.from_user.id}")
 
-    # Сохраняем текущий режим
-    current_mode[message.from_user.id] = "parser"
+    # Начинаем режим с чистой сессии
+    sessions.get(message.chat.id).reset("parser")
 
     # Добавляем только кнопку главного меню при старте
     markup = create_main_menu_button()
     bot.send_message(
         message.chat.id,
-        "Привет! Я помогу тебе найти подходящие вакансии.\n"
+        intro +
         "Введите ключевые слова для поиска (например: 'python developer' или 'data scientist'):",
         reply_markup=markup
     )
-    bot.register_next_step_handler(message, process_search_query)
+    fsm.set(message.chat.id, 'parser_query')
 
 
 def process_search_query(message):
@@ -1226,10 +1027,6 @@ def process_search_query(message):
     Args:
         message (types.Message): Объект сообщения от пользователя
     """
-    if message.text == "🏠 Главное меню":
-        return_to_main_menu(message)
-        return
-
     log.info(f"User {message.from_user.id} searching for: {message.text}")
 
     try:
@@ -1299,237 +1096,35 @@ def process_search_query(message):
 
 def restart_cover_letter(message):
     """Перезапускает режим создания сопроводительного письма."""
-    try:
-        log.info(f"Пользователь {message.from_user.id} начал перезапуск режима сопроводительного письма")
-        
-        # Очищаем все данные пользователя
-        log.info(f"Очистка данных пользователя {message.from_user.id} в режиме сопроводительного письма")
-        if message.chat.id in resume:
-            del resume[message.chat.id]
-            log.debug(f"Удалены данные резюме для пользователя {message.from_user.id}")
-        if message.chat.id in vacancy:
-            del vacancy[message.chat.id]
-            log.debug(f"Удалены данные вакансии для пользователя {message.from_user.id}")
-        if message.chat.id in questions:
-            del questions[message.chat.id]
-            log.debug(f"Удалены вопросы для пользователя {message.from_user.id}")
-        if message.chat.id in answers:
-            del answers[message.chat.id]
-            log.debug(f"Удалены ответы для пользователя {message.from_user.id}")
-        if message.chat.id in current_question_index:
-            del current_question_index[message.chat.id]
-            log.debug(f"Удален индекс вопросов для пользователя {message.from_user.id}")
-        
-        # Перезапускаем режим с сохранением текущего режима
-        current_mode[message.from_user.id] = "cover_letter"
-        log.info(f"Установлен режим 'cover_letter' для пользователя {message.from_user.id}")
-        
-        # Инициализируем необходимые переменные
-        answers[message.chat.id] = ''
-        current_question_index[message.chat.id] = 0
-        log.debug(f"Инициализированы новые переменные для пользователя {message.from_user.id}")
-        
-        # Отправляем приветственное сообщение с кнопкой главного меню
-        markup = create_main_menu_button()
-        log.info(f"Отправка приветственного сообщения пользователю {message.from_user.id}")
-        bot.send_message(
-            message.chat.id,
-            "Давайте начнем заново!\n\n"
-            "Отправь, пожалуйста, свое резюме в текстовом формате, или в форматах pdf или doc",
-            reply_markup=markup
-        )
-        bot.register_next_step_handler(message, ask_resume_async)
-        log.info(f"Установлен обработчик следующего шага для пользователя {message.from_user.id}")
-        
-    except Exception as e:
-        log.error(f"Ошибка при перезапуске режима сопроводительного письма для пользователя {message.from_user.id}: {str(e)}")
-        # В случае ошибки возвращаем в главное меню
-        return_to_main_menu(message)
+    cover_letter_start(message, intro="Давайте начнем заново!\n\n")
+
 
 def restart_resume_bot(message):
     """Перезапускает режим создания резюме."""
-    try:
-        log.info(f"Пользователь {message.from_user.id} начал перезапуск режима создания резюме")
-        
-        # Очищаем все данные пользователя
-        log.info(f"Очистка данных пользователя {message.from_user.id} в режиме создания резюме")
-        if message.chat.id in name:
-            del name[message.chat.id]
-            log.debug(f"Удалено имя пользователя {message.from_user.id}")
-        if message.chat.id in summary:
-            del summary[message.chat.id]
-            log.debug(f"Удалено описание пользователя {message.from_user.id}")
-        if message.chat.id in projects:
-            del projects[message.chat.id]
-            log.debug(f"Удалены проекты пользователя {message.from_user.id}")
-        if message.chat.id in skills:
-            del skills[message.chat.id]
-            log.debug(f"Удалены навыки пользователя {message.from_user.id}")
-        if message.chat.id in achievements:
-            del achievements[message.chat.id]
-            log.debug(f"Удалены достижения пользователя {message.from_user.id}")
-        if message.chat.id in answers_X:
-            del answers_X[message.chat.id]
-            log.debug(f"Удалены ответы X пользователя {message.from_user.id}")
-        if message.chat.id in answers_Y:
-            del answers_Y[message.chat.id]
-            log.debug(f"Удалены ответы Y пользователя {message.from_user.id}")
-        if message.chat.id in answers_Z:
-            del answers_Z[message.chat.id]
-            log.debug(f"Удалены ответы Z пользователя {message.from_user.id}")
-        if message.chat.id in dialogue:
-            del dialogue[message.chat.id]
-            log.debug(f"Удален диалог пользователя {message.from_user.id}")
-        if message.chat.id in context:
-            del context[message.chat.id]
-            log.debug(f"Удален контекст пользователя {message.from_user.id}")
-        if message.chat.id in question_counter:
-            del question_counter[message.chat.id]
-            log.debug(f"Удален счетчик вопросов пользователя {message.from_user.id}")
-        if message.chat.id in follow_up:
-            del follow_up[message.chat.id]
-            log.debug(f"Удалены follow-up вопросы пользователя {message.from_user.id}")
-        if message.chat.id in prompt_compile:
-            del prompt_compile[message.chat.id]
-            log.debug(f"Удалены скомпилированные промпты пользователя {message.from_user.id}")
-        if message.chat.id in prompt_ask:
-            del prompt_ask[message.chat.id]
-            log.debug(f"Удалены промпты вопросов пользователя {message.from_user.id}")
-        if message.chat.id in prompt_compl:
-            del prompt_compl[message.chat.id]
-            log.debug(f"Удалены промпты полноты пользователя {message.from_user.id}")
-        if message.chat.id in prompt_resume_proj:
-            del prompt_resume_proj[message.chat.id]
-            log.debug(f"Удалены промпты проектов пользователя {message.from_user.id}")
-        if message.chat.id in previous_message_id:
-            del previous_message_id[message.chat.id]
-            log.debug(f"Удален ID предыдущего сообщения пользователя {message.from_user.id}")
-        
-        # Перезапускаем режим с сохранением текущего режима
-        current_mode[message.from_user.id] = "resume"
-        log.info(f"Установлен режим 'resume' для пользователя {message.from_user.id}")
-        
-        # Инициализируем необходимые переменные
-        answers_X[message.chat.id] = ''
-        answers_Y[message.chat.id] = ''
-        answers_Z[message.chat.id] = ''
-        dialogue[message.chat.id] = ''
-        projects[message.chat.id] = []
-        context[message.chat.id] = []
-        question_counter[message.chat.id] = 1
-        log.debug(f"Инициализированы новые переменные для пользователя {message.from_user.id}")
-        
-        # Отправляем приветственное сообщение с кнопкой главного меню
-        markup = create_main_menu_button()
-        log.info(f"Отправка приветственного сообщения пользователю {message.from_user.id}")
-        bot.send_message(
-            message.chat.id,
-            "Давайте начнем заново!\n\n"
-            "Напиши, пожалуйста, свое ФИО.",
-            reply_markup=markup
-        )
-        bot.register_next_step_handler(message, user_name)
-        log.info(f"Установлен обработчик следующего шага для пользователя {message.from_user.id}")
-        
-    except Exception as e:
-        log.error(f"Ошибка при перезапуске режима создания резюме для пользователя {message.from_user.id}: {str(e)}")
-        # В случае ошибки возвращаем в главное меню
-        return_to_main_menu(message)
+    resume_bot_start(message, intro="Давайте начнем заново!\n\n")
+
 
 def restart_ai_interviewer(message):
     """Перезапускает режим AI-интервьюера."""
-    try:
-        log.info(f"Пользователь {message.from_user.id} начал перезапуск режима AI-интервьюера")
-        
-        # Очищаем все данные пользователя
-        log.info(f"Очистка данных пользователя {message.from_user.id} в режиме AI-интервьюера")
-        if message.chat.id in answers:
-            del answers[message.chat.id]
-            log.debug(f"Удалены ответы пользователя {message.from_user.id}")
-        if message.chat.id in questions:
-            del questions[message.chat.id]
-            log.debug(f"Удалены вопросы пользователя {message.from_user.id}")
-        if message.chat.id in resume:
-            del resume[message.chat.id]
-            log.debug(f"Удалено резюме пользователя {message.from_user.id}")
-        if message.chat.id in vacancy:
-            del vacancy[message.chat.id]
-            log.debug(f"Удалена вакансия пользователя {message.from_user.id}")
-        if message.chat.id in flag:
-            del flag[message.chat.id]
-            log.debug(f"Удален флаг пользователя {message.from_user.id}")
-        if message.chat.id in clicked_flag:
-            del clicked_flag[message.chat.id]
-            log.debug(f"Удален clicked_flag пользователя {message.from_user.id}")
-        if message.chat.id in current_question_index:
-            del current_question_index[message.chat.id]
-            log.debug(f"Удален индекс вопросов пользователя {message.from_user.id}")
-        
-        # Перезапускаем режим с сохранением текущего режима
-        current_mode[message.from_user.id] = "interviewer"
-        log.info(f"Установлен режим 'interviewer' для пользователя {message.from_user.id}")
-        
-        # Инициализируем необходимые переменные
-        answers[message.chat.id] = ''
-        questions[message.chat.id] = ''
-        current_question_index[message.chat.id] = 0
-        flag[message.chat.id] = -1
-        clicked_flag[message.chat.id] = 0
-        log.debug(f"Инициализированы новые переменные для пользователя {message.from_user.id}")
-        
-        # Отправляем приветственное сообщение с кнопкой главного меню
-        markup = create_main_menu_button()
-        log.info(f"Отправка приветственного сообщения пользователю {message.from_user.id}")
-        bot.send_message(
-            message.chat.id,
-            "Давайте начнем собеседование заново!\n\n"
-            "Отправь, пожалуйста, свое резюме в виде .pdf или .doc документа или в виде текстового сообщения",
-            reply_markup=markup,
-            parse_mode='HTML'
-        )
-        bot.register_next_step_handler(message, ask_resume, message.chat.id)
-        log.info(f"Установлен обработчик следующего шага для пользователя {message.from_user.id}")
-        
-    except Exception as e:
-        log.error(f"Ошибка при перезапуске режима AI-интервьюера для пользователя {message.from_user.id}: {str(e)}")
-        # В случае ошибки возвращаем в главное меню
-        return_to_main_menu(message)
+    ai_interviewer_start(message, intro="Давайте начнем собеседование заново!\n\n")
+
 
 def restart_parser(message):
     """Перезапускает режим поиска вакансий."""
-    try:
-        log.info(f"Пользователь {message.from_user.id} начал перезапуск режима парсера вакансий")
-        
-        # Перезапускаем режим с сохранением текущего режима
-        current_mode[message.from_user.id] = "parser"
-        log.info(f"Установлен режим 'parser' для пользователя {message.from_user.id}")
-        
-        # Отправляем приветственное сообщение с кнопкой главного меню
-        markup = create_main_menu_button()
-        log.info(f"Отправка приветственного сообщения пользователю {message.from_user.id}")
-        bot.send_message(
-            message.chat.id,
-            "Давайте начнем поиск заново!\n\n"
-            "Введите ключевые слова для поиска (например: 'python developer' или 'data scientist'):",
-            reply_markup=markup
-        )
-        bot.register_next_step_handler(message, process_search_query)
-        log.info(f"Установлен обработчик следующего шага для пользователя {message.from_user.id}")
-        
-    except Exception as e:
-        log.error(f"Ошибка при перезапуске режима парсера вакансий для пользователя {message.from_user.id}: {str(e)}")
-        # В случае ошибки возвращаем в главное меню
-        return_to_main_menu(message)
+    parser_start(message, intro="Давайте начнем поиск заново!\n\n")
 
-def generate_questions(user_id):
-    """Генерирует вопросы для собеседования на основе резюме и описания вакансии.
+
+async def generate_questions(user_id, resume_text, vacancy_text):
+    """Генерирует вопросы для собеседования и отправляет их пользователю (фоновая задача).
 
     Args:
         user_id (int): ID пользователя
+        resume_text (str): Опыт и навыки из структуры резюме
+        vacancy_text (str): Описание вакансии
     """
     log.info(f"Генерация вопросов для пользователя {user_id}")
-    log.info(f"Резюме пользователя: {resume[user_id][:100]}...")  # Логируем первые 100 символов резюме
-    log.info(f"Описание вакансии: {vacancy[user_id][:100]}...")  # Логируем первые 100 символов вакансии
+    log.info(f"Резюме пользователя: {resume_text[:100]}...")  # Логируем первые 100 символов резюме
+    log.info(f"Описание вакансии: {vacancy_text[:100]}...")  # Логируем первые 100 символов вакансии
 
     prompt = f"""На основе следующего резюме и описания вакансии составь 3 четких и конкретных вопроса для собеседования.
     Вопросы должны быть пронумерованы от 1 до 3.
@@ -1537,10 +1132,10 @@ def generate_questions(user_id):
     Вопросы должны быть направлены на оценку соответствия кандидата требованиям вакансии.
 
     Резюме:
-    {resume[user_id]}
+    {trim_for('generate_questions', resume_text)}
 
     Вакансия:
-    {vacancy[user_id]}
+    {trim_for('generate_questions', vacancy_text)}
 
     Формат вывода:
     1. Первый вопрос
@@ -1548,38 +1143,71 @@ def generate_questions(user_id):
     3. Третий вопрос
     """
 
-    questions[user_id] = send_prompt_to_gpt_sync(prompt)
-    log.info(f"Сгенерированные вопросы для пользователя {user_id}: {questions[user_id]}")
+    async def ask():
+        result = await send_prompt_to_gpt(prompt, 'generate_questions')
+        return result or gpt_error_text("Извините, произошла ошибка при генерации вопросов.")
+
+    async def send():
+        bot.send_message(user_id, "Вот мои вопросы:\n\n" + questions)
+        bot.send_message(user_id, "Пожалуйста, ответь на первый вопрос.")
+
+    questions = await jobs.once('questions', ask)
+    # Загрузка и запись сессии ходят в Redis, поэтому идут вне цикла рантайма
+    await asyncio.get_running_loop().run_in_executor(None, save_questions, user_id, questions)
+    log.info(f"Сгенерированные вопросы для пользователя {user_id}: {questions}")
+    await jobs.once('questions_sent', send)
 
-def send_prompt_to_gpt_sync(prompt):
-    """Синхронная версия функции отправки запроса к GPT API.
+
+def save_questions(user_id, questions):
+    """Сохраняет вопросы для собеседования в сессии пользователя.
 
     Args:
-        prompt (str): Текст запроса к GPT
+        user_id (int): ID пользователя
+        questions (str): Вопросы для собеседования
+    """
+    with sessions.update(user_id) as session:
+        session.questions = questions
+
+def gpt_error_text(default):
+    """Возвращает текст для пользователя, когда GPT не ответил.
+
+    Args:
+        default (str): Текст для единичной ошибки
 
     Returns:
-        str: Ответ от GPT или сообщение об ошибке
+        str: Текст ошибки; если OpenAI деградировал и цепь разомкнута,
+             пользователь просит попробовать позже
     """
-    endpoint = 'https://api.openai.com/v1/chat/completions'
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {api_key}'
-    }
-
-    data = {
-        'model': 'gpt-4o-mini',
-        'messages': [{'role': 'user', 'content': prompt}],
-        'max_tokens': 3000,
-        'top_p': 1.0,
-        'temperature': 0.6
-    }
-
-    response = requests.post(endpoint, headers=headers, json=data)
-
-    if response.status_code == 200:
-        response_data = json.loads(response.text)
-        return response_data['choices'][0]['message']['content']
-    else:
-        print("Error:", response.text)
-        return "Извините, произошла ошибка при генерации вопросов."
\ No newline at end of file
+    if gpt_client.breaker.is_open:
+        return "Сервис генерации сейчас перегружен. Пожалуйста, попробуйте через пару минут."
+    return default
+
+
+# Фоновые задачи: обработчики получают все данные в payload
+jobs.register('build_resume', build_resume, on_failure=job_failed)
+jobs.register('generate_questions', generate_questions, on_failure=job_failed)
+jobs.register('analyze_interview', send_long_reply, on_failure=job_failed)
+jobs.register('cover_letter', send_long_reply, on_failure=job_failed)
+
+
+# Состояния диалогов: обработчик, допустимые типы сообщений и ответ на остальные
+TEXT_OR_VOICE = "Пожалуйста, отправь либо текст, либо голосовое сообщение."
+fsm.state('cover_resume', ask_resume_async, ('text', 'document'),
+          "Пожалуйста, отправьте резюме в текстовом формате или в форматах PDF/DOCX")
+fsm.state('cover_profession', ask_profession, ('text',), "Пожалуйста, введите название профессии текстом.")
+fsm.state('cover_company', ask_company, ('text',), "Пожалуйста, введите название компании текстом.")
+fsm.state('cover_description', ask_description, ('text',), "Пожалуйста, введите описание текстом.")
+fsm.state('resume_name', user_name, ('text',), "Пожалуйста, отправь свое ФИО текстом.")
+fsm.state('resume_summary', user_summary_async, ('text', 'voice'), TEXT_OR_VOICE)
+fsm.state('resume_project', ask_questions_X_async, ('text', 'voice'), TEXT_OR_VOICE)
+fsm.state('resume_tools', ask_questions_Y_async, ('text', 'voice'), TEXT_OR_VOICE)
+fsm.state('resume_results', ask_questions_Z_async, ('text', 'voice'), TEXT_OR_VOICE)
+fsm.state('resume_achievements', user_achievements_async, ('text', 'voice'), TEXT_OR_VOICE)
+fsm.state('resume_skills', user_skills_async, ('text', 'voice'), TEXT_OR_VOICE)
+fsm.state('interview_resume', ask_resume, ('text', 'document'),
+          "Пожалуйста, отправь резюме в виде текстового сообщения или документа.")
+fsm.state('interview_vacancy', ask_vacancy, ('text',),
+          "Пожалуйста, отправь описание вакансии в виде текстового сообщения.")
+fsm.state('interview_answer', process_answer, ('text', 'voice'),
+          "Пожалуйста, отправь ответ в виде текстового сообщения или голосового сообщения.")
+fsm.state('parser_query', process_search_query, ('text',), "Пожалуйста, введите ключевые слова текстом.")
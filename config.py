@@ -1,5 +1,6 @@
 import logging
 import os
+import socket
 from dotenv import load_dotenv, find_dotenv
 import telebot
 import redis
@@ -18,6 +19,98 @@ load_dotenv(find_dotenv())
 # Инициализация бота
 bot = telebot.TeleBot(token=os.getenv('TOKEN'))
 api_key = os.getenv('API_GPT')
+# Адрес Chat Completions; для CI и нагрузочных тестов - локальный fake_openai.py
+gpt_endpoint = os.getenv('GPT_ENDPOINT', 'https://api.openai.com/v1/chat/completions')
 
 # Инициализация Redis
-redis_client = redis.Redis(host='localhost', port=6379, db=0) 
\ No newline at end of file
+redis_client = redis.Redis(host='localhost', port=6379, db=0)
+
+# Максимум одновременно выполняющихся асинхронных обработчиков
+runtime_max_tasks = int(os.getenv('RUNTIME_MAX_TASKS', 500))
+
+# Настройки клиента OpenAI
+gpt_pool_size = int(os.getenv('GPT_POOL_SIZE', 20))
+gpt_connect_timeout = float(os.getenv('GPT_CONNECT_TIMEOUT', 10))
+gpt_read_timeout = float(os.getenv('GPT_READ_TIMEOUT', 120))
+
+# Потоковая выдача длинных ответов GPT с правкой сообщения на лету
+gpt_streaming = os.getenv('GPT_STREAMING', '1') == '1'
+stream_edit_interval = float(os.getenv('STREAM_EDIT_INTERVAL', 1.0))
+
+# Кэш ответов GPT в памяти процесса (L1 перед Redis)
+llm_cache_l1_entries = int(os.getenv('LLM_CACHE_L1_ENTRIES', 2000))
+llm_cache_l1_bytes = int(os.getenv('LLM_CACHE_L1_BYTES', 20 * 1024 * 1024))
+
+# Локальная оценка полноты ответов в диалоге резюме. Журнал калибровки
+# хранит тексты ответов пользователей, поэтому включается только явно
+scorer_log_path = os.getenv('SCORER_LOG_PATH', '')
+scorer_audit_rate = float(os.getenv('SCORER_AUDIT_RATE', 0.05))
+
+# Генерировать уточняющий вопрос параллельно с оценкой ответа (быстрее, но дороже)
+speculative_follow_up = os.getenv('SPECULATIVE_FOLLOW_UP', '1') == '1'
+
+# Параллельная сборка проектов в резюме
+end_user_concurrency = int(os.getenv('END_USER_CONCURRENCY', 3))
+end_global_concurrency = int(os.getenv('END_GLOBAL_CONCURRENCY', 20))
+
+# Лимиты OpenAI: запросов и токенов в минуту
+gpt_rpm = int(os.getenv('GPT_RPM', 500))
+gpt_tpm = int(os.getenv('GPT_TPM', 200000))
+
+# Повторы, подстраховочные запросы и размыкатель цепи для OpenAI
+gpt_max_attempts = int(os.getenv('GPT_MAX_ATTEMPTS', 4))
+gpt_hedging = os.getenv('GPT_HEDGING', '0') == '1'
+gpt_breaker_threshold = int(os.getenv('GPT_BREAKER_THRESHOLD', 5))
+gpt_breaker_reset = float(os.getenv('GPT_BREAKER_RESET', 30))
+
+# Фоновые задачи: число воркеров, попыток, время хранения результата, имя реплики и срок аренды задач
+job_workers = int(os.getenv('JOB_WORKERS', 4))
+job_max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+job_ttl = int(os.getenv('JOB_TTL', 24 * 3600))
+job_owner = os.getenv('JOB_OWNER', f'{socket.gethostname()}:{os.getpid()}')
+job_lease_ttl = int(os.getenv('JOB_LEASE_TTL', 60))
+
+# Режим получения обновлений: polling или webhook
+bot_mode = os.getenv('BOT_MODE', 'polling')
+webhook_url = os.getenv('WEBHOOK_URL', '')
+webhook_path = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+webhook_secret = os.getenv('WEBHOOK_SECRET', '')
+webhook_host = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+webhook_port = int(os.getenv('WEBHOOK_PORT', 8443))
+
+# Параллельная обработка обновлений: число шардов по chat_id
+dispatch_shards = int(os.getenv('DISPATCH_SHARDS', 8))
+
+# Исходящие сообщения Telegram: лимиты отправки и повторы после 429
+telegram_global_rps = float(os.getenv('TELEGRAM_GLOBAL_RPS', 30))
+telegram_chat_rps = float(os.getenv('TELEGRAM_CHAT_RPS', 1))
+telegram_chat_burst = float(os.getenv('TELEGRAM_CHAT_BURST', 3))
+outbox_workers = int(os.getenv('OUTBOX_WORKERS', 8))
+outbox_max_retries = int(os.getenv('OUTBOX_MAX_RETRIES', 5))
+
+# Сессии пользователей: хранилище (redis или memory), сколько держать в памяти
+# и через сколько секунд простоя удалять
+session_store = os.getenv('SESSION_STORE', 'redis')
+session_max = int(os.getenv('SESSION_MAX', 10000))
+session_ttl = int(os.getenv('SESSION_TTL', 24 * 3600))
+
+# Максимальная длина диалога вопросов и ответов, который попадает в промпты
+transcript_limit = int(os.getenv('TRANSCRIPT_LIMIT', 12000))
+
+# Извлечение текста из присланных резюме: размер файла, число страниц,
+# время на документ, число процессов и с какого числа страниц делить PDF между ними
+ingest_max_bytes = int(os.getenv('INGEST_MAX_BYTES', 10 * 1024 * 1024))
+ingest_max_pages = int(os.getenv('INGEST_MAX_PAGES', 30))
+ingest_timeout = float(os.getenv('INGEST_TIMEOUT', 20))
+ingest_workers = int(os.getenv('INGEST_WORKERS', 2))
+ingest_parallel_pages = int(os.getenv('INGEST_PARALLEL_PAGES', 10))
+
+# Кэш текста присланных резюме по file_unique_id: время жизни и размер L1
+resume_cache_ttl = int(os.getenv('RESUME_CACHE_TTL', 7 * 24 * 3600))
+resume_cache_l1_entries = int(os.getenv('RESUME_CACHE_L1_ENTRIES', 500))
+resume_cache_l1_bytes = int(os.getenv('RESUME_CACHE_L1_BYTES', 10 * 1024 * 1024))
+
+# Сборка документов резюме: процессы пула, макет по умолчанию и папка своих шаблонов
+render_workers = int(os.getenv('RENDER_WORKERS', 2))
+resume_layout = os.getenv('RESUME_LAYOUT', 'classic')
+resume_template_dir = os.getenv('RESUME_TEMPLATE_DIR', 'templates')
@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+
+from config import log
+
+_local = threading.local()
+
+
+def update_chat_id(update):
+    """Определяет чат, к которому относится обновление.
+
+    Args:
+        update (types.Update): Обновление Telegram
+
+    Returns:
+        int: ID чата или пользователя; 0, если его не удалось определить
+    """
+    for field in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        message = getattr(update, field, None)
+        if message is not None:
+            return message.chat.id
+    callback = getattr(update, 'callback_query', None)
+    if callback is not None:
+        if callback.message is not None:
+            return callback.message.chat.id
+        return callback.from_user.id
+    for field in ('inline_query', 'chosen_inline_result', 'pre_checkout_query', 'shipping_query'):
+        query = getattr(update, field, None)
+        if query is not None:
+            return query.from_user.id
+    return 0
+
+
+def in_shard():
+    """Проверяет, выполняется ли код в потоке шарда диспетчера.
+
+    Returns:
+        bool: True внутри обработки обновления диспетчером
+    """
+    return getattr(_local, 'shard', None) is not None
+
+
+class ShardedDispatcher:
+    """Обработка обновлений пулом потоков, разбитым на шарды по chat_id.
+
+    Обновления одного чата всегда попадают в один шард и выполняются
+    строго по очереди, поэтому цепочки register_next_step_handler не
+    гоняются. Разные чаты обрабатываются параллельно в разных шардах.
+
+    Args:
+        telegram_bot (telebot.TeleBot): Бот, обновления которого раздаются
+        shards (int): Число шардов (потоков)
+    """
+
+    def __init__(self, telegram_bot, shards):
+        self.bot = telegram_bot
+        self.shards = shards
+        self._process = telegram_bot.process_new_updates
+        self._queues = [queue.Queue() for _ in range(shards)]
+        self._threads = []
+        self.stats = [
+            {'processed': 0, 'errors': 0, 'max_depth': 0, 'busy': 0.0}
+            for _ in range(shards)
+        ]
+
+    def install(self):
+        """Подменяет bot.process_new_updates и запускает потоки шардов.
+
+        Обработчики бота после этого выполняются в потоке шарда, поэтому
+        собственный пул потоков TeleBot отключается.
+        """
+        self.bot.threaded = False
+        self.bot.process_new_updates = self.dispatch
+        for index in range(self.shards):
+            thread = threading.Thread(
+                target=self._worker,
+                args=(index,),
+                name=f'dispatch-{index}',
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        log.info(f"Update dispatcher started with {self.shards} shards")
+
+    def stop(self, timeout=10):
+        """Дожидается обработки уже полученных обновлений и останавливает шарды."""
+        for shard_queue in self._queues:
+            shard_queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.bot.process_new_updates = self._process
+
+    def shard_for(self, chat_id):
+        """Возвращает номер шарда для чата."""
+        return hash(chat_id) % self.shards
+
+    def dispatch(self, updates):
+        """Раскладывает обновления по очередям шардов.
+
+        Args:
+            updates (list): Обновления Telegram в порядке поступления
+        """
+        for update in updates:
+            index = self.shard_for(update_chat_id(update))
+            shard_queue = self._queues[index]
+            shard_queue.put(update)
+            stats = self.stats[index]
+            stats['max_depth'] = max(stats['max_depth'], shard_queue.qsize())
+
+    def _worker(self, index):
+        _local.shard = index
+        shard_queue = self._queues[index]
+        stats = self.stats[index]
+        while True:
+            update = shard_queue.get()
+            if update is None:
+                return
+            started = time.monotonic()
+            try:
+                self._process([update])
+            except Exception as e:
+                stats['errors'] += 1
+                log.error(f"Error while processing update in shard {index}: {e}")
+            stats['processed'] += 1
+            stats['busy'] += time.monotonic() - started
+
+    def snapshot(self):
+        """Возвращает метрики шардов.
+
+        Returns:
+            list: Для каждого шарда текущая и максимальная глубина очереди,
+                  число обработанных обновлений, ошибок и время работы
+        """
+        return [
+            dict(stats, shard=index, depth=self._queues[index].qsize())
+            for index, stats in enumerate(self.stats)
+        ]
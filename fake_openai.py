@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+
+import aiohttp
+from aiohttp import web
+
+from config import log
+from llm_cache import content_key
+
+UPSTREAM_ENDPOINT = 'https://api.openai.com/v1/chat/completions'
+
+
+def parse_latency(spec):
+    """Разбирает описание распределения задержки.
+
+    Args:
+        spec (str): 'fixed:0.5', 'uniform:0.2,1.5' или 'lognormal:-0.5,0.6'
+                    (параметры mu и sigma логнормального распределения)
+
+    Returns:
+        function: Функция без аргументов, возвращающая задержку в секундах
+    """
+    kind, _, raw = spec.partition(':')
+    args = [float(x) for x in raw.split(',') if x]
+    if kind == 'fixed':
+        return lambda: args[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(args[0], args[1])
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(args[0], args[1])
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+
+def request_key(body):
+    """Ключ кассеты: хэш тела запроса без признака потоковой выдачи."""
+    return content_key({k: v for k, v in body.items() if k != 'stream'})
+
+
+def synthetic_answer(body):
+    """Генерирует правдоподобный ответ без обращения к OpenAI.
+
+    Запросы с маленьким max_tokens (оценка полноты) получают число,
+    остальные - текст, длина которого растет с max_tokens.
+    """
+    if body.get('max_tokens', 3000) <= 5:
+        return str(random.randint(1, 10))
+    words = min(body.get('max_tokens', 3000) // 4, 300)
+    return ' '.join(['Тестовый ответ модели.'] + ['слово'] * words)
+
+
+class Cassette:
+    """Записанные ответы OpenAI в файле JSONL.
+
+    Args:
+        path (str): Путь к файлу кассеты
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.records[record['key']] = record['content']
+
+    def get(self, key):
+        return self.records.get(key)
+
+    def add(self, key, body, content):
+        self.records[key] = content
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            record = {'key': key, 'model': body.get('model'), 'content': content}
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+class StandIn:
+    """Локальная замена /v1/chat/completions для тестов и нагрузки.
+
+    Режимы:
+        synthetic - отвечает сгенерированным текстом;
+        record - проксирует запросы в OpenAI и записывает ответы в кассету;
+        replay - отвечает из кассеты, неизвестные запросы получают 404.
+
+    Args:
+        mode (str): Режим работы
+        cassette (str): Путь к кассете для record/replay
+        latency (str): Распределение задержки до первого байта, см. parse_latency
+        error_rate (float): Доля запросов, получающих ошибку
+        error_statuses (tuple): Статусы, из которых выбирается ошибка
+        token_delay (float): Пауза между фрагментами в потоковом режиме
+        upstream (str): Адрес настоящего API для режима record
+    """
+
+    def __init__(self, mode='synthetic', cassette=None, latency='fixed:0',
+                 error_rate=0.0, error_statuses=(429, 500, 503), token_delay=0.02,
+                 upstream=UPSTREAM_ENDPOINT):
+        if mode in ('record', 'replay') and not cassette:
+            raise ValueError(f"Режиму {mode} нужна кассета")
+        self.mode = mode
+        self.cassette = Cassette(cassette) if cassette else None
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.token_delay = token_delay
+        self.upstream = upstream
+        self.stats = {'requests': 0, 'errors': 0, 'replayed': 0, 'recorded': 0}
+
+    def make_app(self):
+        """Создает aiohttp-приложение с единственным маршрутом API."""
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self.handle)
+        return app
+
+    async def handle(self, request):
+        body = await request.json()
+        self.stats['requests'] += 1
+        await asyncio.sleep(self.latency())
+
+        if random.random() < self.error_rate:
+            self.stats['errors'] += 1
+            status = random.choice(self.error_statuses)
+            headers = {'Retry-After': '1'} if status == 429 else {}
+            return web.json_response(
+                {'error': {'message': 'injected error', 'type': 'stand_in'}},
+                status=status,
+                headers=headers
+            )
+
+        content = await self.answer(body, request.headers.get('Authorization', ''))
+        if content is None:
+            return web.json_response({'error': {'message': 'not in cassette'}}, status=404)
+        if body.get('stream'):
+            return await self.stream(request, content)
+        return web.json_response({
+            'object': 'chat.completion',
+            'model': body.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }]
+        })
+
+    async def answer(self, body, authorization):
+        """Возвращает текст ответа в зависимости от режима."""
+        if self.mode == 'synthetic':
+            return synthetic_answer(body)
+
+        key = request_key(body)
+        content = self.cassette.get(key)
+        if content is not None:
+            self.stats['replayed'] += 1
+            return content
+        if self.mode == 'replay':
+            log.warning(f"Stand-in: запрос {key[:12]} отсутствует в кассете")
+            return None
+
+        upstream_body = dict(body, stream=False)
+        async with aiohttp.ClientSession() as session:
+            async with session.post(
+                self.upstream,
+                json=upstream_body,
+                headers={'Authorization': authorization}
+            ) as response:
+                if response.status != 200:
+                    log.error(f"Stand-in: upstream ответил {response.status}")
+                    return None
+                data = await response.json()
+        content = data['choices'][0]['message']['content']
+        self.cassette.add(key, body, content)
+        self.stats['recorded'] += 1
+        return content
+
+    async def stream(self, request, content):
+        """Отдает ответ в формате SSE, как это делает OpenAI."""
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        words = content.split(' ')
+        for i, word in enumerate(words):
+            delta = word if i == 0 else ' ' + word
+            chunk = {'choices': [{'index': 0, 'delta': {'content': delta}}]}
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            await asyncio.sleep(self.token_delay)
+        await response.write(b'data: [DONE]\n\n')
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная замена OpenAI Chat Completions")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--mode', choices=('synthetic', 'record', 'replay'), default='synthetic')
+    parser.add_argument('--cassette', help="Файл кассеты JSONL для record/replay")
+    parser.add_argument('--latency', default='fixed:0', help="fixed:S, uniform:A,B или lognormal:MU,SIGMA")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-statuses', default='429,500,503')
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    args = parser.parse_args()
+
+    stand_in = StandIn(
+        mode=args.mode,
+        cassette=args.cassette,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_statuses=[int(x) for x in args.error_statuses.split(',')],
+        token_delay=args.token_delay
+    )
+    log.info(f"Stand-in OpenAI ({args.mode}) on http://{args.host}:{args.port}/v1/chat/completions")
+    web.run_app(stand_in.make_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from config import bot
+from sessions import sessions
+
+# Кнопка, которая из любого состояния возвращает в главное меню
+MAIN_MENU_TEXT = "🏠 Главное меню"
+
+# Все типы сообщений, которые маршрутизирует автомат
+ALL_CONTENT_TYPES = [
+    'text', 'audio', 'document', 'photo', 'sticker', 'video', 'video_note',
+    'voice', 'location', 'contact'
+]
+
+
+@dataclass(frozen=True)
+class State:
+    """Шаг диалога: обработчик и допустимый ввод.
+
+    Attributes:
+        name (str): Имя состояния, под которым оно хранится в Redis
+        handler (Callable): Обработчик handler(message, *args)
+        content_types (tuple): Допустимые типы сообщений
+        invalid_text (str): Ответ на сообщение недопустимого типа
+    """
+    name: str
+    handler: Callable
+    content_types: Tuple[str, ...] = ('text',)
+    invalid_text: Optional[str] = None
+
+
+class ConversationFSM:
+    """Конечный автомат диалогов вместо цепочек register_next_step_handler.
+
+    Имя текущего состояния чата и его аргументы хранятся в сессии чата.
+    Входящее сообщение сначала сверяется с таблицей кнопок меню (они
+    работают из любого состояния), затем передается обработчику
+    состояния чата. Сообщение недопустимого типа получает ответ
+    invalid_text, а чат остается в том же состоянии. Перед вызовом
+    обработчика состояние снимается: следующий шаг обработчик задает
+    сам через set(), как это было с register_next_step_handler.
+
+    Сессии с Redis-хранилищем сохраняют состояние вместе с данными
+    диалога, поэтому диалог продолжается после перезапуска бота и на
+    любой реплике.
+
+    Args:
+        telegram_bot (telebot.TeleBot): Бот для ответов на недопустимый ввод
+        store (SessionStore): Хранилище сессий
+    """
+
+    def __init__(self, telegram_bot, store):
+        self.bot = telegram_bot
+        self.store = store
+        self.states = {}
+        self.buttons = {}
+
+    def state(self, name, handler, content_types=('text',), invalid_text=None):
+        """Регистрирует состояние.
+
+        Args:
+            name (str): Имя состояния
+            handler (function): Обработчик handler(message, *args)
+            content_types (tuple): Допустимые типы сообщений
+            invalid_text (str): Ответ на сообщение недопустимого типа
+        """
+        self.states[name] = State(name, handler, tuple(content_types), invalid_text)
+
+    def button(self, text, handler):
+        """Регистрирует кнопку меню, работающую из любого состояния.
+
+        Args:
+            text (str): Текст кнопки
+            handler (function): Обработчик handler(message)
+        """
+        self.buttons[text] = handler
+
+    def set(self, chat_id, name, *args):
+        """Переводит чат в состояние.
+
+        Args:
+            chat_id (int): ID чата
+            name (str): Имя зарегистрированного состояния
+            *args: Сериализуемые аргументы обработчика
+        """
+        if name not in self.states:
+            raise ValueError(f"Неизвестное состояние: {name}")
+        self.store.get(chat_id).state = (name, args)
+
+    def get(self, chat_id):
+        """Возвращает текущее состояние чата.
+
+        Args:
+            chat_id (int): ID чата
+
+        Returns:
+            tuple: Имя состояния и его аргументы или None
+        """
+        session = self.store.peek(chat_id)
+        if session is None or session.state is None:
+            return None
+        name, args = session.state
+        # Состояние могло остаться от версии бота, где оно еще было
+        if name not in self.states:
+            return None
+        return name, tuple(args)
+
+    def clear(self, chat_id):
+        """Снимает состояние чата."""
+        session = self.store.peek(chat_id)
+        if session is not None:
+            session.state = None
+
+    def handle(self, message):
+        """Маршрутизирует входящее сообщение.
+
+        Args:
+            message (types.Message): Сообщение пользователя
+
+        Returns:
+            bool: True, если сообщение обработано кнопкой или состоянием
+        """
+        chat_id = message.chat.id
+        button = self.buttons.get(message.text) if message.text else None
+        if button is not None:
+            self.clear(chat_id)
+            button(message)
+            return True
+
+        current = self.get(chat_id)
+        if current is None:
+            return False
+        name, args = current
+        state = self.states[name]
+        if message.content_type not in state.content_types:
+            if state.invalid_text:
+                self.bot.send_message(chat_id, state.invalid_text)
+            return True
+
+        self.clear(chat_id)
+        state.handler(message, *args)
+        return True
+
+
+fsm = ConversationFSM(bot, sessions)
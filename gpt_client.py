@@ -0,0 +1,391 @@
+import asyncio
+import json
+
+import aiohttp
+
+from async_runtime import runtime
+from config import (
+    api_key,
+    log,
+    gpt_endpoint,
+    gpt_pool_size,
+    gpt_connect_timeout,
+    gpt_read_timeout,
+    gpt_max_attempts,
+    gpt_hedging,
+    gpt_breaker_threshold,
+    gpt_breaker_reset
+)
+from gpt_resilience import RETRYABLE_STATUSES, RetryPolicy, LatencyTracker, CircuitBreaker
+from gpt_routes import get_route, estimate_tokens
+from llm_cache import llm_cache, content_key
+from llm_scheduler import llm_scheduler
+from singleflight import SingleFlight
+
+# Пауза очереди после 429 без заголовка Retry-After
+DEFAULT_RATE_LIMIT_PAUSE = 1.0
+
+
+class StreamInterrupted(Exception):
+    """Поток ответа оборвался после того, как часть текста уже отдана."""
+
+
+def retry_after(headers, default=None):
+    """Читает паузу из заголовков ответа 429/503.
+
+    Args:
+        headers (Mapping): Заголовки ответа
+        default (float): Значение, если заголовков нет
+
+    Returns:
+        float: Пауза в секундах
+    """
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        if 'Retry-After' in headers:
+            return float(headers['Retry-After'])
+    except ValueError:
+        pass
+    return default
+
+
+def build_request(prompt, call_type, params):
+    """Собирает тело запроса по маршруту типа вызова.
+
+    Args:
+        prompt (str): Текст запроса к GPT
+        call_type (str): Тип вызова
+        params (dict): Переопределения параметров маршрута
+
+    Returns:
+        dict: Тело запроса к Chat Completions API
+    """
+    data = dict(get_route(call_type).params(), **params)
+    data['messages'] = [{'role': 'user', 'content': prompt}]
+    return data
+
+
+class GPTClient:
+    """Асинхронный клиент OpenAI с общим пулом keep-alive соединений.
+
+    Сессия живет в цикле общего рантайма, поэтому клиентом можно пользоваться
+    как из асинхронных обработчиков, так и из синхронных.
+    """
+
+    def __init__(self, endpoint, key, pool_size, connect_timeout, read_timeout,
+                 async_runtime=runtime, cache=None, scheduler=None,
+                 retry=None, breaker=None, hedge=False):
+        self.endpoint = endpoint
+        self.key = key
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(
+            total=None,
+            connect=connect_timeout,
+            sock_read=read_timeout
+        )
+        self.runtime = async_runtime
+        self.cache = cache
+        self.scheduler = scheduler
+        self.retry = retry or RetryPolicy(max_attempts=1)
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.latencies = {}
+        self.stats = {
+            'retries': 0,
+            'hedged': 0,
+            'hedge_wins': 0
+        }
+        self.flights = SingleFlight()
+        self._session = None
+        self.runtime.on_shutdown(self.aclose)
+
+    def _get_session(self):
+        """Возвращает общую HTTP-сессию, создавая ее при первом обращении.
+
+        Returns:
+            aiohttp.ClientSession: Сессия с пулом соединений
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={
+                    'Content-Type': 'application/json',
+                    'Authorization': f'Bearer {self.key}'
+                }
+            )
+        return self._session
+
+    async def _open(self, data, call_type):
+        """Дожидается очереди в планировщике и отправляет запрос.
+
+        Returns:
+            aiohttp.ClientResponse: Открытый ответ API
+        """
+        if self.scheduler is not None:
+            route = get_route(call_type)
+            tokens = estimate_tokens(data['messages'][0]['content']) + data['max_tokens']
+            await self.scheduler.acquire(route.priority, tokens)
+        return await self._get_session().post(self.endpoint, json=data)
+
+    def _on_error_status(self, response):
+        """Учитывает ошибочный статус ответа.
+
+        Returns:
+            float: Пауза из Retry-After или None
+        """
+        delay = retry_after(response.headers)
+        if response.status == 429 and self.scheduler is not None:
+            self.scheduler.pause(delay or DEFAULT_RATE_LIMIT_PAUSE)
+        if response.status in RETRYABLE_STATUSES or response.status >= 500:
+            self.breaker.record_failure()
+        else:
+            # Ошибка в самом запросе (400, 401, 404): API отвечает, цепь исправна
+            self.breaker.record_success()
+        return delay
+
+    async def _attempt(self, data, call_type):
+        """Одна попытка запроса без повторов.
+
+        Returns:
+            tuple: (ответ GPT или None, HTTP-статус или None при сетевой ошибке,
+                    пауза из Retry-After или None)
+        """
+        started = asyncio.get_running_loop().time()
+        try:
+            async with await self._open(data, call_type) as response:
+                if response.status == 200:
+                    response_data = await response.json()
+                    self.breaker.record_success()
+                    self._latency(call_type).record(asyncio.get_running_loop().time() - started)
+                    return response_data['choices'][0]['message']['content'], 200, None
+                log.error(f"GPT API error {response.status}: {await response.text()}")
+                return None, response.status, self._on_error_status(response)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.error(f"GPT API request failed: {e!r}")
+            self.breaker.record_failure()
+            return None, None, None
+
+    async def _hedged_attempt(self, data, call_type):
+        """Попытка с подстраховкой от долгого хвоста задержек.
+
+        Если первый запрос не ответил за p95 задержки этого типа вызова,
+        параллельно отправляется второй, и берется первый успешный ответ.
+        """
+        p95 = self._latency(call_type).percentile(0.95) if self.hedge else None
+        if p95 is None:
+            return await self._attempt(data, call_type)
+
+        primary = asyncio.ensure_future(self._attempt(data, call_type))
+        done, _ = await asyncio.wait({primary}, timeout=p95)
+        if done:
+            return primary.result()
+
+        self.stats['hedged'] += 1
+        backup = asyncio.ensure_future(self._attempt(data, call_type))
+        pending = {primary, backup}
+        result = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result[0] is not None:
+                    if task is backup:
+                        self.stats['hedge_wins'] += 1
+                    for other in pending:
+                        other.cancel()
+                    return result
+        return result
+
+    async def _post(self, data, call_type):
+        """Выполняет запрос к API с повторами и размыкателем цепи."""
+        for attempt in range(self.retry.max_attempts):
+            ticket = self.breaker.allow()
+            if not ticket:
+                log.warning("GPT circuit breaker is open, request rejected")
+                return None
+
+            try:
+                result, status, delay = await self._hedged_attempt(data, call_type)
+            finally:
+                # Отмененная проба без ответа не должна держать цепь полуоткрытой
+                self.breaker.release(ticket)
+            if result is not None:
+                return result
+            if status is not None and status not in RETRYABLE_STATUSES:
+                return None
+            if attempt + 1 < self.retry.max_attempts:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self.retry.delay(attempt, delay))
+        return None
+
+    def _latency(self, call_type):
+        if call_type not in self.latencies:
+            self.latencies[call_type] = LatencyTracker()
+        return self.latencies[call_type]
+
+    async def _complete(self, prompt, call_type, params):
+        """Возвращает ответ из кэша или запрашивает его у API.
+
+        Одновременные одинаковые запросы объединяются в один запрос к API.
+        """
+        data = build_request(prompt, call_type, params)
+        key = content_key(data)
+
+        if self.cache is None:
+            return await self.flights.do(key, lambda: self._post(data, call_type))
+
+        ttl = self.cache.ttl_for(call_type)
+        cache_key = self.cache.make_key(data)
+        result = await self.cache.aget(cache_key, ttl)
+        if result is not None:
+            return result
+
+        async def fetch():
+            response = await self._post(data, call_type)
+            if response is not None:
+                await self.cache.aset(cache_key, response, ttl)
+            return response
+
+        return await self.flights.do(key, fetch)
+
+    async def stream(self, prompt, call_type='default', **params):
+        """Запрашивает ответ в режиме потока (SSE) и отдает его по частям.
+
+        Генератор нужно потреблять внутри цикла рантайма. Ответ из кэша
+        отдается одним фрагментом, полный потоковый ответ сохраняется в кэш.
+        Если ответ не начался, генератор просто завершается; если поток
+        оборвался на середине, отданная часть неполная и поднимается
+        StreamInterrupted.
+
+        Args:
+            prompt (str): Текст запроса к GPT
+            call_type (str): Тип вызова, определяет модель, лимиты и TTL кэша
+            **params: Переопределения параметров запроса
+
+        Yields:
+            str: Очередной фрагмент текста ответа
+
+        Raises:
+            StreamInterrupted: Соединение оборвалось или поток закончился без [DONE]
+        """
+        data = build_request(prompt, call_type, params)
+
+        key = ttl = None
+        if self.cache is not None:
+            ttl = self.cache.ttl_for(call_type)
+            key = self.cache.make_key(data)
+            cached = await self.cache.aget(key, ttl)
+            if cached is not None:
+                yield cached
+                return
+
+        ticket = self.breaker.allow()
+        if not ticket:
+            log.warning("GPT circuit breaker is open, stream rejected")
+            return
+
+        parts = []
+        finished = False
+        try:
+            async with await self._open(dict(data, stream=True), call_type) as response:
+                if response.status != 200:
+                    log.error(f"GPT API error {response.status}: {await response.text()}")
+                    self._on_error_status(response)
+                    return
+                self.breaker.record_success()
+                async for line in response.content:
+                    line = line.strip()
+                    if not line.startswith(b'data:'):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == b'[DONE]':
+                        finished = True
+                        break
+                    choices = json.loads(payload).get('choices') or [{}]
+                    delta = choices[0].get('delta', {}).get('content')
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.error(f"GPT API stream failed: {e!r}")
+            self.breaker.record_failure()
+            if parts:
+                raise StreamInterrupted("Ответ GPT оборвался") from e
+            return
+        finally:
+            self.breaker.release(ticket)
+
+        if not finished:
+            log.error("GPT API stream ended before [DONE]")
+            if parts:
+                raise StreamInterrupted("Ответ GPT оборвался")
+            return
+        if key is not None and parts:
+            await self.cache.aset(key, ''.join(parts), ttl)
+
+    def submit(self, prompt, call_type='default', **params):
+        """Ставит запрос в цикл рантайма из стороннего потока.
+
+        Args:
+            prompt (str): Текст запроса к GPT
+            call_type (str): Тип вызова, определяет модель, лимиты и TTL кэша
+            **params: Переопределения параметров запроса (model, max_tokens, ...)
+
+        Returns:
+            concurrent.futures.Future: Будущий ответ GPT или None при ошибке
+        """
+        return self.runtime.submit(self._complete(prompt, call_type, params))
+
+    async def complete(self, prompt, call_type='default', **params):
+        """Отправляет запрос к GPT, не блокируя вызывающий цикл.
+
+        Args:
+            prompt (str): Текст запроса к GPT
+            call_type (str): Тип вызова, определяет модель, лимиты и TTL кэша
+            **params: Переопределения параметров запроса
+
+        Returns:
+            str: Ответ от GPT или None в случае ошибки
+        """
+        if self.runtime.in_loop():
+            return await self._complete(prompt, call_type, params)
+        return await asyncio.wrap_future(self.submit(prompt, call_type, **params))
+
+    def complete_sync(self, prompt, call_type='default', **params):
+        """Синхронная обертка над complete для обработчиков без цикла.
+
+        Args:
+            prompt (str): Текст запроса к GPT
+            call_type (str): Тип вызова, определяет модель, лимиты и TTL кэша
+            **params: Переопределения параметров запроса
+
+        Returns:
+            str: Ответ от GPT или None в случае ошибки
+        """
+        return self.submit(prompt, call_type, **params).result()
+
+    async def aclose(self):
+        """Закрывает сессию и освобождает соединения пула."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+gpt_client = GPTClient(
+    gpt_endpoint,
+    api_key,
+    gpt_pool_size,
+    gpt_connect_timeout,
+    gpt_read_timeout,
+    cache=llm_cache,
+    scheduler=llm_scheduler,
+    retry=RetryPolicy(gpt_max_attempts),
+    breaker=CircuitBreaker(gpt_breaker_threshold, gpt_breaker_reset),
+    hedge=gpt_hedging
+)
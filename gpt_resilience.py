@@ -0,0 +1,159 @@
+import random
+import threading
+import time
+from collections import deque
+
+from config import log
+
+# Статусы, после которых запрос имеет смысл повторить
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """Экспоненциальные повторы с полным джиттером.
+
+    Args:
+        max_attempts (int): Сколько всего попыток делать
+        base (float): Базовая задержка в секундах
+        cap (float): Максимальная задержка в секундах
+    """
+
+    def __init__(self, max_attempts=4, base=0.5, cap=20.0):
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt, retry_after=None):
+        """Вычисляет паузу перед следующей попыткой.
+
+        Args:
+            attempt (int): Номер неудачной попытки, начиная с 0
+            retry_after (float): Пауза, которую попросил сервер
+
+        Returns:
+            float: Пауза в секундах, не меньше retry_after
+        """
+        jitter = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        if retry_after is not None:
+            return max(retry_after, jitter)
+        return jitter
+
+
+class LatencyTracker:
+    """Скользящее окно длительностей успешных запросов.
+
+    Args:
+        window (int): Сколько последних замеров хранить
+        min_samples (int): Сколько замеров нужно для оценки перцентиля
+    """
+
+    def __init__(self, window=200, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds):
+        """Добавляет длительность запроса в окно."""
+        self.samples.append(seconds)
+
+    def percentile(self, q):
+        """Возвращает перцентиль длительности.
+
+        Args:
+            q (float): Перцентиль от 0 до 1
+
+        Returns:
+            float: Длительность в секундах или None, если замеров мало
+        """
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class CircuitBreaker:
+    """Размыкатель цепи для API OpenAI.
+
+    После failure_threshold ошибок подряд цепь размыкается, и запросы
+    сразу отклоняются. Через reset_timeout секунд пропускается один
+    пробный запрос: успех замыкает цепь, ошибка снова размыкает. allow()
+    возвращает пробному запросу его метку; если проба закончилась без
+    ответа (например, была отменена), release() с этой меткой освобождает
+    место для следующей пробы. Запросы, пропущенные до размыкания, пробу
+    не снимают.
+
+    Args:
+        failure_threshold (int): Ошибок подряд до размыкания
+        reset_timeout (float): Сколько секунд цепь остается разомкнутой
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        # Метка текущего пробного запроса
+        self.probe = None
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Проверяет, можно ли отправить запрос.
+
+        Returns:
+            False, если цепь разомкнута; метка пробного запроса для
+            release(), если запрос пробный; иначе True
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and self.probe is None:
+                self.probe = object()
+                return self.probe
+            self.rejected += 1
+            return False
+
+    @property
+    def is_open(self):
+        """bool: True, если запросы сейчас отклоняются."""
+        return self.state != self.CLOSED
+
+    def record_success(self):
+        """Отмечает успешный запрос и замыкает цепь."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                log.info("GPT circuit breaker closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe = None
+
+    def record_failure(self):
+        """Отмечает ошибку и при превышении порога размыкает цепь."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    log.warning(f"GPT circuit breaker opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self.probe = None
+
+    def release(self, ticket):
+        """Снимает пробный запрос, который закончился без успеха и без ошибки.
+
+        Снимается только проба с этой меткой: после record_success,
+        record_failure или для обычного запроса вызов ничего не меняет,
+        поэтому его можно делать в finally после любого запроса.
+
+        Args:
+            ticket: Результат allow() для этого запроса
+        """
+        with self._lock:
+            if ticket is self.probe:
+                self.probe = None
@@ -0,0 +1,114 @@
+import re
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from llm_scheduler import INTERACTIVE, NORMAL, BATCH
+
+
+@dataclass(frozen=True)
+class Route:
+    """Параметры запроса к GPT для одного типа вызова.
+
+    Attributes:
+        model (str): Модель OpenAI
+        max_tokens (int): Ограничение длины ответа
+        temperature (float): Температура сэмплирования
+        stop (tuple): Стоп-последовательности или None
+        max_input_tokens (int): Бюджет на крупные входные тексты (резюме, вакансия)
+        priority (int): Класс приоритета в очереди планировщика
+    """
+    model: str = 'gpt-4o-mini'
+    max_tokens: int = 3000
+    temperature: float = 0.6
+    stop: Optional[Tuple[str, ...]] = None
+    max_input_tokens: int = 6000
+    priority: int = NORMAL
+
+    def params(self):
+        """Возвращает параметры тела запроса к API.
+
+        Returns:
+            dict: model, max_tokens, temperature, top_p и stop
+        """
+        data = {
+            'model': self.model,
+            'max_tokens': self.max_tokens,
+            'top_p': 1.0,
+            'temperature': self.temperature
+        }
+        if self.stop:
+            data['stop'] = list(self.stop)
+        return data
+
+
+# Таблица маршрутизации по типам вызовов
+GPT_ROUTES = {
+    'completeness': Route(max_tokens=3, temperature=0.0, stop=('\n',), priority=INTERACTIVE),
+    'ask_follow_up': Route(max_tokens=250, temperature=0.7, stop=('\n\n',), priority=INTERACTIVE),
+    'compile': Route(max_tokens=500, temperature=0.3, priority=BATCH),
+    'resume_proj': Route(max_tokens=600, temperature=0.4, priority=BATCH),
+    'generate_questions': Route(max_tokens=700, temperature=0.6, max_input_tokens=2500),
+    'analyze_interview': Route(max_tokens=1500, temperature=0.5, priority=BATCH),
+    'cover_letter': Route(max_tokens=1200, temperature=0.7, max_input_tokens=2500),
+    'default': Route()
+}
+
+_CYRILLIC = re.compile(r'[а-яА-ЯёЁ]')
+
+
+def get_route(call_type):
+    """Возвращает маршрут для типа вызова.
+
+    Args:
+        call_type (str): Тип вызова
+
+    Returns:
+        Route: Параметры запроса, для неизвестных типов - маршрут по умолчанию
+    """
+    return GPT_ROUTES.get(call_type, GPT_ROUTES['default'])
+
+
+def estimate_tokens(text):
+    """Грубо оценивает число токенов в тексте без токенизатора.
+
+    Кириллица кодируется плотнее латиницы, поэтому считается отдельно.
+
+    Args:
+        text (str): Текст
+
+    Returns:
+        int: Оценка количества токенов
+    """
+    cyrillic = len(_CYRILLIC.findall(text))
+    return int(cyrillic / 2.5 + (len(text) - cyrillic) / 4) + 1
+
+
+def trim_to_tokens(text, max_tokens):
+    """Обрезает текст до примерного бюджета токенов по границе слова.
+
+    Args:
+        text (str): Исходный текст
+        max_tokens (int): Бюджет токенов
+
+    Returns:
+        str: Текст, укладывающийся в бюджет
+    """
+    estimated = estimate_tokens(text)
+    if estimated <= max_tokens:
+        return text
+    limit = int(len(text) * max_tokens / estimated)
+    cut = text.rfind(' ', 0, limit)
+    return text[:cut if cut > 0 else limit].rstrip() + ' …'
+
+
+def trim_for(call_type, text):
+    """Обрезает крупный входной текст под бюджет маршрута.
+
+    Args:
+        call_type (str): Тип вызова
+        text (str): Входной текст (резюме, описание вакансии)
+
+    Returns:
+        str: Текст, укладывающийся в max_input_tokens маршрута
+    """
+    return trim_to_tokens(text, get_route(call_type).max_input_tokens)
@@ -0,0 +1,393 @@
+import asyncio
+import contextvars
+import json
+import time
+import uuid
+
+import redis
+
+from async_runtime import runtime
+from config import log, redis_client, job_workers, job_max_attempts, job_ttl, job_owner, job_lease_ttl
+from gpt_resilience import RetryPolicy
+
+# Сколько секунд не обращаться к Redis после ошибки соединения
+REDIS_RETRY_AFTER = 30
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Задача, которую выполняет текущий воркер
+_current_job = contextvars.ContextVar('current_job', default=None)
+
+
+class JobQueue:
+    """Очередь фоновых задач с пулом воркеров в цикле рантайма.
+
+    Обработчик Telegram ставит задачу и сразу возвращается, а результат
+    пользователю отправляет воркер. Задачи хранятся в Redis: после
+    перезапуска бота незавершенные (в том числе прерванные на середине)
+    выполняются заново. Без Redis очередь работает только в памяти.
+
+    Каждая задача принадлежит реплике, которая ее поставила или забрала.
+    Реплика продлевает свою аренду в Redis каждые lease_ttl / 3 секунд и
+    забирает чужие незавершенные задачи, только когда аренда их владельца
+    истекла, поэтому перезапуск одной реплики не повторяет задачи,
+    которые выполняют другие.
+
+    Payload задачи должен быть JSON-сериализуемым и содержать все данные,
+    нужные обработчику: словари бота после перезапуска пусты.
+
+    Задача выполняется хотя бы один раз, поэтому при повторе обработчик
+    начинается заново. Шаги с внешним эффектом (сообщения пользователю,
+    дорогие запросы) обработчик оборачивает в once(): выполненный шаг и
+    его результат записываются в задачу и при повторе не выполняются
+    второй раз. Упавший на середине шаг повторяется целиком.
+
+    Args:
+        redis_conn (redis.Redis): Соединение с Redis или None
+        workers (int): Число воркеров
+        max_attempts (int): Попыток на задачу по умолчанию
+        async_runtime (AsyncRuntime): Рантайм, в цикле которого работают воркеры
+        retry (RetryPolicy): Паузы между попытками
+        ttl (int): Сколько секунд хранить завершенные задачи в Redis
+        owner (str): Имя реплики; у разных живых реплик должно различаться
+        lease_ttl (float): Через сколько секунд без продления аренды задачи
+                           реплики может забрать другая
+    """
+
+    def __init__(self, redis_conn, workers, max_attempts, async_runtime=runtime,
+                 retry=None, ttl=24 * 3600, namespace='jobs', owner=job_owner, lease_ttl=60):
+        self.redis = redis_conn
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.runtime = async_runtime
+        self.retry = retry or RetryPolicy(max_attempts, base=2.0, cap=60.0)
+        self.ttl = ttl
+        self.namespace = namespace
+        self.owner = owner
+        self.lease_ttl = lease_ttl
+        self.handlers = {}
+        self.jobs = {}
+        self.stats = {'enqueued': 0, 'done': 0, 'failed': 0, 'retried': 0, 'recovered': 0}
+        self._queue = None
+        self._tasks = []
+        self._redis_down_until = 0.0
+        async_runtime.on_shutdown(self.stop)
+
+    def register(self, kind, handler, on_failure=None):
+        """Регистрирует обработчик задач одного типа.
+
+        Args:
+            kind (str): Тип задачи
+            handler (function): Корутинная функция handler(chat_id, **payload)
+            on_failure (function): Корутинная функция on_failure(chat_id),
+                                   вызывается, когда попытки исчерпаны
+        """
+        self.handlers[kind] = (handler, on_failure)
+
+    def start(self):
+        """Запускает воркеры и возвращает в очередь незавершенные задачи из Redis."""
+        if self._queue is not None:
+            return
+        loop = self.runtime.start()
+        if self.runtime.in_loop():
+            raise RuntimeError("start() нужно вызывать до обработки сообщений")
+        asyncio.run_coroutine_threadsafe(self._start(), loop).result()
+
+    async def _start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._renew_lease)
+        await self._recover()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._heartbeat()))
+
+    async def stop(self):
+        """Останавливает воркеры; прерванные задачи продолжатся после перезапуска.
+
+        Аренда реплики снимается сразу, чтобы ее задачи могла забрать другая.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        await asyncio.get_running_loop().run_in_executor(None, self._drop_lease)
+
+    async def _recover(self):
+        recovered = await asyncio.get_running_loop().run_in_executor(None, self._claim_orphans)
+        for job in recovered:
+            self.jobs[job['id']] = job
+            self._queue.put_nowait(job['id'])
+        self.stats['recovered'] += len(recovered)
+        if recovered:
+            log.info(f"Восстановлено фоновых задач: {len(recovered)}")
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        last_scan = loop.time()
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            await loop.run_in_executor(None, self._renew_lease)
+            # Задачи упавших реплик, которые не перезапустились, забирает любая живая
+            if loop.time() - last_scan >= self.lease_ttl:
+                last_scan = loop.time()
+                await self._recover()
+
+    def enqueue(self, kind, chat_id, payload=None, max_attempts=None):
+        """Ставит задачу в очередь.
+
+        Можно вызывать и из потоков бота, и из цикла рантайма. Из потока
+        вызов возвращается после сохранения задачи в Redis.
+
+        Args:
+            kind (str): Тип задачи
+            chat_id (int): ID чата, которому предназначен результат
+            payload (dict): Аргументы обработчика
+            max_attempts (int): Попыток для этой задачи
+
+        Returns:
+            str: ID задачи
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Неизвестный тип задачи: {kind}")
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'chat_id': chat_id,
+            'payload': payload or {},
+            'status': QUEUED,
+            'attempts': 0,
+            'max_attempts': max_attempts or self.max_attempts,
+            'created': time.time(),
+            'owner': self.owner,
+            'steps': {},
+            'error': None
+        }
+        self.jobs[job['id']] = job
+        self.stats['enqueued'] += 1
+
+        if self.runtime.in_loop():
+            asyncio.ensure_future(self._put(job))
+        else:
+            self.start()
+            asyncio.run_coroutine_threadsafe(self._put(job), self.runtime.loop).result()
+        return job['id']
+
+    async def _put(self, job):
+        if self._queue is None:
+            await self._start()
+        await self._save(job)
+        self._queue.put_nowait(job['id'])
+
+    def status(self, job_id):
+        """Возвращает состояние задачи.
+
+        Args:
+            job_id (str): ID задачи
+
+        Returns:
+            dict: Копия задачи (status, attempts, error, ...) или None
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            job = self._load(job_id)
+        return dict(job) if job else None
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            handler, on_failure = self.handlers[job['kind']]
+            job['status'] = RUNNING
+            job['attempts'] += 1
+            await self._save(job)
+            job.setdefault('steps', {})
+            token = _current_job.set(job)
+            try:
+                await handler(job['chat_id'], **job['payload'])
+            except asyncio.CancelledError:
+                # Задача остается в статусе running и выполнится после перезапуска
+                raise
+            except Exception as e:
+                log.error(f"Job {job['kind']} {job_id} failed (attempt {job['attempts']}): {e}")
+                job['error'] = str(e)
+                await self._failed(job, on_failure)
+            else:
+                job['status'] = DONE
+                job['error'] = None
+                await self._save(job)
+                self.stats['done'] += 1
+                self.jobs.pop(job_id, None)
+            finally:
+                _current_job.reset(token)
+
+    async def once(self, step, action):
+        """Выполняет шаг текущей задачи один раз за все ее попытки.
+
+        Вне задачи воркера шаг просто выполняется.
+
+        Args:
+            step (str): Имя шага, уникальное внутри обработчика
+            action (function): Корутинная функция без аргументов; ее
+                               результат должен быть JSON-сериализуемым
+
+        Returns:
+            Результат action, при повторе задачи - записанный в прошлой попытке
+        """
+        job = _current_job.get()
+        if job is None:
+            return await action()
+        if step in job['steps']:
+            return job['steps'][step]
+        result = await action()
+        job['steps'][step] = result
+        await self._save(job)
+        return result
+
+    async def _failed(self, job, on_failure):
+        if job['attempts'] < job['max_attempts']:
+            job['status'] = QUEUED
+            self.stats['retried'] += 1
+            await self._save(job)
+            delay = self.retry.delay(job['attempts'] - 1)
+            asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job['id'])
+            return
+
+        job['status'] = FAILED
+        self.stats['failed'] += 1
+        await self._save(job)
+        self.jobs.pop(job['id'], None)
+        if on_failure is not None:
+            try:
+                await on_failure(job['chat_id'])
+            except Exception as e:
+                log.error(f"Error in job failure handler: {e}")
+
+    def _key(self, job_id):
+        return f"{self.namespace}:{job_id}"
+
+    def _redis_available(self):
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e):
+        log.warning(f"Redis job store unavailable: {e}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    def _save_sync(self, job):
+        if not self._redis_available():
+            return
+        unfinished = f"{self.namespace}:unfinished"
+        try:
+            pipe = self.redis.pipeline()
+            if job['status'] in (DONE, FAILED):
+                pipe.set(self._key(job['id']), json.dumps(job, ensure_ascii=False), ex=self.ttl)
+                pipe.srem(unfinished, job['id'])
+            else:
+                pipe.set(self._key(job['id']), json.dumps(job, ensure_ascii=False))
+                pipe.sadd(unfinished, job['id'])
+            pipe.execute()
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    async def _save(self, job):
+        await asyncio.get_running_loop().run_in_executor(None, self._save_sync, dict(job))
+
+    def _load(self, job_id):
+        if not self._redis_available():
+            return None
+        try:
+            raw = self.redis.get(self._key(job_id))
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return None
+        return json.loads(raw) if raw else None
+
+    def _lease_key(self, owner):
+        return f"{self.namespace}:lease:{owner}"
+
+    def _renew_lease(self):
+        if not self._redis_available():
+            return
+        try:
+            self.redis.set(self._lease_key(self.owner), int(time.time()), px=int(self.lease_ttl * 1000))
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    def _drop_lease(self):
+        if not self._redis_available():
+            return
+        try:
+            self.redis.delete(self._lease_key(self.owner))
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    def _claim(self, job_id):
+        """Забирает задачу, если ее владелец больше не продлевает аренду.
+
+        Задачи с тем же owner оставлены прошлым запуском этой же реплики.
+        Ключ задачи отслеживается WATCH, поэтому из двух реплик, которые
+        одновременно забирают одну задачу, ее получит только одна.
+
+        Returns:
+            dict: Забранная задача или None
+        """
+        key = self._key(job_id)
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                raw = pipe.get(key)
+                if not raw:
+                    return None
+                job = json.loads(raw)
+                owner = job.get('owner')
+                if job['kind'] not in self.handlers:
+                    return None
+                if owner not in (None, self.owner) and pipe.exists(self._lease_key(owner)):
+                    return None
+                job['owner'] = self.owner
+                job['status'] = QUEUED
+                pipe.multi()
+                pipe.set(key, json.dumps(job, ensure_ascii=False))
+                pipe.execute()
+            except redis.WatchError:
+                return None
+        return job
+
+    def _claim_orphans(self):
+        if not self._redis_available():
+            return []
+        jobs = []
+        try:
+            for job_id in self.redis.smembers(f"{self.namespace}:unfinished"):
+                job_id = job_id.decode('utf-8')
+                if job_id in self.jobs:
+                    continue
+                job = self._claim(job_id)
+                if job is not None:
+                    jobs.append(job)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+        return sorted(jobs, key=lambda job: job['created'])
+
+    def snapshot(self):
+        """Возвращает метрики очереди.
+
+        Returns:
+            dict: Счетчики задач, длина очереди и число задач в работе
+        """
+        running = sum(1 for job in self.jobs.values() if job['status'] == RUNNING)
+        return dict(
+            self.stats,
+            queue_depth=self._queue.qsize() if self._queue is not None else 0,
+            running=running
+        )
+
+
+jobs = JobQueue(redis_client, job_workers, job_max_attempts, ttl=job_ttl, lease_ttl=job_lease_ttl)
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+
+from config import log, redis_client, llm_cache_l1_entries, llm_cache_l1_bytes
+
+# Время жизни ответов GPT в кэше по типу вызова (в секундах).
+# 0 отключает кэширование для типа.
+LLM_CACHE_TTLS = {
+    'completeness': 24 * 3600,
+    'ask_follow_up': 3600,
+    'compile': 24 * 3600,
+    'resume_proj': 24 * 3600,
+    'generate_questions': 24 * 3600,
+    'analyze_interview': 6 * 3600,
+    'cover_letter': 6 * 3600,
+    'default': 3600
+}
+
+# Сколько секунд не обращаться к Redis после ошибки соединения
+REDIS_RETRY_AFTER = 30
+
+
+def content_key(*parts):
+    """Вычисляет хэш содержимого запроса.
+
+    Args:
+        *parts: JSON-сериализуемые части ключа (модель, параметры, промпт)
+
+    Returns:
+        str: SHA-256 в шестнадцатеричном виде
+    """
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class TieredCache:
+    """Двухуровневый кэш строк: LRU в памяти процесса перед Redis.
+
+    L1 ограничен и по числу записей, и по суммарному размеру значений.
+    L2 хранит записи в Redis с TTL, вытеснение там выполняет сам Redis.
+    Если Redis недоступен, кэш продолжает работать только на L1.
+    """
+
+    def __init__(self, namespace, redis_conn, max_entries, max_bytes, ttls=None):
+        self.namespace = namespace
+        self.redis = redis_conn
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = ttls or {}
+        self._l1 = OrderedDict()
+        self._l1_bytes = 0
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+        self.stats = {
+            'hits_l1': 0,
+            'hits_l2': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0
+        }
+
+    def make_key(self, *parts):
+        """Строит ключ кэша из хэша содержимого.
+
+        Args:
+            *parts: JSON-сериализуемые части ключа (модель, параметры, промпт)
+
+        Returns:
+            str: Ключ вида '<namespace>:<sha256>'
+        """
+        return f"{self.namespace}:{content_key(*parts)}"
+
+    def ttl_for(self, call_type):
+        """Возвращает TTL для типа вызова.
+
+        Args:
+            call_type (str): Тип вызова
+
+        Returns:
+            int: Время жизни записи в секундах
+        """
+        return self.ttls.get(call_type, self.ttls.get('default', 0))
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                self._l1_pop(key)
+                return None
+            self._l1.move_to_end(key)
+            return value
+
+    def _l1_pop(self, key):
+        value, _ = self._l1.pop(key)
+        self._l1_bytes -= len(value)
+
+    def _l1_set(self, key, value, ttl):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._l1:
+                self._l1_pop(key)
+            self._l1[key] = (value, time.monotonic() + ttl)
+            self._l1_bytes += size
+            while len(self._l1) > self.max_entries or self._l1_bytes > self.max_bytes:
+                self._l1_pop(next(iter(self._l1)))
+                self.stats['evictions'] += 1
+
+    def _redis_available(self):
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e):
+        log.warning(f"Redis cache unavailable: {e}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    def _l2_get(self, key):
+        if not self._redis_available():
+            return None
+        try:
+            value = self.redis.get(key)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return None
+        return value.decode('utf-8') if value is not None else None
+
+    def _l2_set(self, key, value, ttl):
+        if not self._redis_available():
+            return
+        try:
+            self.redis.set(key, value.encode('utf-8'), ex=ttl)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    def get(self, key, ttl=3600):
+        """Ищет значение сначала в L1, затем в Redis.
+
+        Args:
+            key (str): Ключ кэша
+            ttl (int): TTL для записи в L1 при подъеме значения из Redis
+
+        Returns:
+            str: Значение или None, если его нет в кэше
+        """
+        value = self._l1_get(key)
+        if value is not None:
+            self.stats['hits_l1'] += 1
+            return value
+        value = self._l2_get(key)
+        if value is not None:
+            self.stats['hits_l2'] += 1
+            self._l1_set(key, value, ttl)
+            return value
+        self.stats['misses'] += 1
+        return None
+
+    def set(self, key, value, ttl):
+        """Сохраняет значение в оба уровня кэша.
+
+        Args:
+            key (str): Ключ кэша
+            value (str): Значение
+            ttl (int): Время жизни в секундах
+        """
+        if ttl <= 0:
+            return
+        self.stats['sets'] += 1
+        self._l1_set(key, value, ttl)
+        self._l2_set(key, value, ttl)
+
+    async def aget(self, key, ttl=3600):
+        """Асинхронная версия get: обращение к Redis уходит в пул потоков."""
+        value = self._l1_get(key)
+        if value is not None:
+            self.stats['hits_l1'] += 1
+            return value
+        value = await asyncio.get_running_loop().run_in_executor(None, self._l2_get, key)
+        if value is not None:
+            self.stats['hits_l2'] += 1
+            self._l1_set(key, value, ttl)
+            return value
+        self.stats['misses'] += 1
+        return None
+
+    async def aset(self, key, value, ttl):
+        """Асинхронная версия set: обращение к Redis уходит в пул потоков."""
+        if ttl <= 0:
+            return
+        self.stats['sets'] += 1
+        self._l1_set(key, value, ttl)
+        await asyncio.get_running_loop().run_in_executor(None, self._l2_set, key, value, ttl)
+
+    def snapshot(self):
+        """Возвращает счетчики кэша.
+
+        Returns:
+            dict: Попадания по уровням, промахи, вытеснения и размер L1
+        """
+        with self._lock:
+            return dict(self.stats, l1_entries=len(self._l1), l1_bytes=self._l1_bytes)
+
+
+llm_cache = TieredCache(
+    'llm',
+    redis_client,
+    llm_cache_l1_entries,
+    llm_cache_l1_bytes,
+    LLM_CACHE_TTLS
+)
@@ -0,0 +1,171 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from config import log, gpt_rpm, gpt_tpm
+
+# Классы приоритета: чем меньше число, тем раньше запрос уходит в API
+INTERACTIVE = 0
+NORMAL = 1
+BATCH = 2
+
+PRIORITY_NAMES = {
+    INTERACTIVE: 'interactive',
+    NORMAL: 'normal',
+    BATCH: 'batch'
+}
+
+
+class TokenBucket:
+    """Ведро токенов с непрерывным пополнением.
+
+    Args:
+        rate_per_minute (float): Скорость пополнения в единицах в минуту
+        burst_seconds (float): Емкость ведра в секундах пополнения
+    """
+
+    def __init__(self, rate_per_minute, burst_seconds=10):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(self.rate * burst_seconds, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Возвращает, сколько секунд ждать, пока в ведре наберется amount.
+
+        Args:
+            amount (float): Требуемое количество; больше емкости не бывает
+
+        Returns:
+            float: 0, если можно списывать сразу
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        """Списывает amount из ведра (без проверки, см. wait_time)."""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class LLMScheduler:
+    """Общая очередь запросов к GPT с приоритетами и лимитами RPM/TPM.
+
+    Запрос ждет в очереди, пока в обоих ведрах не хватит места, а
+    интерактивные запросы обгоняют пакетные. После ответа 429 очередь
+    ставится на паузу на время Retry-After, запросы при этом копятся,
+    а не падают. Используется из одного событийного цикла.
+    """
+
+    def __init__(self, rpm, tpm):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._queue = []
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        self._paused_until = 0.0
+        self.stats = {
+            'granted': 0,
+            'throttled': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0
+        }
+
+    @property
+    def queue_depth(self):
+        """int: Количество запросов, ожидающих отправки."""
+        return len(self._queue)
+
+    async def acquire(self, priority, tokens):
+        """Ждет своей очереди на отправку запроса.
+
+        Args:
+            priority (int): INTERACTIVE, NORMAL или BATCH
+            tokens (int): Оценка токенов запроса (промпт + max_tokens)
+
+        Returns:
+            float: Сколько секунд запрос провел в очереди
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), tokens, time.monotonic(), future))
+        self._kick(loop)
+        return await future
+
+    def pause(self, seconds):
+        """Приостанавливает отправку после ответа 429.
+
+        Args:
+            seconds (float): Время паузы, обычно из заголовка Retry-After
+        """
+        self.stats['throttled'] += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        log.warning(f"GPT rate limit hit, pausing queue for {seconds:.1f}s")
+
+    def _kick(self, loop):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while self._queue:
+            self._wakeup.clear()
+            priority, _, tokens, enqueued_at, future = self._queue[0]
+            if future.cancelled():
+                heapq.heappop(self._queue)
+                continue
+
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens)
+            )
+            if wait > 0:
+                # Новый запрос с более высоким приоритетом прерывает ожидание
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            waited = time.monotonic() - enqueued_at
+            self.stats['granted'] += 1
+            self.stats['wait_total'] += waited
+            self.stats['wait_max'] = max(self.stats['wait_max'], waited)
+            future.set_result(waited)
+
+    def snapshot(self):
+        """Возвращает метрики очереди.
+
+        Returns:
+            dict: Глубина очереди (всего и по классам), число выданных слотов,
+                  число пауз из-за 429, среднее и максимальное ожидание
+        """
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for item in self._queue:
+            depth[PRIORITY_NAMES.get(item[0], str(item[0]))] += 1
+        granted = self.stats['granted']
+        return dict(
+            self.stats,
+            queue_depth=self.queue_depth,
+            queue_by_priority=depth,
+            wait_avg=self.stats['wait_total'] / granted if granted else 0.0
+        )
+
+
+llm_scheduler = LLMScheduler(gpt_rpm, gpt_tpm)
@@ -1,25 +1,25 @@
-from config import bot, log
+from async_runtime import runtime
+from config import bot, log, bot_mode, dispatch_shards
+from dispatcher import ShardedDispatcher
+from fsm import fsm, ALL_CONTENT_TYPES, MAIN_MENU_TEXT
+from jobs import jobs
+from outbox import install_outbox
+from sessions import sessions
+from webhook import run_webhook
 from bots_functions import (
     create_main_menu,
     cover_letter_start,
     resume_bot_start,
     ai_interviewer_start,
     parser_start,
-    async_handler,
-    user_summary,
-    ask_questions_X,
-    ask_questions_Y,
-    ask_questions_Z,
-    user_achievements,
-    user_skills,
     return_to_main_menu,
-    current_mode,
     restart_cover_letter,
     restart_resume_bot,
     restart_ai_interviewer,
-    restart_parser
+    restart_parser,
+    start_project,
+    in_chat_order
 )
-from bots_dicts import *
 
 
 @bot.message_handler(commands=['start'])
@@ -46,7 +46,6 @@ def start(message):
     )
 
 
-@bot.message_handler(func=lambda message: message.text == "📝 Сопроводительное письмо")
 def cover_letter_mode(message):
     """Обработчик выбора режима создания сопроводительного письма.
     
@@ -57,7 +56,6 @@ def cover_letter_mode(message):
     cover_letter_start(message)
 
 
-@bot.message_handler(func=lambda message: message.text == "📄 Резюме")
 def resume_mode(message):
     """Обработчик выбора режима создания резюме.
     
@@ -68,7 +66,6 @@ def resume_mode(message):
     resume_bot_start(message)
 
 
-@bot.message_handler(func=lambda message: message.text == "🤖 AI Интервьюер")
 def ai_interviewer_mode(message):
     """Обработчик выбора режима AI интервьюера.
     
@@ -79,7 +76,6 @@ def ai_interviewer_mode(message):
     ai_interviewer_start(message)
 
 
-@bot.message_handler(func=lambda message: message.text == "🔍 Парсер вакансий")
 def parser_mode(message):
     """Обработчик выбора режима парсера вакансий.
     
@@ -90,7 +86,6 @@ def parser_mode(message):
     parser_start(message)
 
 
-@bot.message_handler(func=lambda message: message.text == "🏠 Главное меню")
 def main_menu_handler(message):
     """Обработчик возврата в главное меню.
     
@@ -100,7 +95,6 @@ def main_menu_handler(message):
     return_to_main_menu(message)
 
 
-@bot.message_handler(func=lambda message: message.text == "🔄 Рестарт")
 def restart_handler(message):
     """Обработчик кнопки рестарта.
     
@@ -109,8 +103,9 @@ def restart_handler(message):
     """
     log.info(f"User {message.from_user.id} pressed restart button")
     
-    # Определяем текущий режим из словаря
-    current = current_mode.get(message.from_user.id)
+    # Определяем текущий режим из сессии
+    session = sessions.peek(message.chat.id)
+    current = session.mode if session is not None else None
     
     if current == "cover_letter":
         restart_cover_letter(message)
@@ -125,12 +120,31 @@ def restart_handler(message):
         return_to_main_menu(message)
 
 
-user_summary_async = async_handler(user_summary)
-ask_questions_X_async = async_handler(ask_questions_X)
-ask_questions_Y_async = async_handler(ask_questions_Y)
-ask_questions_Z_async = async_handler(ask_questions_Z)
-user_achievements_async = async_handler(user_achievements)
-user_skills_async = async_handler(user_skills)
+# Кнопки меню работают из любого состояния диалога
+fsm.button("📝 Сопроводительное письмо", cover_letter_mode)
+fsm.button("📄 Резюме", resume_mode)
+fsm.button("🤖 AI Интервьюер", ai_interviewer_mode)
+fsm.button("🔍 Парсер вакансий", parser_mode)
+fsm.button(MAIN_MENU_TEXT, main_menu_handler)
+fsm.button("🔄 Рестарт", restart_handler)
+
+
+@bot.message_handler(content_types=ALL_CONTENT_TYPES)
+def route_message(message):
+    """Передает сообщение автомату диалогов: кнопке меню или текущему шагу.
+
+    Сессия чата загружается до обработки и сохраняется после нее.
+    Пока асинхронный обработчик чата не завершился, сообщение ждет его.
+
+    Args:
+        message (types.Message): Объект сообщения от пользователя
+    """
+    in_chat_order(message.chat.id, handle_message, message)
+
+
+def handle_message(message):
+    with sessions.update(message.chat.id):
+        fsm.handle(message)
 
 
 @bot.callback_query_handler(func=lambda callback: True)
@@ -138,16 +152,16 @@ def callback_message(callback):
     callback_data_parts = callback.data.split("\n")
     user_response = callback_data_parts[0]
     chat_id = int(callback_data_parts[1])
+    in_chat_order(chat_id, handle_callback, chat_id, user_response)
 
-    if user_response == 'да':
-        bot.send_message(chat_id, "Расскажи о каком-нибудь своем проекте. Опиши его и расскажи, чем ты в нем занимался.")
-        dialogue[chat_id] = "Вопрос №1: Расскажи о каком-нибудь своем проекте. Опиши его и расскажи, чем ты в нем занимался."
-        answers_X[chat_id] = "Вопрос №1: Расскажи о каком-нибудь своем проекте. Опиши его и расскажи, чем ты в нем занимался."
 
-        bot.register_next_step_handler(callback.message, ask_questions_X_async)
-    elif user_response == 'нет':
-        bot.send_message(chat_id, "Расскажи о каких-нибудь своих достижениях")
-        bot.register_next_step_handler(callback.message, user_achievements_async)
+def handle_callback(chat_id, user_response):
+    with sessions.update(chat_id):
+        if user_response == 'да':
+            start_project(chat_id)
+        elif user_response == 'нет':
+            bot.send_message(chat_id, "Расскажи о каких-нибудь своих достижениях")
+            fsm.set(chat_id, 'resume_achievements')
 
 
 if __name__ == "__main__":
@@ -155,7 +169,22 @@ if __name__ == "__main__":
     Точка входа в программу. Запускает бота и обрабатывает исключения.
     """
     log.info("Starting main bot...")
+    runtime.start()
+    # Очередь исходящих подключается до восстановления задач и обработчиков:
+    # корутины в цикле рантайма только ставят вызовы Bot API в очередь
+    install_outbox(bot)
+    jobs.start()
+    dispatcher = ShardedDispatcher(bot, dispatch_shards)
+    dispatcher.install()
     try:
-        bot.polling(none_stop=True)
+        if bot_mode == 'webhook':
+            run_webhook()
+        else:
+            bot.polling(none_stop=True)
+    except KeyboardInterrupt:
+        log.info("Stopping main bot...")
     except Exception as e:
-        log.error(f"Error in bot polling: {e}") 
\ No newline at end of file
+        log.error(f"Error in bot {bot_mode}: {e}")
+    finally:
+        dispatcher.stop()
+        runtime.shutdown() 
\ No newline at end of file
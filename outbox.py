@@ -0,0 +1,345 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from telebot.apihelper import ApiTelegramException
+
+from async_runtime import runtime
+from config import (
+    log,
+    telegram_global_rps,
+    telegram_chat_rps,
+    telegram_chat_burst,
+    outbox_workers,
+    outbox_max_retries
+)
+from llm_scheduler import TokenBucket
+
+# Максимальная длина текста одного сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+# Разделитель текстов, объединенных в одно сообщение
+COALESCE_SEPARATOR = '\n\n'
+
+# Сколько лимитов по чатам держать, прежде чем удалять неактивные
+CHAT_BUCKETS_LIMIT = 10000
+
+
+class _Outgoing:
+    """Сообщение в очереди отправки."""
+
+    __slots__ = ('chat_id', 'text', 'kwargs', 'futures', 'attempts', 'call', 'coalesce')
+
+    def __init__(self, chat_id, text, kwargs, future, call=None, coalesce=True):
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.futures = [future]
+        self.attempts = 0
+        # Другой вызов Bot API (правка, документ) вместо send_message
+        self.call = call
+        # False для сообщений, которые потом редактируются
+        self.coalesce = coalesce
+
+    def merge(self, other):
+        """Присоединяет следующий текст, если сообщения можно склеить.
+
+        Склеиваются только простые тексты без parse_mode и прочих
+        параметров; клавиатура допустима лишь у присоединяемого
+        сообщения и переходит к объединенному. Сообщения, отправленные с
+        coalesce=False (их потом редактируют, и правка заменила бы весь
+        склеенный текст), правки и документы не склеиваются никогда.
+
+        Returns:
+            bool: True, если other присоединено
+        """
+        if self.call or other.call or not self.coalesce or not other.coalesce:
+            return False
+        if self.kwargs or set(other.kwargs) - {'reply_markup'}:
+            return False
+        text = self.text + COALESCE_SEPARATOR + other.text
+        if len(text) > MESSAGE_LIMIT:
+            return False
+        self.text = text
+        self.kwargs = other.kwargs
+        self.futures.extend(other.futures)
+        return True
+
+
+class Outbox:
+    """Асинхронная очередь исходящих сообщений Telegram.
+
+    Заменяет bot.send_message, bot.edit_message_text и bot.send_document:
+    вызов ставит его в очередь чата и сразу возвращает
+    concurrent.futures.Future с результатом. Отправка соблюдает общий
+    лимит бота и лимит на чат, сохраняет порядок внутри чата (в том числе
+    между текстами, правками и документами), склеивает подряд идущие
+    тексты одному чату и повторяет отправку после 429 с паузой из
+    retry_after.
+
+    Args:
+        telegram_bot (telebot.TeleBot): Бот, через который идет отправка
+        global_rps (float): Сообщений в секунду на весь бот
+        chat_rps (float): Сообщений в секунду в один чат
+        chat_burst (float): Сколько сообщений в чат можно отправить подряд
+        workers (int): Потоков для блокирующих вызовов Bot API
+        max_retries (int): Повторов одного сообщения после 429
+        async_runtime (AsyncRuntime): Рантайм, в цикле которого работает очередь
+    """
+
+    def __init__(self, telegram_bot, global_rps, chat_rps, chat_burst, workers,
+                 max_retries=5, async_runtime=runtime):
+        self.bot = telegram_bot
+        self.chat_rps = chat_rps
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.runtime = async_runtime
+        self.global_bucket = TokenBucket(global_rps * 60, burst_seconds=1)
+        self._send = telegram_bot.send_message
+        self._edit = telegram_bot.edit_message_text
+        self._send_document = telegram_bot.send_document
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='outbox')
+        self._chats = OrderedDict()
+        self._buckets = {}
+        self._paused_until = {}
+        self._in_flight = set()
+        self._wakeup = None
+        self._dispatcher = None
+        self.stats = {'queued': 0, 'sent': 0, 'coalesced': 0, 'rate_limited': 0, 'failed': 0}
+
+    def install(self):
+        """Подменяет отправку, правку сообщений и документов на постановку в очередь."""
+        self.runtime.start()
+        self.bot.send_message = self.send_message
+        self.bot.edit_message_text = self.edit_message_text
+        self.bot.send_document = self.send_document
+        self.runtime.on_shutdown(self.drain)
+
+    def send_message(self, chat_id, text, coalesce=True, **kwargs):
+        """Ставит сообщение в очередь отправки.
+
+        Args:
+            chat_id (int): ID чата
+            text (str): Текст сообщения
+            coalesce (bool): Можно ли склеивать сообщение с соседними; в
+                Bot API не передается
+            **kwargs: Остальные параметры bot.send_message
+
+        Returns:
+            concurrent.futures.Future: Отправленное сообщение (types.Message)
+        """
+        future = Future()
+        item = _Outgoing(chat_id, text, kwargs, future, coalesce=coalesce)
+        self.runtime.loop.call_soon_threadsafe(self._enqueue, item)
+        return future
+
+    def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        """Ставит правку сообщения в очередь его чата.
+
+        Returns:
+            concurrent.futures.Future: Результат bot.edit_message_text
+        """
+        return self._call(chat_id, lambda: self._edit(text, chat_id=chat_id, message_id=message_id, **kwargs))
+
+    def send_document(self, chat_id, document, **kwargs):
+        """Ставит отправку документа в очередь чата.
+
+        Returns:
+            concurrent.futures.Future: Отправленное сообщение (types.Message)
+        """
+        return self._call(chat_id, lambda: self._send_document(chat_id, document, **kwargs))
+
+    def _call(self, chat_id, call):
+        future = Future()
+        item = _Outgoing(chat_id, None, {}, future, call)
+        self.runtime.loop.call_soon_threadsafe(self._enqueue, item)
+        return future
+
+    def _enqueue(self, item):
+        self.stats['queued'] += 1
+        queue = self._chats.setdefault(item.chat_id, deque())
+        # Склеиваем только с сообщением, которое еще не начали отправлять
+        if queue and queue[-1].merge(item):
+            self.stats['coalesced'] += 1
+        else:
+            queue.append(item)
+        self._kick()
+
+    def _kick(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(
+                self.chat_rps * 60,
+                burst_seconds=self.chat_burst / self.chat_rps
+            )
+        return bucket
+
+    async def _dispatch(self):
+        while self._chats or self._in_flight:
+            self._wakeup.clear()
+            wait = 1.0
+            now = time.monotonic()
+            for chat_id in list(self._chats):
+                if chat_id in self._in_flight:
+                    continue
+                bucket = self._chat_bucket(chat_id)
+                chat_wait = max(self._paused_until.get(chat_id, 0.0) - now, bucket.wait_time(1))
+                global_wait = self.global_bucket.wait_time(1)
+                if chat_wait > 0 or global_wait > 0:
+                    wait = min(wait, max(chat_wait, global_wait))
+                    continue
+
+                queue = self._chats.pop(chat_id)
+                item = queue.popleft()
+                if queue:
+                    # Чат уходит в конец, чтобы другие чаты не ждали
+                    self._chats[chat_id] = queue
+                bucket.take(1)
+                self.global_bucket.take(1)
+                self._in_flight.add(chat_id)
+                asyncio.ensure_future(self._deliver(item))
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(wait, 0.001))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, item):
+        loop = asyncio.get_running_loop()
+        try:
+            message = await loop.run_in_executor(
+                self._executor,
+                item.call or (lambda: self._send(item.chat_id, item.text, **item.kwargs))
+            )
+        except ApiTelegramException as e:
+            if e.error_code == 429 and item.attempts < self.max_retries:
+                item.attempts += 1
+                self._rate_limited(item, e)
+            else:
+                self._fail(item, e)
+        except Exception as e:
+            self._fail(item, e)
+        else:
+            self.stats['sent'] += 1
+            for future in item.futures:
+                future.set_result(message)
+        finally:
+            self._in_flight.discard(item.chat_id)
+            if len(self._buckets) > CHAT_BUCKETS_LIMIT:
+                self._prune()
+            self._kick()
+
+    def _prune(self):
+        # Полное ведро без очереди ничем не отличается от нового
+        now = time.monotonic()
+        for chat_id, bucket in list(self._buckets.items()):
+            idle = chat_id not in self._chats and chat_id not in self._in_flight
+            if idle and bucket.wait_time(bucket.capacity) == 0 and self._paused_until.get(chat_id, 0) < now:
+                del self._buckets[chat_id]
+                self._paused_until.pop(chat_id, None)
+
+    def _rate_limited(self, item, e):
+        self.stats['rate_limited'] += 1
+        retry_after = (e.result_json or {}).get('parameters', {}).get('retry_after', 1)
+        log.warning(f"Telegram 429 for chat {item.chat_id}, retry after {retry_after}s")
+        self._paused_until[item.chat_id] = time.monotonic() + retry_after
+        # Сообщение возвращается в начало очереди чата, порядок сохраняется
+        queue = self._chats.setdefault(item.chat_id, deque())
+        queue.appendleft(item)
+
+    def _fail(self, item, e):
+        self.stats['failed'] += 1
+        log.error(f"Failed to send message to chat {item.chat_id}: {e}")
+        for future in item.futures:
+            future.set_exception(e)
+
+    async def drain(self, timeout=10):
+        """Дожидается отправки накопленных сообщений при остановке."""
+        if self._dispatcher is not None and not self._dispatcher.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._dispatcher), timeout)
+            except asyncio.TimeoutError:
+                log.warning("Outbox не успел отправить все сообщения")
+        self._executor.shutdown(wait=False)
+
+    def snapshot(self):
+        """Возвращает метрики очереди.
+
+        Returns:
+            dict: Счетчики сообщений, число сообщений и чатов в очереди
+        """
+        return dict(
+            self.stats,
+            pending=sum(len(queue) for queue in self._chats.values()),
+            chats=len(self._chats),
+            in_flight=len(self._in_flight)
+        )
+
+
+async def delivered(result):
+    """Дожидается отправки сообщения без блокировки цикла.
+
+    Args:
+        result: Результат bot.send_message - сообщение или Future из очереди
+
+    Returns:
+        types.Message: Отправленное сообщение
+    """
+    if isinstance(result, Future):
+        return await asyncio.wrap_future(result)
+    return result
+
+
+def send_editable(telegram_bot, chat_id, text, **kwargs):
+    """Отправляет сообщение, которое потом будет редактироваться.
+
+    Через очередь исходящих сообщение уходит без склейки с соседними,
+    иначе первая правка заменила бы и чужой текст. Без очереди это
+    обычный bot.send_message.
+
+    Args:
+        telegram_bot (telebot.TeleBot): Бот
+        chat_id (int): ID чата
+        text (str): Текст сообщения
+        **kwargs: Остальные параметры bot.send_message
+
+    Returns:
+        Сообщение (types.Message) или Future из очереди
+    """
+    send = telegram_bot.send_message
+    if isinstance(getattr(send, '__self__', None), Outbox):
+        return send(chat_id, text, coalesce=False, **kwargs)
+    return send(chat_id, text, **kwargs)
+
+
+outbox = None
+
+
+def install_outbox(telegram_bot):
+    """Создает очередь исходящих сообщений по настройкам и подключает ее к боту.
+
+    Args:
+        telegram_bot (telebot.TeleBot): Бот
+
+    Returns:
+        Outbox: Подключенная очередь
+    """
+    global outbox
+    outbox = Outbox(
+        telegram_bot,
+        telegram_global_rps,
+        telegram_chat_rps,
+        telegram_chat_burst,
+        outbox_workers,
+        outbox_max_retries
+    )
+    outbox.install()
+    return outbox
@@ -0,0 +1,393 @@
+import itertools
+import math
+import multiprocessing
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import fitz
+from docx import Document
+
+from config import (
+    bot,
+    log,
+    redis_client,
+    ingest_max_bytes,
+    ingest_max_pages,
+    ingest_timeout,
+    ingest_workers,
+    ingest_parallel_pages,
+    resume_cache_ttl,
+    resume_cache_l1_entries,
+    resume_cache_l1_bytes
+)
+from gpt_resilience import LatencyTracker
+from llm_cache import TieredCache
+
+# Сигнатуры форматов в начале файла
+PDF_MAGIC = b'%PDF-'
+ZIP_MAGIC = b'PK\x03\x04'
+OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Сколько первых байт просматривать в поисках сигнатуры PDF
+PDF_MAGIC_WINDOW = 1024
+
+
+class UnsupportedDocument(ValueError):
+    """Документ в формате, из которого нельзя извлечь текст резюме."""
+
+
+class ExtractionTimeout(UnsupportedDocument):
+    """Извлечение текста не уложилось в отведенное время."""
+
+
+def detect_format(data):
+    """Определяет формат документа по содержимому, а не по имени файла.
+
+    Args:
+        data (bytes): Содержимое файла
+
+    Returns:
+        str: 'pdf', 'docx', 'doc', 'text' или None, если формат не распознан
+    """
+    # Некоторые генераторы пишут мусор перед заголовком PDF
+    if PDF_MAGIC in data[:PDF_MAGIC_WINDOW]:
+        return 'pdf'
+    if data.startswith(ZIP_MAGIC):
+        try:
+            with zipfile.ZipFile(BytesIO(data)) as archive:
+                if 'word/document.xml' in archive.namelist():
+                    return 'docx'
+        except zipfile.BadZipFile:
+            return None
+        return None
+    if data.startswith(OLE_MAGIC):
+        return 'doc'
+    try:
+        data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    return 'text'
+
+
+def pdf_text(data, first=0, last=None):
+    """Извлекает текст из PDF прямо из памяти.
+
+    Args:
+        data (bytes): Содержимое PDF
+        first (int): Первая страница
+        last (int): Страница после последней; по умолчанию конец документа
+
+    Returns:
+        str: Текст страниц
+    """
+    with fitz.open(stream=data, filetype='pdf') as doc:
+        last = doc.page_count if last is None else last
+        return ''.join(doc.load_page(number).get_text() for number in range(first, last))
+
+
+def docx_text(data):
+    """Извлекает текст абзацев и таблиц из DOCX.
+
+    Args:
+        data (bytes): Содержимое DOCX
+
+    Returns:
+        str: Текст документа
+    """
+    doc = Document(BytesIO(data))
+    lines = [paragraph.text for paragraph in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            lines.append('\t'.join(cell.text for cell in row.cells))
+    return '\n'.join(line for line in lines if line.strip())
+
+
+def _run_task(kind, data, first, last, max_pages, parallel_pages):
+    if kind == 'docx':
+        return 'text', docx_text(data)
+    if first is None:
+        with fitz.open(stream=data, filetype='pdf') as doc:
+            pages = doc.page_count
+            if pages > max_pages:
+                raise UnsupportedDocument(f"В документе больше {max_pages} страниц")
+            if pages > parallel_pages:
+                return 'pages', pages
+            return 'text', ''.join(page.get_text() for page in doc)
+    return 'text', pdf_text(data, first, last)
+
+
+def _worker_main(conn, max_pages, parallel_pages):
+    # Процесс-исполнитель: разбирает документы, пока его не остановят.
+    # Большой PDF он запоминает, чтобы диапазоны страниц приходили без байтов
+    document = None
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        kind, token, data, first, last = task
+        if data is None:
+            data = document[1]
+        document = None
+        try:
+            result = _run_task(kind, data, first, last, max_pages, parallel_pages)
+            document = (token, data) if result[0] == 'pages' or first is not None else None
+            conn.send((True, result))
+        except UnsupportedDocument as e:
+            conn.send((False, str(e)))
+        except Exception as e:
+            conn.send((False, f"Не удалось прочитать документ ({type(e).__name__})"))
+
+
+class _Worker:
+    __slots__ = ('process', 'conn', 'document')
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        # Документ, который процесс держит в памяти
+        self.document = None
+
+
+class ExtractionPool:
+    """Ограниченный пул процессов для извлечения текста из PDF и DOCX.
+
+    Разбор идет вне процесса бота: зависший или вредоносный документ не
+    держит потоки обработчиков. Документ получает общий срок timeout,
+    процесс, не уложившийся в него, убивается и заменяется новым. PDF
+    длиннее max_pages отклоняются, а длиннее parallel_pages делятся на
+    диапазоны страниц, которые разбирают несколько процессов сразу; байты
+    документа передаются каждому процессу не больше одного раза. Процессы
+    запускаются через spawn: fork многопоточного бота копирует чужие
+    захваченные блокировки.
+
+    Args:
+        workers (int): Число процессов
+        timeout (float): Время на один документ, секунд
+        max_pages (int): Максимальное число страниц PDF
+        parallel_pages (int): С какого числа страниц PDF разбирается параллельно
+    """
+
+    def __init__(self, workers, timeout, max_pages, parallel_pages):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.parallel_pages = parallel_pages
+        self._context = multiprocessing.get_context('spawn')
+        self._tokens = itertools.count()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._chunks = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='extract')
+        self.latency = LatencyTracker(min_samples=1)
+        self.stats = {'documents': 0, 'parallel': 0, 'failed': 0, 'timeouts': 0, 'killed': 0, 'uploads': 0}
+
+    def extract(self, kind, data):
+        """Извлекает текст документа в процессе пула.
+
+        Args:
+            kind (str): 'pdf' или 'docx'
+            data (bytes): Содержимое файла
+
+        Returns:
+            str: Текст документа
+
+        Raises:
+            UnsupportedDocument: Документ не удалось разобрать
+            ExtractionTimeout: Документ не разобран за timeout секунд
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        token = next(self._tokens)
+        try:
+            result, value = self._run(kind, token, data, None, None, deadline)
+            if result == 'pages':
+                self.stats['parallel'] += 1
+                value = self._extract_parallel(token, data, value, deadline)
+        except ExtractionTimeout:
+            self.stats['timeouts'] += 1
+            raise
+        except UnsupportedDocument:
+            self.stats['failed'] += 1
+            raise
+        self.stats['documents'] += 1
+        self.latency.record(time.monotonic() - started)
+        return value
+
+    def _extract_parallel(self, token, data, pages, deadline):
+        step = max(self.parallel_pages, math.ceil(pages / self.workers))
+        futures = [
+            self._chunks.submit(self._run, 'pdf', token, data, first, min(first + step, pages), deadline)
+            for first in range(0, pages, step)
+        ]
+        return ''.join(future.result()[1] for future in futures)
+
+    def _run(self, kind, token, data, first, last, deadline):
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise ExtractionTimeout("Документ обрабатывается слишком долго")
+        worker = None
+        try:
+            worker = self._checkout(token)
+            if worker.document == token:
+                data = None
+            else:
+                self.stats['uploads'] += 1
+            worker.document = None
+            worker.conn.send((kind, token, data, first, last))
+            if not worker.conn.poll(max(deadline - time.monotonic(), 0)):
+                self._kill(worker)
+                worker = None
+                raise ExtractionTimeout("Документ обрабатывается слишком долго")
+            ok, value = worker.conn.recv()
+            if ok and (value[0] == 'pages' or first is not None):
+                worker.document = token
+        except (EOFError, OSError) as e:
+            # Процесс упал на документе, например из-за нехватки памяти
+            log.warning(f"Extraction worker died: {e}")
+            self._kill(worker)
+            worker = None
+            raise UnsupportedDocument("Не удалось прочитать документ")
+        finally:
+            if worker is not None:
+                with self._lock:
+                    self._idle.append(worker)
+            self._slots.release()
+        if not ok:
+            raise UnsupportedDocument(value)
+        return value
+
+    def _checkout(self, token):
+        with self._lock:
+            # Сначала процесс, в памяти которого уже есть этот документ
+            for index, worker in enumerate(self._idle):
+                if worker.document == token:
+                    return self._idle.pop(index)
+            if self._idle:
+                return self._idle.pop()
+        parent, child = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child, self.max_pages, self.parallel_pages),
+            name='extract-worker',
+            daemon=True
+        )
+        process.start()
+        child.close()
+        return _Worker(process, parent)
+
+    def _kill(self, worker):
+        if worker is None:
+            return
+        self.stats['killed'] += 1
+        worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+
+    def close(self):
+        """Останавливает процессы пула."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.conn.send(None)
+            worker.process.join(1)
+            worker.conn.close()
+        self._chunks.shutdown(wait=False)
+
+    def snapshot(self):
+        """Возвращает метрики извлечения.
+
+        Returns:
+            dict: Счетчики документов, ошибок, таймаутов и убитых процессов,
+                  медиана и 95-й перцентиль времени разбора
+        """
+        return dict(
+            self.stats,
+            latency_p50=self.latency.percentile(0.5),
+            latency_p95=self.latency.percentile(0.95)
+        )
+
+
+extraction_pool = ExtractionPool(ingest_workers, ingest_timeout, ingest_max_pages, ingest_parallel_pages)
+
+# Потоки для ingest_document из цикла рантайма: скачивание и ожидание пула
+# процессов длятся до INGEST_TIMEOUT и не должны занимать общий пул потоков
+ingest_executor = ThreadPoolExecutor(max_workers=ingest_workers, thread_name_prefix='ingest')
+
+# Документы, отклоненные до скачивания из-за размера
+rejected = {'too_large': 0}
+
+# Текст резюме по file_unique_id: один и тот же файл не скачивается повторно
+resume_cache = TieredCache('resume', redis_client, resume_cache_l1_entries, resume_cache_l1_bytes)
+
+
+def extract_text(data, pool=None):
+    """Извлекает текст резюме из документа любого поддерживаемого формата.
+
+    PDF и DOCX разбираются в пуле процессов, текст декодируется на месте.
+
+    Args:
+        data (bytes): Содержимое файла
+        pool (ExtractionPool): Пул процессов; по умолчанию общий
+
+    Returns:
+        str: Текст резюме
+
+    Raises:
+        UnsupportedDocument: Формат не поддерживается или документ без текста
+    """
+    kind = detect_format(data)
+    if kind in ('pdf', 'docx'):
+        text = (pool or extraction_pool).extract(kind, data)
+    elif kind == 'text':
+        text = data.decode('utf-8')
+    elif kind == 'doc':
+        raise UnsupportedDocument("Формат .doc не поддерживается, сохраните резюме в PDF или DOCX")
+    else:
+        raise UnsupportedDocument("Не удалось распознать формат документа")
+    if not text.strip():
+        raise UnsupportedDocument("В документе нет текста")
+    return text
+
+
+def ingest_document(document, telegram_bot=bot, cache=resume_cache):
+    """Скачивает документ из Telegram в память и извлекает из него текст.
+
+    Текст кэшируется по file_unique_id, который у одного файла одинаков
+    во всех чатах и сообщениях: повторная загрузка того же резюме в любом
+    режиме обходится без скачивания и разбора. Размер проверяется до
+    скачивания по данным Telegram и еще раз после.
+
+    Args:
+        document (types.Document): Документ из сообщения пользователя
+        telegram_bot (telebot.TeleBot): Бот, через который скачивается файл
+        cache (TieredCache): Кэш текста резюме
+
+    Returns:
+        str: Текст резюме
+
+    Raises:
+        UnsupportedDocument: Формат не поддерживается, файл слишком большой
+                             или документ без текста
+    """
+    key = cache.make_key(document.file_unique_id)
+    text = cache.get(key, resume_cache_ttl)
+    if text is not None:
+        return text
+
+    too_large = UnsupportedDocument(f"Файл больше {ingest_max_bytes // (1024 * 1024)} МБ")
+    if (document.file_size or 0) > ingest_max_bytes:
+        rejected['too_large'] += 1
+        raise too_large
+    file_info = telegram_bot.get_file(document.file_id)
+    data = telegram_bot.download_file(file_info.file_path)
+    if len(data) > ingest_max_bytes:
+        rejected['too_large'] += 1
+        raise too_large
+    text = extract_text(data)
+    cache.set(key, text, resume_cache_ttl)
+    return text
@@ -0,0 +1,419 @@
+import re
+import sys
+from dataclasses import dataclass, fields
+from typing import Tuple
+
+# Заголовки разделов резюме: раздел и варианты его названия
+SECTION_TITLES = {
+    'summary': ('о себе', 'обо мне', 'цель', 'профиль', 'summary', 'about me', 'about', 'profile', 'objective'),
+    'experience': (
+        'опыт работы', 'трудовой опыт', 'опыт', 'места работы',
+        'work experience', 'professional experience', 'experience', 'employment'
+    ),
+    'education': (
+        'образование', 'высшее образование', 'повышение квалификации', 'курсы',
+        'education', 'courses', 'certifications'
+    ),
+    'skills': (
+        'ключевые навыки', 'профессиональные навыки', 'технические навыки', 'навыки', 'технологии', 'стек',
+        'key skills', 'technical skills', 'hard skills', 'soft skills', 'skills', 'tech stack'
+    ),
+    'projects': ('проекты', 'projects'),
+    'achievements': ('достижения', 'награды', 'achievements', 'awards'),
+    'contacts': ('контактная информация', 'контакты', 'contacts', 'contact information', 'contact'),
+    'languages': ('знание языков', 'иностранные языки', 'языки', 'languages')
+}
+
+# Заголовок - короткая строка из названия раздела и, возможно, пояснения после тире
+_HEADINGS = [
+    (section, re.compile(rf"^(?:{'|'.join(map(re.escape, titles))})\s*(?:[:\-–—].*)?$", re.IGNORECASE))
+    for section, titles in SECTION_TITLES.items()
+]
+HEADING_MAX_LENGTH = 60
+
+# Заголовок раздела, которого нет в SECTION_TITLES: несколько слов без цифр
+# и знаков препинания после пустой строки, возможно с двоеточием в конце
+_UNKNOWN_HEADING = re.compile(r'^[A-ZА-ЯЁ][\w\s/&-]{2,38}:?$')
+UNKNOWN_HEADING_WORDS = 4
+
+_MONTH = (
+    r'(?:янв|фев|мар|апр|ма[йя]|июн|июл|авг|сен|окт|ноя|дек|'
+    r'jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-zа-яё]*\.?'
+)
+_DATE = rf'(?:(?:{_MONTH}\s+)?(?:19|20)\d{{2}}|\d{{1,2}}[./](?:19|20)\d{{2}})'
+_DATE_END = rf'(?:{_DATE}|настоящее\s+время|н\.\s*в\.|сейчас|present|now|current)'
+PERIOD = re.compile(rf'(?:с\s+)?{_DATE}\s*(?:[-–—]|по|to|until)\s*{_DATE_END}', re.IGNORECASE)
+DURATION = re.compile(r'^\d+\s+(?:год|лет|мес|year|month)', re.IGNORECASE)
+
+EMAIL = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+PHONE = re.compile(r'(?:\+7|\b8)[\s(-]*\d{3}[\s)-]*\d{3}[\s-]*\d{2}[\s-]*\d{2}\b|\+\d[\d\s()-]{8,}\d')
+LINK = re.compile(r'(?:https?://)?(?:www\.)?(?:github\.com|linkedin\.com|hh\.ru|t\.me)/[\w./-]+', re.IGNORECASE)
+TELEGRAM = re.compile(r'(?<![\w.])@[A-Za-z]\w{4,}')
+
+_SKILL_SPLIT = re.compile(r'[,;•·●▪|\n]+')
+_SPACES = re.compile(r'[^\S\n]+')
+_HYPHENATION = re.compile(r'(\w)-\n(\w)')
+_NAME = re.compile(r'^[A-ZА-ЯЁ][a-zа-яё-]+(?:\s+[A-ZА-ЯЁ][a-zа-яё-]+){1,2}$')
+
+# Ограничения размера модели в сессии
+MAX_SKILLS = 40
+MAX_SKILL_LENGTH = 40
+MAX_ROLES = 8
+MAX_ROLE_DETAILS = 300
+MAX_EDUCATION = 4
+MAX_SUMMARY = 600
+MAX_SECTION = 1500
+MAX_EXTRA = 1500
+
+# Подписи полей модели в промпте
+LABELS = {
+    'name': "Имя",
+    'summary': "О себе",
+    'skills': "Навыки",
+    'education': "Образование",
+    'experience': "Опыт работы",
+    'projects': "Проекты",
+    'languages': "Языки",
+    'achievements': "Достижения",
+    'extra': "Дополнительно"
+}
+
+
+def normalize(text):
+    """Приводит текст резюме к однородному виду.
+
+    Склеивает переносы слов, схлопывает пробелы (в том числе неразрывные),
+    обрезает строки и убирает повторяющиеся пустые строки.
+
+    Args:
+        text (str): Текст резюме
+
+    Returns:
+        str: Нормализованный текст
+    """
+    text = _HYPHENATION.sub(r'\1\2', text.replace('\r\n', '\n').replace('\r', '\n'))
+    lines = []
+    for line in _SPACES.sub(' ', text).split('\n'):
+        line = line.strip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return '\n'.join(lines).strip()
+
+
+def heading_of(line):
+    """Определяет, является ли строка заголовком раздела.
+
+    Args:
+        line (str): Строка нормализованного текста
+
+    Returns:
+        str: Раздел из SECTION_TITLES или None
+    """
+    if not line or len(line) > HEADING_MAX_LENGTH:
+        return None
+    for section, pattern in _HEADINGS:
+        if pattern.match(line):
+            return section
+    return None
+
+
+def is_unknown_heading(line):
+    """Проверяет, похожа ли строка на заголовок раздела не из SECTION_TITLES.
+
+    Args:
+        line (str): Строка нормализованного текста после пустой строки
+
+    Returns:
+        bool: True для короткой строки из нескольких слов без цифр и знаков препинания
+    """
+    return (
+        _UNKNOWN_HEADING.match(line) is not None
+        and not any(char.isdigit() for char in line)
+        and len(line.split()) <= UNKNOWN_HEADING_WORDS
+    )
+
+
+def split_sections(text):
+    """Делит нормализованный текст на разделы по заголовкам.
+
+    Строки до первого заголовка попадают в раздел 'header', повторные
+    разделы с одним названием склеиваются. Похожая на заголовок строка
+    между пустой строкой и текстом, которой нет в SECTION_TITLES,
+    начинает раздел с ключом по самому заголовку, чтобы его строки не
+    приклеились к предыдущему разделу.
+
+    Args:
+        text (str): Нормализованный текст резюме
+
+    Returns:
+        dict: Раздел и список его непустых строк
+    """
+    sections = {'header': []}
+    current = sections['header']
+    lines = text.split('\n')
+    for index, line in enumerate(lines):
+        section = heading_of(line)
+        if section is not None:
+            current = sections.setdefault(section, [])
+        elif (
+            current is not sections['header'] and index > 0 and not lines[index - 1]
+            and index + 1 < len(lines) and lines[index + 1] and is_unknown_heading(line)
+        ):
+            current = sections.setdefault(line.rstrip(':'), [])
+        elif line:
+            current.append(line)
+    return sections
+
+
+@dataclass(frozen=True)
+class Role:
+    """Место работы из раздела опыта.
+
+    Attributes:
+        title (str): Первая строка записи: должность или компания
+        period (str): Период работы как в резюме
+        details (str): Остальные строки записи, сокращенные
+    """
+    title: str
+    period: str
+    details: str = ''
+
+    def render(self):
+        text = f"{self.title} ({self.period})"
+        return f"{text}: {self.details}" if self.details else text
+
+
+@dataclass(frozen=True)
+class ResumeModel:
+    """Компактная структура резюме, которая хранится в сессии.
+
+    Все поля неизменяемые, поэтому модель считается один раз при загрузке
+    резюме и дальше только читается. Разделы, которые не удалось разобрать
+    (опыт без дат, проекты, языки), сохраняются строками как есть. Если в
+    тексте не нашлось ни одного раздела с навыками, опытом или проектами,
+    в text остается нормализованный текст целиком. Строки шапки после
+    имени (обычно желаемая должность), разделы с незнакомыми заголовками и
+    слишком длинные пункты навыков попадают в extra. Проекты и достижения
+    заполняет и режим составления резюме.
+
+    Attributes:
+        name (str): Имя из шапки резюме
+        contacts (tuple): Пары (тип, значение): email, phone, telegram, link
+        summary (str): Раздел "О себе"
+        skills (tuple): Навыки
+        roles (tuple): Места работы Role
+        education (tuple): Строки раздела образования
+        experience (tuple): Строки раздела опыта, если в нем не нашлось периодов
+        projects (tuple): Описания проектов
+        languages (tuple): Строки раздела языков
+        achievements (str): Достижения
+        extra (tuple): Строки шапки и разделов, которые не разобраны в поля
+        text (str): Нормализованный текст для неструктурированных резюме
+    """
+    name: str = ''
+    contacts: Tuple[Tuple[str, str], ...] = ()
+    summary: str = ''
+    skills: Tuple[str, ...] = ()
+    roles: Tuple[Role, ...] = ()
+    education: Tuple[str, ...] = ()
+    experience: Tuple[str, ...] = ()
+    projects: Tuple[str, ...] = ()
+    languages: Tuple[str, ...] = ()
+    achievements: str = ''
+    extra: Tuple[str, ...] = ()
+    text: str = ''
+
+    def render(self, *wanted):
+        """Собирает текст выбранных полей для промпта.
+
+        Args:
+            *wanted (str): Поля, которые нужны промпту
+
+        Returns:
+            str: Текст полей или нормализованный текст резюме, если структуры нет
+        """
+        parts = []
+        for field in wanted:
+            value = getattr(self, field)
+            if not value:
+                continue
+            if field == 'roles':
+                parts.append("Опыт работы:\n" + '\n'.join(f"- {role.render()}" for role in value))
+            elif field == 'contacts':
+                parts.append("Контакты: " + ', '.join(contact for _, contact in value))
+            elif isinstance(value, tuple):
+                separator = ', ' if field == 'skills' else '; '
+                parts.append(f"{LABELS[field]}: {separator.join(value)}")
+            else:
+                parts.append(f"{LABELS[field]}: {value}")
+        return '\n'.join(parts) or self.text
+
+    def size(self):
+        """Возвращает примерный объем памяти модели в байтах."""
+        total = sys.getsizeof(self)
+        for field in fields(self):
+            value = getattr(self, field.name)
+            total += sys.getsizeof(value)
+            if isinstance(value, tuple):
+                total += sum(sys.getsizeof(item) for item in value)
+        return total
+
+
+def extract_contacts(text):
+    """Находит контакты в тексте резюме.
+
+    Args:
+        text (str): Нормализованный текст резюме
+
+    Returns:
+        tuple: Пары (тип, значение) без повторов в порядке появления
+    """
+    found = []
+    for kind, pattern in (('email', EMAIL), ('phone', PHONE), ('link', LINK), ('telegram', TELEGRAM)):
+        for match in pattern.finditer(text):
+            value = match.group().strip()
+            if (kind, value) not in found:
+                found.append((kind, value))
+    # Адрес почты не должен попадать в контакты еще раз как ник
+    emails = ' '.join(value for kind, value in found if kind == 'email')
+    return tuple((kind, value) for kind, value in found if kind != 'telegram' or value not in emails)
+
+
+def extract_skills(lines):
+    """Делит раздел навыков на отдельные навыки.
+
+    Пункты длиннее MAX_SKILL_LENGTH и навыки сверх MAX_SKILLS - это
+    обычно фразы, а не навыки; они возвращаются отдельно, чтобы не
+    потеряться.
+
+    Args:
+        lines (list): Строки раздела навыков
+
+    Returns:
+        tuple: Навыки без повторов без учета регистра и не вошедшие в них пункты
+    """
+    skills = []
+    rest = []
+    seen = set()
+    for item in _SKILL_SPLIT.split('\n'.join(lines)):
+        item = item.strip(' -*–—.:')
+        if not item or item.lower() in seen:
+            continue
+        seen.add(item.lower())
+        if len(item) > MAX_SKILL_LENGTH or len(skills) == MAX_SKILLS:
+            rest.append(item)
+        else:
+            skills.append(item)
+    return tuple(skills), tuple(rest)
+
+
+def extract_roles(lines):
+    """Выделяет места работы по строкам с периодами дат.
+
+    Запись начинается со строки, где есть период работы. Заголовок записи -
+    остаток этой строки без дат или следующая строка, остальные строки до
+    следующего периода идут в details.
+
+    Args:
+        lines (list): Строки раздела опыта
+
+    Returns:
+        tuple: Места работы Role, не больше MAX_ROLES
+    """
+    entries = []
+    for line in lines:
+        match = PERIOD.search(line)
+        if match:
+            rest = (line[:match.start()] + line[match.end():]).strip(' ,|-–—')
+            entries.append([match.group().strip(), [rest] if rest else []])
+        elif entries and not DURATION.match(line):
+            entries[-1][1].append(line)
+    roles = []
+    for period, body in entries[:MAX_ROLES]:
+        title = body[0] if body else ''
+        details = ' '.join(body[1:])
+        if len(details) > MAX_ROLE_DETAILS:
+            details = details[:MAX_ROLE_DETAILS].rsplit(' ', 1)[0] + ' …'
+        roles.append(Role(title, period, details))
+    return tuple(roles)
+
+
+def excerpt(lines, limit=MAX_SECTION):
+    """Оставляет первые строки раздела в пределах limit символов.
+
+    Args:
+        lines (list): Строки раздела
+        limit (int): Сколько символов оставить
+
+    Returns:
+        tuple: Строки раздела
+    """
+    kept = []
+    for line in lines:
+        limit -= len(line)
+        if limit < 0:
+            break
+        kept.append(line)
+    return tuple(kept)
+
+
+def header_rest(lines):
+    """Оставляет строки шапки, в которых есть что-то кроме контактов.
+
+    Args:
+        lines (list): Строки шапки без имени
+
+    Returns:
+        list: Строки шапки, например желаемая должность и город
+    """
+    rest = []
+    for line in lines:
+        remainder = line
+        for pattern in (EMAIL, PHONE, LINK, TELEGRAM):
+            remainder = pattern.sub('', remainder)
+        if len(remainder.strip(' ,;|/-–—:')) > 2:
+            rest.append(line)
+    return rest
+
+
+def analyze_resume(text):
+    """Разбирает текст резюме в компактную структуру.
+
+    Args:
+        text (str): Текст резюме из сообщения или документа
+
+    Returns:
+        ResumeModel: Структура резюме
+    """
+    text = normalize(text)
+    sections = split_sections(text)
+    header = sections['header']
+    name = header[0] if header and _NAME.match(header[0]) else ''
+    summary = ' '.join(sections.get('summary', []))[:MAX_SUMMARY]
+    skills, long_skills = extract_skills(sections.get('skills', []))
+    # Разделы с незнакомыми заголовками: по строке на раздел
+    other = [
+        f"{title}: {'; '.join(lines)}"[:MAX_SECTION] for title, lines in sections.items()
+        if title != 'header' and title not in SECTION_TITLES and lines
+    ]
+    roles = extract_roles(sections.get('experience', []))
+    education = tuple(sections.get('education', [])[:MAX_EDUCATION])
+    experience = () if roles else excerpt(sections.get('experience', []))
+    projects = excerpt(sections.get('projects', []))
+    return ResumeModel(
+        name=name,
+        contacts=extract_contacts(text),
+        summary=summary,
+        skills=skills,
+        roles=roles,
+        education=education,
+        experience=experience,
+        projects=projects,
+        languages=excerpt(sections.get('languages', [])),
+        achievements='; '.join(excerpt(sections.get('achievements', []))),
+        extra=excerpt(
+            header_rest(header[1:] if name else header) + other + list(long_skills),
+            MAX_EXTRA
+        ),
+        text='' if skills or roles or experience or projects else text
+    )
@@ -0,0 +1,299 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Tuple
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.shared import Cm, Pt
+
+from config import log, render_workers, resume_layout, resume_template_dir
+from gpt_resilience import LatencyTracker
+
+# Стили шаблона, которые заполняет движок; в своем шаблоне они должны быть
+TITLE_STYLE = 'Resume Title'
+CONTACTS_STYLE = 'Resume Contacts'
+HEADING_STYLE = 'Heading 1'
+BULLET_STYLE = 'List Bullet'
+
+# Заголовки разделов резюме
+SECTION_HEADINGS = {
+    'summary': "О себе",
+    'education': "Образование",
+    'roles': "Опыт работы",
+    'projects': "Проекты",
+    'skills': "Навыки",
+    'achievements': "Достижения"
+}
+
+
+@dataclass(frozen=True)
+class Layout:
+    """Оформление резюме: шрифты, поля и порядок разделов.
+
+    Attributes:
+        name (str): Название макета и имя файла шаблона без расширения
+        font (str): Шрифт текста
+        size (int): Кегль текста
+        title_size (int): Кегль имени
+        title_alignment (int): Выравнивание имени и контактов
+        heading_size (int): Кегль заголовков разделов
+        uppercase_headings (bool): Писать заголовки прописными
+        margin (float): Поля страницы, см
+        sections (tuple): Разделы в порядке вывода
+    """
+    name: str
+    font: str = 'Times New Roman'
+    size: int = 12
+    title_size: int = 14
+    title_alignment: int = WD_PARAGRAPH_ALIGNMENT.CENTER
+    heading_size: int = 13
+    uppercase_headings: bool = True
+    margin: float = 2.0
+    sections: Tuple[str, ...] = ('summary', 'education', 'roles', 'projects', 'skills', 'achievements')
+
+
+LAYOUTS = {
+    'classic': Layout('classic'),
+    'compact': Layout(
+        'compact',
+        font='Calibri',
+        size=10,
+        title_size=16,
+        title_alignment=WD_PARAGRAPH_ALIGNMENT.LEFT,
+        heading_size=11,
+        uppercase_headings=False,
+        margin=1.5,
+        sections=('summary', 'skills', 'roles', 'projects', 'achievements', 'education')
+    )
+}
+
+# Шаблоны макетов в этом процессе: имя макета и содержимое .docx
+_templates = {}
+
+
+def build_template(layout):
+    """Создает шаблон макета со всеми стилями, которые нужны движку.
+
+    Имя и контакты получают собственные стили, поэтому оформление
+    заголовка не меняет стиль Normal остального текста.
+
+    Args:
+        layout (Layout): Макет
+
+    Returns:
+        bytes: Содержимое .docx без текста
+    """
+    doc = Document()
+    for section in doc.sections:
+        section.left_margin = section.right_margin = Cm(layout.margin)
+        section.top_margin = section.bottom_margin = Cm(layout.margin)
+
+    normal = doc.styles['Normal']
+    normal.font.name = layout.font
+    normal.font.size = Pt(layout.size)
+
+    title = doc.styles.add_style(TITLE_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+    title.base_style = normal
+    title.font.bold = True
+    title.font.size = Pt(layout.title_size)
+    title.paragraph_format.alignment = layout.title_alignment
+
+    contacts = doc.styles.add_style(CONTACTS_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+    contacts.base_style = normal
+    contacts.paragraph_format.alignment = layout.title_alignment
+
+    heading = doc.styles[HEADING_STYLE]
+    heading.font.name = layout.font
+    heading.font.size = Pt(layout.heading_size)
+
+    stream = BytesIO()
+    doc.save(stream)
+    return stream.getvalue()
+
+
+def load_template(name):
+    """Возвращает шаблон макета, загружая его при первом обращении.
+
+    Если в RESUME_TEMPLATE_DIR лежит <name>.docx, используется он, иначе
+    шаблон создается build_template.
+
+    Args:
+        name (str): Название макета
+
+    Returns:
+        bytes: Содержимое шаблона
+
+    Raises:
+        ValueError: Неизвестный макет
+    """
+    if name not in LAYOUTS:
+        raise ValueError(f"Неизвестный макет резюме: {name}")
+    template = _templates.get(name)
+    if template is None:
+        path = os.path.join(resume_template_dir, f'{name}.docx')
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                template = file.read()
+        else:
+            template = build_template(LAYOUTS[name])
+        _templates[name] = template
+    return template
+
+
+def load_templates():
+    """Загружает шаблоны всех макетов; вызывается при старте процесса пула."""
+    for name in LAYOUTS:
+        load_template(name)
+
+
+def _write_section(doc, section, model):
+    value = getattr(model, section)
+    if section == 'roles':
+        for role in value:
+            paragraph = doc.add_paragraph(style=BULLET_STYLE)
+            paragraph.add_run(role.title).bold = True
+            paragraph.add_run(f" ({role.period})")
+            if role.details:
+                doc.add_paragraph(role.details)
+    elif section == 'projects':
+        # В описании проекта абзацы разделены пустой строкой
+        for project in value:
+            for part in project.split('\n\n'):
+                if part.strip():
+                    doc.add_paragraph(part.strip(), style=BULLET_STYLE)
+    elif section == 'education':
+        for line in value:
+            doc.add_paragraph(line, style=BULLET_STYLE)
+    elif section == 'skills':
+        doc.add_paragraph(', '.join(value))
+    else:
+        doc.add_paragraph(value)
+
+
+def render_resume(model, layout=resume_layout):
+    """Заполняет шаблон макета данными резюме.
+
+    Пустые разделы пропускаются.
+
+    Args:
+        model (ResumeModel): Структура резюме
+        layout (str): Название макета
+
+    Returns:
+        bytes: Содержимое .docx
+
+    Raises:
+        ValueError: Неизвестный макет
+    """
+    doc = Document(BytesIO(load_template(layout)))
+    settings = LAYOUTS[layout]
+    doc.add_paragraph(model.name, style=TITLE_STYLE)
+    if model.contacts:
+        doc.add_paragraph('  '.join(contact for _, contact in model.contacts), style=CONTACTS_STYLE)
+    for section in settings.sections:
+        if not getattr(model, section):
+            continue
+        heading = SECTION_HEADINGS[section]
+        doc.add_paragraph(heading.upper() if settings.uppercase_headings else heading, style=HEADING_STYLE)
+        _write_section(doc, section, model)
+
+    stream = BytesIO()
+    doc.save(stream)
+    return stream.getvalue()
+
+
+class ResumeRenderer:
+    """Пул процессов, в котором собираются документы резюме.
+
+    Сборка DOCX - чистый Python и держит GIL, поэтому идет в отдельных
+    процессах, а не в потоке обработчика или цикле рантайма. Каждый
+    процесс загружает шаблоны один раз при старте. Если процесс пула
+    упал, пул пересоздается при следующей сборке.
+
+    Args:
+        workers (int): Число процессов
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.latency = LatencyTracker(min_samples=1)
+        self.stats = {'rendered': 0, 'failed': 0, 'restarts': 0}
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: бот многопоточный, а fork копирует чужие захваченные блокировки
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=load_templates
+                )
+            return self._executor
+
+    async def render(self, model, layout=resume_layout):
+        """Собирает документ резюме в процессе пула.
+
+        Args:
+            model (ResumeModel): Структура резюме
+            layout (str): Название макета
+
+        Returns:
+            BytesIO: Документ, готовый к отправке
+
+        Raises:
+            ValueError: Неизвестный макет
+        """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Неизвестный макет резюме: {layout}")
+        started = time.monotonic()
+        executor = self._pool()
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(executor, render_resume, model, layout)
+        except BrokenProcessPool:
+            log.warning("Resume render pool is broken, restarting")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    self.stats['restarts'] += 1
+            executor.shutdown(wait=False)
+            self.stats['failed'] += 1
+            raise
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        self.stats['rendered'] += 1
+        self.latency.record(time.monotonic() - started)
+        return BytesIO(data)
+
+    def close(self):
+        """Останавливает процессы пула."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def snapshot(self):
+        """Возвращает метрики сборки резюме.
+
+        Returns:
+            dict: Счетчики собранных документов, ошибок и перезапусков пула,
+                  медиана и 95-й перцентиль времени сборки
+        """
+        return dict(
+            self.stats,
+            latency_p50=self.latency.percentile(0.5),
+            latency_p95=self.latency.percentile(0.95)
+        )
+
+
+renderer = ResumeRenderer(render_workers)
@@ -0,0 +1,396 @@
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import redis
+
+from config import log, redis_client, session_max, session_ttl, session_store
+from resume_model import ResumeModel
+from transcript import Transcript
+
+# Сколько секунд не обращаться к Redis после ошибки соединения
+REDIS_RETRY_AFTER = 30
+
+# Сколько раз повторять запись сессии, если ее ключ изменился во время записи
+SAVE_ATTEMPTS = 3
+
+# Режимы бота, для которых сессия хранит данные
+MODES = ('cover_letter', 'resume', 'interviewer', 'parser')
+
+# Поля данных сессии и их начальные значения
+FIELD_DEFAULTS = {
+    # Сопроводительное письмо и AI-интервьюер
+    'resume': ResumeModel,
+    'profession': str,
+    'company': str,
+    'description': str,
+    'vacancy': str,
+    'questions': str,
+    'answers': Transcript,
+    'current_question_index': int,
+    # Составление резюме
+    'name': str,
+    'summary': str,
+    'answers_X': Transcript,
+    'answers_Y': Transcript,
+    'answers_Z': Transcript,
+    'dialogue': Transcript,
+    'projects': list,
+    'question_counter': lambda: 1,
+    'skills': str,
+    'achievements': str
+}
+
+# Поля, которые сохраняются в Redis: режим, шаг диалога и данные
+PERSISTED_FIELDS = ('mode', 'state') + tuple(FIELD_DEFAULTS)
+
+# Версия локальной копии, которая точно отличается от версии в Redis
+STALE = -1
+
+
+class Session:
+    """Данные одного чата: текущий режим и ответы пользователя в нем.
+
+    Сессия хранит данные только текущего режима: reset() при входе в
+    режим или рестарте возвращает все поля к начальным значениям. Шаг
+    диалога (state) задает автомат fsm и reset() его не трогает.
+    """
+
+    __slots__ = ('chat_id', 'last_seen', 'version', 'stored') + PERSISTED_FIELDS
+
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+        self.last_seen = 0.0
+        self.version = 0
+        self.state = None
+        self.reset(None)
+        self.stored = self.dump()
+
+    def reset(self, mode):
+        """Начинает режим заново.
+
+        Args:
+            mode (str): Режим из MODES или None, если пользователь в меню
+
+        Returns:
+            Session: Эта же сессия
+        """
+        if mode is not None and mode not in MODES:
+            raise ValueError(f"Неизвестный режим: {mode}")
+        self.mode = mode
+        for field, default in FIELD_DEFAULTS.items():
+            setattr(self, field, default())
+        return self
+
+    def dump(self):
+        """Сериализует сохраняемые поля.
+
+        Returns:
+            dict: Имя поля и его значение в pickle
+        """
+        return {
+            field: pickle.dumps(getattr(self, field), pickle.HIGHEST_PROTOCOL)
+            for field in PERSISTED_FIELDS
+        }
+
+    def restore(self, raw):
+        """Заполняет сессию сохраненными полями, остальные сбрасывает.
+
+        Args:
+            raw (dict): Имя поля и его значение в pickle
+        """
+        self.state = None
+        self.reset(None)
+        for field, value in raw.items():
+            if field in PERSISTED_FIELDS:
+                setattr(self, field, pickle.loads(value))
+        self.stored = self.dump()
+
+    def size(self):
+        """Возвращает примерный объем памяти сессии в байтах."""
+        total = sys.getsizeof(self)
+        for field in FIELD_DEFAULTS:
+            value = getattr(self, field)
+            if isinstance(value, (Transcript, ResumeModel)):
+                total += value.size()
+                continue
+            total += sys.getsizeof(value)
+            if isinstance(value, list):
+                total += sum(sys.getsizeof(item) for item in value)
+        return total
+
+
+class SessionStore:
+    """Ограниченное хранилище сессий с вытеснением по простою и LRU.
+
+    Сессии лежат в OrderedDict в порядке последнего обращения, поэтому
+    просроченные и самые старые сессии всегда в начале и удаляются за O(1).
+
+    Args:
+        max_sessions (int): Максимальное число сессий в памяти
+        idle_ttl (float): Через сколько секунд без обращений сессия удаляется
+        clock (function): Источник времени
+    """
+
+    def __init__(self, max_sessions, idle_ttl, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'created': 0, 'evicted_idle': 0, 'evicted_lru': 0}
+
+    @contextmanager
+    def update(self, chat_id):
+        """Сессия чата на время обработки одного обновления.
+
+        Args:
+            chat_id (int): ID чата
+
+        Yields:
+            Session: Сессия чата
+        """
+        yield self.get(chat_id)
+
+    def get(self, chat_id):
+        """Возвращает сессию чата, создавая ее при необходимости.
+
+        Args:
+            chat_id (int): ID чата
+
+        Returns:
+            Session: Сессия чата
+        """
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            session = self._sessions.get(chat_id)
+            if session is None:
+                session = self._sessions[chat_id] = Session(chat_id)
+                self.stats['created'] += 1
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.stats['evicted_lru'] += 1
+            else:
+                self._sessions.move_to_end(chat_id)
+            session.last_seen = now
+            return session
+
+    def save(self, session):
+        """Сохраняет сессию; сессии в памяти сохранять некуда.
+
+        Returns:
+            bool: True
+        """
+        return True
+
+    def peek(self, chat_id):
+        """Возвращает сессию чата без создания и продления.
+
+        Args:
+            chat_id (int): ID чата
+
+        Returns:
+            Session: Сессия чата или None
+        """
+        with self._lock:
+            self._expire(self.clock())
+            return self._sessions.get(chat_id)
+
+    def drop(self, chat_id):
+        """Удаляет сессию чата."""
+        with self._lock:
+            self._sessions.pop(chat_id, None)
+
+    def clear(self):
+        """Удаляет все сессии."""
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _expire(self, now):
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_seen < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.stats['evicted_idle'] += 1
+
+    def snapshot(self):
+        """Возвращает метрики хранилища.
+
+        Returns:
+            dict: Счетчики созданных и вытесненных сессий, число сессий,
+                  их примерный объем в байтах и число по режимам
+        """
+        with self._lock:
+            self._expire(self.clock())
+            sessions = list(self._sessions.values())
+        modes = {}
+        for session in sessions:
+            modes[session.mode] = modes.get(session.mode, 0) + 1
+        return dict(
+            self.stats,
+            sessions=len(sessions),
+            bytes=sum(session.size() for session in sessions),
+            modes=modes
+        )
+
+
+class RedisSessionStore(SessionStore):
+    """Сессии в Redis, общие для всех реплик бота.
+
+    Каждая сессия - хэш session:<chat_id>: по полю на атрибут в pickle и
+    поле version. update() читает сессию одним HGETALL, после обработки
+    обновления одна транзакция записывает только изменившиеся поля и
+    продлевает TTL. Запись идет с оптимистической блокировкой: если
+    другая реплика успела сохранить сессию, поля объединяются, а при
+    изменении тех же полей побеждает первая запись.
+
+    Локальные копии сессий остаются в памяти: вне update() get() отдает
+    их, а при недоступном Redis бот работает только с ними.
+
+    Args:
+        redis_conn (redis.Redis): Соединение с Redis или None
+        max_sessions (int): Максимальное число локальных копий
+        idle_ttl (float): Время жизни сессии без обращений, секунд
+        namespace (str): Префикс ключей в Redis
+        clock (function): Источник времени
+    """
+
+    def __init__(self, redis_conn, max_sessions, idle_ttl, namespace='session', clock=time.monotonic):
+        super().__init__(max_sessions, idle_ttl, clock)
+        self.redis = redis_conn
+        self.namespace = namespace
+        self._redis_down_until = 0.0
+        self.stats.update(loaded=0, saved=0, merged=0, conflicts=0)
+
+    @contextmanager
+    def update(self, chat_id):
+        session = self.load(chat_id)
+        try:
+            yield session
+        finally:
+            # Сессию могли удалить во время обработки, например выходом в меню
+            if self.peek(chat_id) is session:
+                self.save(session)
+
+    def load(self, chat_id):
+        """Обновляет локальную копию сессии из Redis.
+
+        Args:
+            chat_id (int): ID чата
+
+        Returns:
+            Session: Сессия чата
+        """
+        session = self.get(chat_id)
+        if not self._redis_available():
+            return session
+        try:
+            raw = self.redis.hgetall(self._key(chat_id))
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return session
+        self.stats['loaded'] += 1
+        raw = {field.decode('utf-8'): value for field, value in raw.items()}
+        version = int(raw.pop('version', 0))
+        if version != session.version:
+            # Сессию изменила другая реплика или ключ истек
+            session.restore(raw)
+            session.version = version
+        return session
+
+    def save(self, session):
+        """Записывает изменившиеся поля сессии в Redis.
+
+        Args:
+            session (Session): Сессия
+
+        Returns:
+            bool: True, если сессия сохранена
+        """
+        if not self._redis_available():
+            return False
+        current = session.dump()
+        changed = {field: value for field, value in current.items() if session.stored.get(field) != value}
+        key = self._key(session.chat_id)
+        try:
+            if not changed:
+                if session.version > 0:
+                    self.redis.expire(key, int(self.idle_ttl))
+                return True
+            for _ in range(SAVE_ATTEMPTS):
+                try:
+                    return self._save_changed(session, key, changed)
+                except redis.WatchError:
+                    continue
+            log.warning(f"Session {session.chat_id} was not saved: key kept changing")
+            return False
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return False
+
+    def _save_changed(self, session, key, changed):
+        with self.redis.pipeline() as pipe:
+            pipe.watch(key)
+            version = int(pipe.hget(key, 'version') or 0)
+            merged = version != session.version
+            if merged:
+                remote = dict(zip(changed, pipe.hmget(key, list(changed))))
+                clash = [
+                    field for field, value in remote.items()
+                    if (value if value is not None else DEFAULT_DUMP[field]) != session.stored[field]
+                ]
+                if clash:
+                    pipe.unwatch()
+                    self.stats['conflicts'] += 1
+                    session.version = STALE
+                    log.warning(f"Session {session.chat_id} conflict on {clash}, keeping the other replica's write")
+                    return False
+            pipe.multi()
+            pipe.hset(key, mapping=dict(changed, version=version + 1))
+            pipe.expire(key, int(self.idle_ttl))
+            pipe.execute()
+        session.stored.update(changed)
+        self.stats['saved'] += 1
+        if merged:
+            # Остальные поля другой реплики подтянутся при следующем load()
+            self.stats['merged'] += 1
+            session.version = STALE
+        else:
+            session.version = version + 1
+        return True
+
+    def drop(self, chat_id):
+        super().drop(chat_id)
+        if not self._redis_available():
+            return
+        try:
+            self.redis.delete(self._key(chat_id))
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    def _key(self, chat_id):
+        return f"{self.namespace}:{chat_id}"
+
+    def _redis_available(self):
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e):
+        log.warning(f"Redis session store unavailable: {e}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+
+# Сериализованные начальные значения: так выглядят поля, которых нет в хэше
+DEFAULT_DUMP = Session(0).dump()
+
+if session_store == 'redis':
+    sessions = RedisSessionStore(redis_client, session_max, session_ttl)
+else:
+    sessions = SessionStore(session_max, session_ttl)
@@ -0,0 +1,51 @@
+import asyncio
+
+
+class SingleFlight:
+    """Объединяет одновременные одинаковые запросы в один.
+
+    Первый вызов с ключом запускает задачу, остальные вызовы с тем же
+    ключом ждут ее результат, пока она выполняется. Задача защищена от
+    отмены: если первый вызывающий отменен, остальные все равно получат
+    ответ. Должен использоваться из одного событийного цикла.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.stats = {
+            'leaders': 0,
+            'collapsed': 0
+        }
+
+    @property
+    def in_flight(self):
+        """int: Количество выполняющихся уникальных запросов."""
+        return len(self._calls)
+
+    async def do(self, key, factory):
+        """Выполняет factory() один раз на все одновременные вызовы с ключом.
+
+        Args:
+            key (str): Ключ запроса
+            factory (function): Функция без аргументов, возвращающая корутину
+
+        Returns:
+            Результат корутины, общий для всех ожидающих
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.stats['collapsed'] += 1
+        else:
+            self.stats['leaders'] += 1
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    def snapshot(self):
+        """Возвращает счетчики объединения запросов.
+
+        Returns:
+            dict: Число уникальных запросов, объединенных вызовов и текущих запросов
+        """
+        return dict(self.stats, in_flight=self.in_flight)
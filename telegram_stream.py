@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+from telebot.apihelper import ApiTelegramException
+
+from config import bot, log, stream_edit_interval
+from gpt_client import StreamInterrupted, gpt_client
+from outbox import delivered, send_editable
+
+# Максимальная длина текста одного сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+# Индикатор "печатает" гаснет через 5 секунд, обновляем его чуть чаще
+TYPING_INTERVAL = 4.0
+
+
+class StreamingMessage:
+    """Сообщение Telegram, которое дописывается по мере генерации ответа.
+
+    Правки через edit_message_text отправляются не чаще одного раза в
+    interval секунд. Если текст не помещается в одно сообщение, остаток
+    переносится в новое.
+    """
+
+    def __init__(self, chat_id, header='', interval=stream_edit_interval):
+        self.chat_id = chat_id
+        self.header = header
+        self.interval = interval
+        self.parts = []
+        self.message_id = None
+        self._offset = 0
+        self._shown = ''
+        self._last_edit = 0.0
+        self._last_typing = 0.0
+
+    @property
+    def text(self):
+        """str: Весь полученный на данный момент ответ."""
+        return ''.join(self.parts)
+
+    async def _call(self, method, *args, **kwargs):
+        # Вызовы Bot API блокирующие, выполняем их вне цикла рантайма
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: method(*args, **kwargs))
+
+    async def typing(self):
+        """Отправляет действие "печатает", если предыдущее уже погасло."""
+        now = time.monotonic()
+        if now - self._last_typing >= TYPING_INTERVAL:
+            self._last_typing = now
+            try:
+                await self._call(bot.send_chat_action, self.chat_id, 'typing')
+            except ApiTelegramException as e:
+                log.warning(f"send_chat_action failed for {self.chat_id}: {e}")
+
+    async def feed(self, delta):
+        """Добавляет фрагмент ответа и при необходимости обновляет сообщение.
+
+        Args:
+            delta (str): Очередной фрагмент текста
+        """
+        self.parts.append(delta)
+        if time.monotonic() - self._last_edit >= self.interval:
+            await self.flush()
+        else:
+            await self.typing()
+
+    async def flush(self):
+        """Показывает пользователю весь накопленный текст."""
+        self._last_edit = time.monotonic()
+        text = self.header + self.text
+        while len(text) - self._offset > MESSAGE_LIMIT:
+            await self._show(text[self._offset:self._offset + MESSAGE_LIMIT])
+            self._offset += MESSAGE_LIMIT
+            self.message_id = None
+        await self._show(text[self._offset:])
+
+    async def _show(self, chunk):
+        if not chunk.strip() or (self.message_id is not None and chunk == self._shown):
+            return
+        if self.message_id is None:
+            # Сообщение дальше редактируется и должно содержать только ответ
+            sent_message = await delivered(await self._call(send_editable, bot, self.chat_id, chunk))
+            self.message_id = sent_message.message_id
+        else:
+            try:
+                await self._call(
+                    bot.edit_message_text,
+                    chunk,
+                    chat_id=self.chat_id,
+                    message_id=self.message_id
+                )
+            except ApiTelegramException as e:
+                log.warning(f"edit_message_text failed for {self.chat_id}: {e}")
+        self._shown = chunk
+
+
+async def stream_to_chat(chat_id, prompt, call_type, header=''):
+    """Генерирует ответ GPT и показывает его в чате по мере получения.
+
+    Args:
+        chat_id (int): ID чата пользователя
+        prompt (str): Текст запроса к GPT
+        call_type (str): Тип вызова для маршрутизации и кэша
+        header (str): Текст перед ответом в первом сообщении
+
+    Returns:
+        str: Полный ответ GPT или None, если ответ не получен
+
+    Raises:
+        StreamInterrupted: Поток оборвался; полученная часть уже показана в чате
+    """
+    message = StreamingMessage(chat_id, header)
+    await message.typing()
+    try:
+        async for delta in gpt_client.stream(prompt, call_type):
+            await message.feed(delta)
+    except StreamInterrupted:
+        await message.flush()
+        raise
+    if not message.parts:
+        return None
+    await message.flush()
+    return message.text
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import bots_functions
+from answer_scorer import calibrate, parse_grade, score_answer
+
+VAGUE_ANSWER = (
+    "Мы делали мобильное приложение для доставки еды, я отвечал за серверную "
+    "часть и интеграцию с платежами, общался с заказчиком и тестировщиками"
+)
+
+
+class TestAnswerScorer(unittest.TestCase):
+    def test_parse_grade(self):
+        self.assertEqual(parse_grade("8"), 8)
+        self.assertEqual(parse_grade("Оценка: 7/10"), 7)
+        self.assertEqual(parse_grade("15"), 10)
+        self.assertEqual(parse_grade("не могу оценить"), 5)
+        self.assertEqual(parse_grade(None), 5)
+
+    def test_short_answer_is_decided_low(self):
+        for text in ("не знаю", "Делал сайт", ""):
+            score = score_answer(text)
+            self.assertTrue(score.decided)
+            self.assertLessEqual(score.grade, 3)
+
+    def test_detailed_answer_is_decided_high(self):
+        score = score_answer(
+            "Я разрабатывал внутреннюю CRM для отдела продаж на Django и PostgreSQL, "
+            "настроил деплой в Docker. Время обработки заявки сократилось на 40%, "
+            "а конверсия выросла с 12 до 18 процентов."
+        )
+        self.assertTrue(score.decided)
+        self.assertGreaterEqual(score.grade, 8)
+
+    def test_vague_answer_is_escalated(self):
+        self.assertFalse(score_answer(VAGUE_ANSWER).decided)
+
+    def test_calibrate_reports_agreement(self):
+        report = calibrate([
+            {'answer': "не знаю", 'gpt': 2},
+            {'answer': "Делал сайт", 'gpt': 7},
+            {'answer': "Сделал отчеты в Excel и Tableau, сэкономил 10 часов в неделю", 'gpt': 9}
+        ])
+        self.assertEqual(report['total'], 3)
+        self.assertAlmostEqual(report['coverage'], 2 / 3)
+        self.assertAlmostEqual(report['agreement'], 1 / 2)
+        self.assertEqual(report['gpt_mean_by_local'][1], 4.5)
+
+
+class TestSpeculativeFollowUp(unittest.TestCase):
+    def run_turn(self, gpt_grade):
+        async def completeness(*args):
+            await asyncio.sleep(0.2)
+            return gpt_grade
+
+        async def ask_follow_up(*args):
+            await asyncio.sleep(0.2)
+            return "Какой была нагрузка на сервис?"
+
+        async def run():
+            return await bots_functions.grade_and_follow_up(VAGUE_ANSWER, '', 1), threading.current_thread()
+
+        self.journal_threads = []
+        with patch.object(bots_functions, 'completeness', completeness), \
+                patch.object(bots_functions, 'ask_follow_up', ask_follow_up), \
+                patch.object(bots_functions, 'speculative_follow_up', True), \
+                patch.object(bots_functions, 'record_grade',
+                             lambda *args: self.journal_threads.append(threading.current_thread())):
+            started = time.monotonic()
+            result, self.loop_thread = asyncio.run(run())
+            return result, time.monotonic() - started
+
+    def test_follow_up_runs_concurrently_with_grading(self):
+        result, elapsed = self.run_turn("8")
+        self.assertEqual(result, (8, "Какой была нагрузка на сервис?"))
+        self.assertLess(elapsed, 0.35)
+
+    def test_follow_up_is_dropped_for_low_grade(self):
+        result, _ = self.run_turn("3")
+        self.assertEqual(result, (3, None))
+
+    def test_journal_is_written_off_the_loop(self):
+        self.run_turn("8")
+        self.assertEqual(len(self.journal_threads), 1)
+        self.assertIsNot(self.journal_threads[0], self.loop_thread)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import bots_functions
+from async_runtime import AsyncRuntime
+
+
+class TestOrderedTasks(unittest.TestCase):
+    def setUp(self):
+        self.runtime = AsyncRuntime(100)
+        self.addCleanup(self.runtime.shutdown)
+        self.events = []
+
+    async def step(self, name, delay):
+        self.events.append(f'{name} start')
+        await asyncio.sleep(delay)
+        self.events.append(f'{name} end')
+
+    def test_same_key_runs_in_order_without_blocking_caller(self):
+        started = time.monotonic()
+        first = self.runtime.submit_ordered(1, lambda: self.step('a', 0.2))
+        second = self.runtime.submit_ordered(1, lambda: self.step('b', 0))
+        other = self.runtime.submit_ordered(2, lambda: self.step('c', 0))
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertTrue(self.runtime.busy(1))
+
+        other.result(2)
+        self.assertNotIn('b start', self.events)
+        second.result(2)
+        first.result(2)
+
+        self.assertLess(self.events.index('a end'), self.events.index('b start'))
+        self.assertFalse(self.runtime.busy(1))
+
+    def test_failed_task_does_not_stop_the_queue(self):
+        async def fail():
+            raise ValueError("boom")
+
+        self.runtime.submit_ordered(1, fail)
+        self.assertIsNone(self.runtime.submit_ordered(1, lambda: self.step('a', 0)).result(2))
+        self.assertEqual(self.events, ['a start', 'a end'])
+
+
+class TestChatOrder(unittest.TestCase):
+    def setUp(self):
+        self.runtime = AsyncRuntime(100)
+        self.addCleanup(self.runtime.shutdown)
+        patcher = patch.object(bots_functions, 'runtime', self.runtime)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_next_update_waits_for_async_handler_without_pinning_thread(self):
+        events = []
+        done = threading.Event()
+
+        async def slow(message):
+            await asyncio.sleep(0.2)
+            events.append('handler')
+
+        def next_update():
+            events.append('next')
+            done.set()
+
+        message = MagicMock()
+        message.chat.id = 1
+        started = time.monotonic()
+        bots_functions.async_handler(slow)(message)
+        bots_functions.in_chat_order(1, next_update)
+        self.assertLess(time.monotonic() - started, 0.1)
+
+        self.assertTrue(done.wait(2))
+        self.assertEqual(events, ['handler', 'next'])
+
+    def test_idle_chat_is_handled_in_place(self):
+        threads = []
+        bots_functions.in_chat_order(1, lambda: threads.append(threading.current_thread()))
+        self.assertEqual(threads, [threading.current_thread()])
+
+
+if __name__ == '__main__':
+    unittest.main()
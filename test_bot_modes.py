@@ -14,11 +14,11 @@ from bots_functions import (
     ai_interviewer_start,
     parser_start,
     return_to_main_menu,
-    current_mode,
     create_main_menu,
     create_restart_menu,
     create_main_menu_button
 )
+from sessions import sessions
 
 class TestBotModes(unittest.TestCase):
     def setUp(self):
@@ -30,7 +30,7 @@ class TestBotModes(unittest.TestCase):
         # Мокаем все необходимые функции
         self.patchers = [
             patch('bots_functions.bot.send_message'),
-            patch('bots_functions.bot.register_next_step_handler'),
+            patch('bots_functions.fsm.set'),
             patch('bots_functions.create_main_menu'),
             patch('bots_functions.create_restart_menu'),
             patch('bots_functions.create_main_menu_button')
@@ -41,7 +41,7 @@ class TestBotModes(unittest.TestCase):
             
         # Настраиваем возвращаемые значения для моков
         self.mock_send_message = self.patchers[0].start()
-        self.mock_register_next_step = self.patchers[1].start()
+        self.mock_fsm_set = self.patchers[1].start()
         self.mock_create_main_menu = self.patchers[2].start()
         self.mock_create_restart_menu = self.patchers[3].start()
         self.mock_create_main_menu_button = self.patchers[4].start()
@@ -54,11 +54,11 @@ class TestBotModes(unittest.TestCase):
     def tearDown(self):
         for patcher in self.patchers:
             patcher.stop()
-        current_mode.clear()
+        sessions.clear()
 
     def reset_mocks(self):
         self.mock_send_message.reset_mock()
-        self.mock_register_next_step.reset_mock()
+        self.mock_fsm_set.reset_mock()
         self.mock_create_main_menu.reset_mock()
         self.mock_create_restart_menu.reset_mock()
         self.mock_create_main_menu_button.reset_mock()
@@ -68,79 +68,79 @@ class TestBotModes(unittest.TestCase):
         self.mock_create_main_menu_button.assert_called_once()
         self.mock_create_restart_menu.assert_not_called()
         self.mock_send_message.assert_called_once()
-        self.mock_register_next_step.assert_called_once()
-        self.assertEqual(current_mode[123], "cover_letter")
+        self.mock_fsm_set.assert_called_once()
+        self.assertEqual(sessions.get(123).mode, "cover_letter")
 
     def test_resume_mode(self):
         resume_mode(self.message)
         self.mock_create_main_menu_button.assert_called_once()
         self.mock_create_restart_menu.assert_not_called()
         self.mock_send_message.assert_called_once()
-        self.mock_register_next_step.assert_called_once()
-        self.assertEqual(current_mode[123], "resume")
+        self.mock_fsm_set.assert_called_once()
+        self.assertEqual(sessions.get(123).mode, "resume")
 
     def test_ai_interviewer_mode(self):
         ai_interviewer_mode(self.message)
         self.mock_create_main_menu_button.assert_called_once()
         self.mock_create_restart_menu.assert_not_called()
         self.mock_send_message.assert_called_once()
-        self.mock_register_next_step.assert_called_once()
-        self.assertEqual(current_mode[123], "interviewer")
+        self.mock_fsm_set.assert_called_once()
+        self.assertEqual(sessions.get(123).mode, "interviewer")
 
     def test_parser_mode(self):
         parser_mode(self.message)
         self.mock_create_main_menu_button.assert_called_once()
         self.mock_create_restart_menu.assert_not_called()
         self.mock_send_message.assert_called_once()
-        self.mock_register_next_step.assert_called_once()
-        self.assertEqual(current_mode[123], "parser")
+        self.mock_fsm_set.assert_called_once()
+        self.assertEqual(sessions.get(123).mode, "parser")
 
     def test_main_menu_handler(self):
         main_menu_handler(self.message)
         self.mock_create_main_menu.assert_called_once()
         self.mock_send_message.assert_called_once()
-        self.assertNotIn(123, current_mode)
+        self.assertIsNone(sessions.peek(123))
 
     def test_restart_handler(self):
         # Тест для режима сопроводительного письма
         self.reset_mocks()
-        current_mode[123] = "cover_letter"
+        sessions.get(123).mode = "cover_letter"
         restart_handler(self.message)
         self.mock_create_restart_menu.assert_not_called()
         self.mock_create_main_menu_button.assert_called_once()
         self.mock_send_message.assert_called_once()
-        self.mock_register_next_step.assert_called_once()
+        self.mock_fsm_set.assert_called_once()
 
         # Тест для режима резюме
         self.reset_mocks()
-        current_mode[123] = "resume"
+        sessions.get(123).mode = "resume"
         restart_handler(self.message)
         self.mock_create_restart_menu.assert_not_called()
         self.mock_create_main_menu_button.assert_called_once()
         self.mock_send_message.assert_called_once()
-        self.mock_register_next_step.assert_called_once()
+        self.mock_fsm_set.assert_called_once()
 
         # Тест для режима AI интервьюера
         self.reset_mocks()
-        current_mode[123] = "interviewer"
+        sessions.get(123).mode = "interviewer"
         restart_handler(self.message)
         self.mock_create_restart_menu.assert_not_called()
         self.mock_create_main_menu_button.assert_called_once()
         self.mock_send_message.assert_called_once()
-        self.mock_register_next_step.assert_called_once()
+        self.mock_fsm_set.assert_called_once()
 
         # Тест для режима парсера
         self.reset_mocks()
-        current_mode[123] = "parser"
+        sessions.get(123).mode = "parser"
         restart_handler(self.message)
         self.mock_create_restart_menu.assert_not_called()
         self.mock_create_main_menu_button.assert_called_once()
         self.mock_send_message.assert_called_once()
-        self.mock_register_next_step.assert_called_once()
+        self.mock_fsm_set.assert_called_once()
 
         # Тест для неопределенного режима
         self.reset_mocks()
-        current_mode[123] = "unknown"
+        sessions.get(123).mode = "unknown"
         restart_handler(self.message)
         self.mock_create_main_menu.assert_called_once()
         self.mock_create_restart_menu.assert_not_called()
@@ -0,0 +1,79 @@
+import threading
+import time
+import unittest
+
+from telebot import types
+
+from dispatcher import ShardedDispatcher, in_shard, update_chat_id
+from webhook import fake_update
+
+
+class FakeBot:
+    """Бот, который только записывает обработанные обновления."""
+
+    def __init__(self):
+        self.threaded = True
+        self.handled = []
+        self.lock = threading.Lock()
+
+    def process_new_updates(self, updates):
+        for update in updates:
+            chat_id = update.message.chat.id
+            # Первое сообщение каждого чата обрабатывается дольше
+            time.sleep(0.2 if update.message.text == '1' else 0.01)
+            with self.lock:
+                self.handled.append((chat_id, update.message.text, in_shard()))
+
+
+def make_update(chat_id, text, update_id):
+    return types.Update.de_json(fake_update(chat_id, text, update_id))
+
+
+class TestDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.bot = FakeBot()
+        self.dispatcher = ShardedDispatcher(self.bot, 4)
+        self.dispatcher.install()
+        self.addCleanup(self.dispatcher.stop)
+
+    def test_keeps_order_within_chat_and_runs_chats_in_parallel(self):
+        updates = [make_update(chat, str(i), chat * 10 + i) for i in (1, 2, 3) for chat in (1, 2, 3, 4)]
+
+        started = time.monotonic()
+        self.bot.process_new_updates(updates)
+        self.dispatcher.stop()
+
+        self.assertLess(time.monotonic() - started, 0.6)
+        for chat in (1, 2, 3, 4):
+            texts = [text for chat_id, text, _ in self.bot.handled if chat_id == chat]
+            self.assertEqual(texts, ['1', '2', '3'])
+        self.assertTrue(all(shard for _, _, shard in self.bot.handled))
+        self.assertFalse(self.bot.threaded)
+
+    def test_snapshot_reports_shards(self):
+        self.bot.process_new_updates([make_update(5, '1', 1), make_update(5, '2', 2)])
+        self.dispatcher.stop()
+
+        snapshot = self.dispatcher.snapshot()
+        self.assertEqual(len(snapshot), 4)
+        shard = snapshot[self.dispatcher.shard_for(5)]
+        self.assertEqual(shard['processed'], 2)
+        self.assertEqual(shard['depth'], 0)
+        self.assertGreaterEqual(shard['max_depth'], 1)
+
+    def test_chat_id_of_callback_query(self):
+        update = types.Update.de_json({
+            'update_id': 1,
+            'callback_query': {
+                'id': '1',
+                'from': {'id': 9, 'is_bot': False, 'first_name': 'Test'},
+                'chat_instance': '1',
+                'data': 'x',
+                'message': fake_update(8, 'menu', 1)['message']
+            }
+        })
+        self.assertEqual(update_chat_id(update), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
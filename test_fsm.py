@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import MagicMock
+
+from fsm import ConversationFSM
+from sessions import SessionStore
+
+
+def make_message(text='ответ', content_type='text', chat_id=1):
+    message = MagicMock()
+    message.chat.id = chat_id
+    message.text = text
+    message.content_type = content_type
+    return message
+
+
+class TestConversationFSM(unittest.TestCase):
+    def setUp(self):
+        self.bot = MagicMock()
+        self.store = SessionStore(100, 3600)
+        self.calls = []
+        self.fsm = self.make_fsm()
+
+    def make_fsm(self):
+        fsm = ConversationFSM(self.bot, self.store)
+        fsm.state('ask_name', lambda message, user_id: self.calls.append(('name', message.text, user_id)),
+                  ('text',), "Текстом, пожалуйста")
+        fsm.button("🏠 Главное меню", lambda message: self.calls.append(('menu',)))
+        return fsm
+
+    def test_step_receives_args_and_is_consumed(self):
+        self.fsm.set(1, 'ask_name', 42)
+
+        self.assertTrue(self.fsm.handle(make_message('Иван')))
+        self.assertFalse(self.fsm.handle(make_message('еще раз')))
+        self.assertEqual(self.calls, [('name', 'Иван', 42)])
+
+    def test_invalid_content_type_keeps_state(self):
+        self.fsm.set(1, 'ask_name', 42)
+
+        self.fsm.handle(make_message(None, 'photo'))
+
+        self.bot.send_message.assert_called_once_with(1, "Текстом, пожалуйста")
+        self.assertEqual(self.fsm.get(1), ('ask_name', (42,)))
+
+    def test_menu_button_wins_over_state(self):
+        self.fsm.set(1, 'ask_name', 42)
+
+        self.fsm.handle(make_message("🏠 Главное меню"))
+
+        self.assertEqual(self.calls, [('menu',)])
+        self.assertIsNone(self.fsm.get(1))
+
+    def test_state_lives_in_session(self):
+        self.fsm.set(1, 'ask_name', 42)
+        self.assertEqual(self.store.peek(1).state, ('ask_name', (42,)))
+
+        self.store.drop(1)
+        self.assertFalse(self.fsm.handle(make_message('Иван')))
+
+    def test_unknown_state_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.fsm.set(1, 'missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,532 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from aiohttp import web
+
+from async_runtime import AsyncRuntime
+from fake_openai import StandIn, parse_latency
+import bots_functions
+import telegram_stream
+from gpt_client import GPTClient, StreamInterrupted, build_request
+from gpt_routes import estimate_tokens, trim_to_tokens
+from gpt_resilience import CircuitBreaker, RetryPolicy
+from llm_cache import TieredCache
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler, TokenBucket
+
+
+class FakeOpenAI:
+    """Локальный сервер /v1/chat/completions для тестов клиента."""
+
+    def __init__(self, delay=0.0, status=200, failures=None, headers=None, delays=None, drop_stream=False):
+        self.delay = delay
+        self.drop_stream = drop_stream
+        self.delays = delays or []
+        self.status = status
+        self.failures = failures
+        self.headers = headers or {}
+        self.requests = []
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.runner = None
+        self.url = None
+
+    async def handle(self, request):
+        body = await request.json()
+        self.requests.append(body)
+        index = len(self.requests) - 1
+        await asyncio.sleep(self.delays[index] if index < len(self.delays) else self.delay)
+        failing = self.failures is None or len(self.requests) <= self.failures
+        if self.status != 200 and failing:
+            return web.json_response(
+                {'error': {'message': 'fail'}},
+                status=self.status,
+                headers=self.headers
+            )
+        if body.get('stream'):
+            response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+            await response.prepare(request)
+            for token in ('o', 'k'):
+                chunk = {'choices': [{'delta': {'content': token}}]}
+                await response.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+                if self.drop_stream:
+                    # Обрыв соединения посреди ответа
+                    request.transport.close()
+                    return response
+            await response.write(b'data: [DONE]\n\n')
+            return response
+        return web.json_response({
+            'choices': [{'message': {'role': 'assistant', 'content': 'ok'}}]
+        })
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}/v1/chat/completions'
+
+    def start(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class TestGPTClient(unittest.TestCase):
+    def make_client(self, server, cache=None, scheduler=None, **kwargs):
+        runtime = AsyncRuntime(100)
+        self.addCleanup(runtime.shutdown)
+        return GPTClient(server.url, 'test-key', 10, 5, 5, runtime, cache, scheduler, **kwargs)
+
+    def test_complete_sync_returns_content(self):
+        server = FakeOpenAI().start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server)
+
+        self.assertEqual(client.complete_sync('привет'), 'ok')
+        self.assertEqual(server.requests[0]['messages'][0]['content'], 'привет')
+        self.assertEqual(server.requests[0]['model'], 'gpt-4o-mini')
+
+    def test_call_type_selects_route(self):
+        server = FakeOpenAI().start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server)
+
+        client.complete_sync('оценка', 'completeness')
+        client.complete_sync('письмо', 'cover_letter')
+
+        self.assertEqual(server.requests[0]['max_tokens'], 3)
+        self.assertEqual(server.requests[0]['temperature'], 0.0)
+        self.assertEqual(server.requests[0]['stop'], ['\n'])
+        self.assertEqual(server.requests[1]['max_tokens'], 1200)
+        self.assertNotIn('stop', server.requests[1])
+
+    def test_error_status_returns_none(self):
+        server = FakeOpenAI(status=500).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server)
+
+        self.assertIsNone(client.complete_sync('привет'))
+
+    def test_concurrent_requests_overlap(self):
+        server = FakeOpenAI(delay=0.3).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server)
+
+        async def run():
+            return await asyncio.gather(*(client.complete(f'q{i}') for i in range(8)))
+
+        started = time.monotonic()
+        results = asyncio.run(run())
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(results, ['ok'] * 8)
+        self.assertLess(elapsed, 1.5)
+
+    def test_runtime_handlers_share_one_loop(self):
+        server = FakeOpenAI(delay=0.3).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server)
+
+        loops = set()
+
+        async def handler(i):
+            loops.add(asyncio.get_running_loop())
+            return await client.complete(f'q{i}')
+
+        started = time.monotonic()
+        futures = [client.runtime.submit(handler(i)) for i in range(8)]
+        results = [future.result() for future in futures]
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(results, ['ok'] * 8)
+        self.assertEqual(len(loops), 1)
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(client.runtime.pending, 0)
+
+    def test_cached_prompt_skips_upstream(self):
+        server = FakeOpenAI().start()
+        self.addCleanup(server.stop)
+        cache = TieredCache('test', FakeRedis(), 100, 10000, {'default': 60})
+        client = self.make_client(server, cache)
+
+        self.assertEqual(client.complete_sync('привет'), 'ok')
+        self.assertEqual(client.complete_sync('привет'), 'ok')
+        self.assertEqual(client.complete_sync('привет', max_tokens=10), 'ok')
+
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(cache.snapshot()['hits_l1'], 1)
+
+    def test_stream_yields_deltas_and_fills_cache(self):
+        server = FakeOpenAI().start()
+        self.addCleanup(server.stop)
+        cache = TieredCache('test', None, 100, 10000, {'default': 60})
+        client = self.make_client(server, cache)
+
+        async def collect():
+            return [delta async for delta in client.stream('привет')]
+
+        self.assertEqual(client.runtime.run(collect()), ['o', 'k'])
+        self.assertEqual(client.runtime.run(collect()), ['ok'])
+        self.assertEqual(len(server.requests), 1)
+        self.assertTrue(server.requests[0]['stream'])
+
+    def test_dropped_stream_is_reported(self):
+        server = FakeOpenAI(drop_stream=True).start()
+        self.addCleanup(server.stop)
+        cache = TieredCache('test', None, 100, 10000, {'default': 60})
+        client = self.make_client(server, cache)
+        received = []
+
+        async def collect():
+            async for delta in client.stream('привет'):
+                received.append(delta)
+
+        with self.assertRaises(StreamInterrupted):
+            client.runtime.run(collect())
+        self.assertEqual(received, ['o'])
+        self.assertIsNone(cache.get(cache.make_key(build_request('привет', 'default', {})), 60))
+
+    def test_dropped_stream_reply_ends_with_error(self):
+        server = FakeOpenAI(drop_stream=True).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server)
+        telegram_bot = MagicMock()
+        telegram_bot.send_message.return_value = MagicMock(message_id=1)
+
+        with patch.object(telegram_stream, 'gpt_client', client), \
+                patch.object(telegram_stream, 'bot', telegram_bot), \
+                patch.object(bots_functions, 'bot', telegram_bot), \
+                patch.object(bots_functions, 'gpt_streaming', True):
+            client.runtime.run(bots_functions.send_long_reply(1, 'письмо', 'cover_letter', 'Письмо:\n\n', 'Меню'))
+
+        texts = [call.args[1] for call in telegram_bot.send_message.call_args_list]
+        self.assertEqual(texts[0], 'Письмо:\n\no')
+        self.assertIn("Ответ прервался", texts[1])
+        self.assertEqual(texts[2], 'Меню')
+
+    def test_identical_in_flight_requests_are_collapsed(self):
+        server = FakeOpenAI(delay=0.3).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server)
+
+        async def run():
+            return await asyncio.gather(
+                *(client.complete('одинаковый промпт') for _ in range(5)),
+                client.complete('другой промпт')
+            )
+
+        self.assertEqual(client.runtime.run(run()), ['ok'] * 6)
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(client.flights.snapshot(), {'leaders': 2, 'collapsed': 4, 'in_flight': 0})
+
+    def test_rate_limited_request_is_requeued(self):
+        server = FakeOpenAI(status=429, failures=1, headers={'Retry-After': '0.2'}).start()
+        self.addCleanup(server.stop)
+        scheduler = LLMScheduler(6000, 10 ** 6)
+        client = self.make_client(server, scheduler=scheduler, retry=RetryPolicy(3, base=0.01))
+
+        started = time.monotonic()
+        self.assertEqual(client.complete_sync('привет'), 'ok')
+
+        self.assertEqual(len(server.requests), 2)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(scheduler.snapshot()['throttled'], 1)
+
+    def test_server_errors_are_retried(self):
+        server = FakeOpenAI(status=503, failures=2).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server, retry=RetryPolicy(3, base=0.01))
+
+        self.assertEqual(client.complete_sync('привет'), 'ok')
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(client.stats['retries'], 2)
+        self.assertFalse(client.breaker.is_open)
+
+    def test_client_errors_are_not_retried(self):
+        server = FakeOpenAI(status=400).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server, retry=RetryPolicy(3, base=0.01))
+
+        self.assertIsNone(client.complete_sync('привет'))
+        self.assertEqual(len(server.requests), 1)
+
+    def test_breaker_fails_fast_when_api_is_down(self):
+        server = FakeOpenAI(status=500).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(
+            server,
+            retry=RetryPolicy(2, base=0.01),
+            breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        )
+
+        self.assertIsNone(client.complete_sync('первый'))
+        self.assertIsNone(client.complete_sync('второй'))
+        self.assertTrue(client.breaker.is_open)
+        self.assertEqual(len(server.requests), 3)
+
+        self.assertIsNone(client.complete_sync('третий'))
+        self.assertEqual(len(server.requests), 3)
+
+    def test_rate_limited_probe_reopens_breaker(self):
+        server = FakeOpenAI(status=429, failures=1).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+        client.breaker.record_failure()
+        time.sleep(0.06)
+
+        self.assertIsNone(client.complete_sync('проба'))
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+        time.sleep(0.06)
+        self.assertEqual(client.complete_sync('снова'), 'ok')
+        self.assertFalse(client.breaker.is_open)
+
+    def test_client_error_probe_closes_breaker(self):
+        server = FakeOpenAI(status=400).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+        client.breaker.record_failure()
+        time.sleep(0.06)
+
+        self.assertIsNone(client.complete_sync('проба'))
+        self.assertFalse(client.breaker.is_open)
+
+    def test_cancelled_probe_is_released(self):
+        server = FakeOpenAI(delay=1.0).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+        client.breaker.record_failure()
+        time.sleep(0.06)
+
+        async def cancel_probe():
+            probe = asyncio.ensure_future(client._post({'messages': [{'content': 'x'}], 'max_tokens': 1}, 'default'))
+            await asyncio.sleep(0.1)
+            self.assertFalse(client.breaker.allow())
+            probe.cancel()
+            await asyncio.gather(probe, return_exceptions=True)
+
+        client.runtime.run(cancel_probe())
+        self.assertEqual(client.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(client.breaker.allow())
+
+    def test_slow_request_is_hedged(self):
+        server = FakeOpenAI(delays=[2.0]).start()
+        self.addCleanup(server.stop)
+        client = self.make_client(server, hedge=True)
+        for _ in range(20):
+            client._latency('default').record(0.05)
+
+        started = time.monotonic()
+        self.assertEqual(client.complete_sync('привет'), 'ok')
+
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(client.stats['hedge_wins'], 1)
+
+
+class StandInServer(FakeOpenAI):
+    """Запускает fake_openai.StandIn в отдельном потоке."""
+
+    def __init__(self, stand_in):
+        super().__init__()
+        self.stand_in = stand_in
+
+    async def handle(self, request):
+        return await self.stand_in.handle(request)
+
+
+class TestStandIn(unittest.TestCase):
+    def start(self, stand_in):
+        server = StandInServer(stand_in).start()
+        self.addCleanup(server.stop)
+        runtime = AsyncRuntime(100)
+        self.addCleanup(runtime.shutdown)
+        return GPTClient(server.url, 'test-key', 10, 5, 5, runtime)
+
+    def test_latency_specs(self):
+        self.assertEqual(parse_latency('fixed:0.3')(), 0.3)
+        self.assertTrue(0.1 <= parse_latency('uniform:0.1,0.2')() <= 0.2)
+        self.assertGreater(parse_latency('lognormal:-1,0.5')(), 0)
+        with self.assertRaises(ValueError):
+            parse_latency('gamma:1')
+
+    def test_synthetic_grade_and_stream(self):
+        client = self.start(StandIn(token_delay=0))
+
+        self.assertIn(client.complete_sync('Оцени ответ', 'completeness'),
+                      [str(i) for i in range(1, 11)])
+
+        async def collect():
+            return ''.join([part async for part in client.stream('Напиши письмо', 'cover_letter')])
+        self.assertTrue(client.runtime.run(collect()).startswith('Тестовый ответ'))
+
+    def test_record_then_replay(self):
+        upstream = FakeOpenAI().start()
+        self.addCleanup(upstream.stop)
+        cassette = os.path.join(tempfile.mkdtemp(), 'bot.jsonl')
+
+        recorder = StandIn('record', cassette, upstream=upstream.url)
+        self.assertEqual(self.start(recorder).complete_sync('привет'), 'ok')
+        self.assertEqual(recorder.stats['recorded'], 1)
+
+        player = StandIn('replay', cassette)
+        client = self.start(player)
+        self.assertEqual(client.complete_sync('привет'), 'ok')
+        self.assertIsNone(client.complete_sync('другой вопрос'))
+        self.assertEqual(player.stats['replayed'], 1)
+        self.assertEqual(len(upstream.requests), 1)
+
+    def test_injected_errors(self):
+        client = self.start(StandIn(error_rate=1.0, error_statuses=[503]))
+        self.assertIsNone(client.complete_sync('привет'))
+
+
+class TestResilience(unittest.TestCase):
+    def test_retry_delay_honors_retry_after(self):
+        policy = RetryPolicy(base=0.5, cap=4)
+        for attempt in range(6):
+            self.assertLessEqual(policy.delay(attempt), 4)
+        self.assertGreaterEqual(policy.delay(0, retry_after=3), 3)
+
+    def test_breaker_half_open_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        probe = breaker.allow()
+        self.assertTrue(probe)
+        self.assertFalse(breaker.allow())
+        breaker.release(probe)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+
+    def test_stale_request_does_not_release_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        before_trip = breaker.allow()
+        breaker.record_failure()
+
+        time.sleep(0.06)
+        probe = breaker.allow()
+        self.assertTrue(probe)
+        # Запрос, пропущенный до размыкания, заканчивается во время пробы
+        breaker.release(before_trip)
+        self.assertFalse(breaker.allow())
+        breaker.release(probe)
+        self.assertTrue(breaker.allow())
+
+
+class TestScheduler(unittest.TestCase):
+    def test_token_bucket_wait_time(self):
+        bucket = TokenBucket(60, burst_seconds=1)
+        self.assertEqual(bucket.wait_time(1), 0.0)
+        bucket.take(1)
+        self.assertAlmostEqual(bucket.wait_time(1), 1.0, places=1)
+
+    def test_interactive_requests_overtake_batch(self):
+        # 1 запрос в секунду: первый проходит сразу, остальные ждут в очереди
+        scheduler = LLMScheduler(60, 10 ** 6)
+        scheduler.requests = TokenBucket(60, burst_seconds=1)
+        order = []
+
+        async def request(name, priority):
+            await scheduler.acquire(priority, 10)
+            order.append(name)
+
+        async def run():
+            first = asyncio.ensure_future(request('first', BATCH))
+            await asyncio.sleep(0)
+            batch = asyncio.ensure_future(request('batch', BATCH))
+            await asyncio.sleep(0.05)
+            interactive = asyncio.ensure_future(request('interactive', INTERACTIVE))
+            await asyncio.sleep(0.05)
+            depth = scheduler.snapshot()['queue_by_priority']
+            await asyncio.gather(first, batch, interactive)
+            return depth
+
+        depth = asyncio.run(run())
+
+        self.assertEqual(order, ['first', 'interactive', 'batch'])
+        self.assertEqual(depth, {'interactive': 1, 'normal': 0, 'batch': 1})
+        self.assertGreater(scheduler.snapshot()['wait_max'], 1.0)
+
+
+class TestRoutes(unittest.TestCase):
+    def test_short_text_is_not_trimmed(self):
+        self.assertEqual(trim_to_tokens('Python, SQL', 100), 'Python, SQL')
+
+    def test_long_text_is_trimmed_to_budget(self):
+        text = 'Опыт работы Python-разработчиком в продуктовой команде. ' * 300
+        trimmed = trim_to_tokens(text, 500)
+
+        self.assertLessEqual(estimate_tokens(trimmed), 510)
+        self.assertTrue(text.startswith(trimmed[:-2]))
+
+
+class FakeRedis:
+    """Минимальная замена redis.Redis для get/set."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+class TestTieredCache(unittest.TestCase):
+    def test_l1_evicts_least_recently_used(self):
+        cache = TieredCache('test', None, 2, 10000)
+        cache.set('a', '1', 60)
+        cache.set('b', '2', 60)
+        cache.get('a')
+        cache.set('c', '3', 60)
+
+        self.assertEqual(cache.get('a'), '1')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.snapshot()['evictions'], 1)
+
+    def test_l1_respects_byte_budget(self):
+        cache = TieredCache('test', None, 100, 10)
+        cache.set('a', 'x' * 6, 60)
+        cache.set('b', 'y' * 6, 60)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.snapshot()['l1_bytes'], 6)
+
+    def test_l2_hit_is_promoted_to_l1(self):
+        redis_conn = FakeRedis()
+        TieredCache('test', redis_conn, 10, 1000).set('k', 'значение', 60)
+        cache = TieredCache('test', redis_conn, 10, 1000)
+
+        self.assertEqual(cache.get('k'), 'значение')
+        self.assertEqual(cache.get('k'), 'значение')
+        self.assertEqual(cache.snapshot()['hits_l2'], 1)
+        self.assertEqual(cache.snapshot()['hits_l1'], 1)
+
+    def test_zero_ttl_is_not_cached(self):
+        cache = TieredCache('test', None, 10, 1000, {'ask_follow_up': 0})
+        cache.set('k', 'v', cache.ttl_for('ask_follow_up'))
+        self.assertIsNone(cache.get('k'))
+
+
+if __name__ == '__main__':
+    unittest.main()
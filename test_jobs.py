@@ -0,0 +1,237 @@
+import asyncio
+import time
+import unittest
+
+import redis
+
+from async_runtime import AsyncRuntime
+from gpt_resilience import RetryPolicy
+from jobs import JobQueue, DONE, FAILED, RUNNING
+
+
+class FakeRedis:
+    """Минимальная замена redis.Redis для хранилища задач."""
+
+    def __init__(self):
+        self.data = {}
+        self.sets = {}
+        self.expires = {}
+        self.revisions = {}
+
+    def get(self, key):
+        if key in self.expires and time.monotonic() >= self.expires[key]:
+            self.delete(key)
+        value = self.data.get(key)
+        return value.encode('utf-8') if value is not None else None
+
+    def set(self, key, value, ex=None, px=None):
+        self.data[key] = str(value)
+        self.expires.pop(key, None)
+        if px is not None:
+            self.expires[key] = time.monotonic() + px / 1000
+        self.revisions[key] = self.revisions.get(key, 0) + 1
+
+    def exists(self, key):
+        return int(self.get(key) is not None)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+
+    def sadd(self, key, value):
+        self.sets.setdefault(key, set()).add(value.encode('utf-8'))
+
+    def srem(self, key, value):
+        self.sets.setdefault(key, set()).discard(value.encode('utf-8'))
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, conn):
+        self.conn = conn
+        self.calls = []
+        self.watched = {}
+        self.immediate = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, key):
+        self.watched[key] = self.conn.revisions.get(key, 0)
+        self.immediate = True
+
+    def multi(self):
+        self.immediate = False
+
+    def __getattr__(self, name):
+        if self.immediate:
+            return getattr(self.conn, name)
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        for key, revision in self.watched.items():
+            if self.conn.revisions.get(key, 0) != revision:
+                raise redis.WatchError()
+        for name, args, kwargs in self.calls:
+            getattr(self.conn, name)(*args, **kwargs)
+
+
+class TestJobQueue(unittest.TestCase):
+    def make_queue(self, redis_conn=None, max_attempts=3, **kwargs):
+        runtime = AsyncRuntime(100)
+        self.addCleanup(runtime.shutdown)
+        return JobQueue(redis_conn, 2, max_attempts, runtime, RetryPolicy(max_attempts, base=0.01), **kwargs)
+
+    def wait_for(self, condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("timeout")
+            time.sleep(0.01)
+
+    def test_runs_job_with_payload(self):
+        results = []
+
+        async def handler(chat_id, text):
+            results.append((chat_id, text))
+
+        store = FakeRedis()
+        queue = self.make_queue(store)
+        queue.register('echo', handler)
+        job_id = queue.enqueue('echo', 1, {'text': 'привет'})
+
+        self.wait_for(lambda: queue.stats['done'] == 1)
+        self.assertEqual(results, [(1, 'привет')])
+        self.assertEqual(queue.status(job_id)['status'], DONE)
+        self.assertEqual(store.smembers('jobs:unfinished'), set())
+
+    def test_retries_then_reports_failure(self):
+        calls = []
+        failed = []
+
+        async def handler(chat_id):
+            calls.append(chat_id)
+            raise RuntimeError("boom")
+
+        async def on_failure(chat_id):
+            failed.append(chat_id)
+
+        store = FakeRedis()
+        queue = self.make_queue(store, max_attempts=3)
+        queue.register('broken', handler, on_failure)
+        job_id = queue.enqueue('broken', 7)
+
+        self.wait_for(lambda: failed)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(queue.stats['retried'], 2)
+        status = queue.status(job_id)
+        self.assertEqual(status['status'], FAILED)
+        self.assertEqual(status['error'], 'boom')
+
+    def test_retry_skips_completed_steps(self):
+        sent = []
+        attempts = []
+
+        async def handler(chat_id):
+            attempts.append(chat_id)
+
+            async def progress():
+                sent.append('progress')
+                return ['описание']
+
+            async def document():
+                if len(attempts) == 1:
+                    raise RuntimeError("upload failed")
+                sent.append('document')
+
+            projects = await queue.once('projects', progress)
+            self.assertEqual(projects, ['описание'])
+            await queue.once('document', document)
+
+        store = FakeRedis()
+        queue = self.make_queue(store, max_attempts=3)
+        queue.register('resume', handler)
+        job_id = queue.enqueue('resume', 1)
+
+        self.wait_for(lambda: queue.stats['done'] == 1)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(sent, ['progress', 'document'])
+        self.assertEqual(queue.status(job_id)['steps'], {'projects': ['описание'], 'document': None})
+
+    def test_unknown_kind_is_rejected(self):
+        queue = self.make_queue()
+        with self.assertRaises(ValueError):
+            queue.enqueue('missing', 1)
+
+    def test_unfinished_jobs_survive_restart(self):
+        store = FakeRedis()
+        started = []
+
+        async def slow(chat_id):
+            started.append(chat_id)
+            await asyncio.sleep(10)
+
+        first = self.make_queue(store)
+        first.register('work', slow)
+        job_id = first.enqueue('work', 3)
+        self.wait_for(lambda: started)
+        first.runtime.shutdown()
+        self.assertEqual(first.status(job_id)['status'], RUNNING)
+
+        done = []
+
+        async def fast(chat_id):
+            done.append(chat_id)
+
+        second = self.make_queue(store)
+        second.register('work', fast)
+        second.start()
+
+        self.wait_for(lambda: done)
+        self.assertEqual(done, [3])
+        self.assertEqual(second.stats['recovered'], 1)
+        self.assertEqual(second.status(job_id)['status'], DONE)
+
+    def test_live_replica_jobs_are_not_taken_over(self):
+        store = FakeRedis()
+        started = []
+        done = []
+
+        async def slow(chat_id):
+            started.append(chat_id)
+            await asyncio.sleep(10)
+
+        async def fast(chat_id):
+            done.append(chat_id)
+
+        first = self.make_queue(store, owner='a', lease_ttl=0.3)
+        first.register('work', slow)
+        job_id = first.enqueue('work', 3)
+        self.wait_for(lambda: started)
+
+        second = self.make_queue(store, owner='b', lease_ttl=0.3)
+        second.register('work', fast)
+        second.start()
+        time.sleep(0.5)
+        self.assertEqual(done, [])
+        self.assertEqual(second.stats['recovered'], 0)
+        self.assertEqual(second.status(job_id)['owner'], 'a')
+
+        # Реплика a падает и перестает продлевать аренду
+        first._renew_lease = lambda: None
+        self.wait_for(lambda: done, timeout=3.0)
+        self.assertEqual(done, [3])
+        self.assertEqual(second.stats['recovered'], 1)
+        self.assertEqual(second.status(job_id)['owner'], 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from telebot.apihelper import ApiTelegramException
+
+from async_runtime import AsyncRuntime
+from outbox import Outbox, delivered, send_editable
+
+
+class FakeBot:
+    """Бот, который записывает отправленные сообщения."""
+
+    def __init__(self, delay=0.05, rate_limited=0):
+        self.delay = delay
+        self.rate_limited = rate_limited
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text, **kwargs):
+        time.sleep(self.delay)
+        with self.lock:
+            if self.rate_limited:
+                self.rate_limited -= 1
+                raise ApiTelegramException('sendMessage', None, {
+                    'error_code': 429,
+                    'description': 'Too Many Requests',
+                    'parameters': {'retry_after': 0.2}
+                })
+            self.sent.append((time.monotonic(), chat_id, text, kwargs))
+        return MagicMock(message_id=len(self.sent), text=text)
+
+    def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        time.sleep(self.delay)
+        with self.lock:
+            self.sent.append((time.monotonic(), chat_id, f'edit {message_id}: {text}', kwargs))
+        return MagicMock(message_id=message_id, text=text)
+
+    def send_document(self, chat_id, document, **kwargs):
+        time.sleep(self.delay)
+        with self.lock:
+            self.sent.append((time.monotonic(), chat_id, f'document {document}', kwargs))
+        return MagicMock(message_id=len(self.sent))
+
+
+class TestOutbox(unittest.TestCase):
+    def make_outbox(self, telegram_bot, chat_rps=100, chat_burst=100):
+        runtime = AsyncRuntime(10)
+        self.addCleanup(runtime.shutdown)
+        outbox = Outbox(telegram_bot, 1000, chat_rps, chat_burst, 4, async_runtime=runtime)
+        outbox.install()
+        return outbox
+
+    def test_send_does_not_block_and_coalesces_texts(self):
+        telegram_bot = FakeBot()
+        self.make_outbox(telegram_bot)
+
+        started = time.monotonic()
+        futures = [telegram_bot.send_message(1, 'a')]
+        self.assertLess(time.monotonic() - started, 0.05)
+        # Пока 'a' отправляется, следующие тексты копятся и склеиваются
+        time.sleep(0.02)
+        futures += [telegram_bot.send_message(1, text) for text in ('b', 'c')]
+
+        messages = [future.result(2) for future in futures]
+        self.assertEqual([text for _, _, text, _ in telegram_bot.sent], ['a', 'b\n\nc'])
+        self.assertIs(messages[1], messages[2])
+
+    def test_markup_goes_to_merged_message(self):
+        telegram_bot = FakeBot()
+        self.make_outbox(telegram_bot)
+        markup = object()
+
+        telegram_bot.send_message(1, 'first')
+        time.sleep(0.02)
+        telegram_bot.send_message(1, 'second')
+        telegram_bot.send_message(1, 'menu', reply_markup=markup)
+        telegram_bot.send_message(1, '<b>bold</b>', parse_mode='HTML').result(2)
+
+        self.assertEqual(
+            [(text, kwargs) for _, _, text, kwargs in telegram_bot.sent],
+            [('first', {}), ('second\n\nmenu', {'reply_markup': markup}),
+             ('<b>bold</b>', {'parse_mode': 'HTML'})]
+        )
+
+    def test_editable_message_is_not_coalesced(self):
+        telegram_bot = FakeBot()
+        self.make_outbox(telegram_bot)
+
+        telegram_bot.send_message(1, 'first')
+        time.sleep(0.02)
+        telegram_bot.send_message(1, 'status')
+        editable = send_editable(telegram_bot, 1, '1/2')
+        telegram_bot.send_message(1, 'after').result(2)
+
+        self.assertIsNot(editable.result(2), None)
+        self.assertEqual([text for _, _, text, _ in telegram_bot.sent], ['first', 'status', '1/2', 'after'])
+        self.assertEqual(telegram_bot.sent[2][3], {})
+
+    def test_send_editable_without_outbox(self):
+        telegram_bot = FakeBot(delay=0)
+        send_editable(telegram_bot, 1, 'text')
+        self.assertEqual(telegram_bot.sent[0][1:], (1, 'text', {}))
+
+    def test_edits_and_documents_keep_chat_order(self):
+        telegram_bot = FakeBot()
+        self.make_outbox(telegram_bot)
+
+        started = time.monotonic()
+        telegram_bot.send_message(1, 'wait')
+        telegram_bot.edit_message_text('done', chat_id=1, message_id=1)
+        telegram_bot.send_message(1, 'resume')
+        document = telegram_bot.send_document(1, 'resume.docx')
+        self.assertLess(time.monotonic() - started, 0.05)
+        document.result(2)
+
+        self.assertEqual(
+            [text for _, _, text, _ in telegram_bot.sent],
+            ['wait', 'edit 1: done', 'resume', 'document resume.docx']
+        )
+
+    def test_chat_rate_limit_keeps_order_and_spares_other_chats(self):
+        telegram_bot = FakeBot(delay=0)
+        self.make_outbox(telegram_bot, chat_rps=10, chat_burst=1)
+
+        futures = [telegram_bot.send_message(1, str(i), parse_mode='HTML') for i in range(3)]
+        other = telegram_bot.send_message(2, 'other')
+        other.result(2)
+        for future in futures:
+            future.result(2)
+
+        own = [(at, text) for at, chat_id, text, _ in telegram_bot.sent if chat_id == 1]
+        self.assertEqual([text for _, text in own], ['0', '1', '2'])
+        self.assertGreaterEqual(own[-1][0] - own[0][0], 0.15)
+        other_at = [at for at, chat_id, _, _ in telegram_bot.sent if chat_id == 2][0]
+        self.assertLess(other_at, own[-1][0])
+
+    def test_retries_after_429(self):
+        telegram_bot = FakeBot(delay=0, rate_limited=1)
+        outbox = self.make_outbox(telegram_bot)
+
+        started = time.monotonic()
+        message = telegram_bot.send_message(1, 'hello').result(2)
+
+        self.assertEqual(message.text, 'hello')
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(outbox.stats['rate_limited'], 1)
+
+    def test_delivered_accepts_plain_messages(self):
+        message = MagicMock()
+        runtime = AsyncRuntime(10)
+        self.addCleanup(runtime.shutdown)
+        self.assertIs(runtime.run(delivered(message)), message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from io import BytesIO
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import bots_functions
+from async_runtime import AsyncRuntime
+from outbox import Outbox
+from test_outbox import FakeBot
+
+
+class TestBuildProjects(unittest.TestCase):
+    def setUp(self):
+        self.running = 0
+        self.max_running = 0
+        self.patchers = [
+            patch.object(bots_functions, 'compile', self.fake_compile),
+            patch.object(bots_functions, 'resume_proj', self.fake_resume_proj),
+            patch.object(bots_functions, 'end_user_concurrency', 2),
+            patch.object(bots_functions, '_project_slots', None),
+            patch('bots_functions.bot.send_message'),
+            patch('bots_functions.bot.edit_message_text')
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        self.mock_send_message = self.patchers[4].start()
+        self.mock_edit_message = self.patchers[5].start()
+        self.mock_send_message.return_value = MagicMock(message_id=42)
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    async def fake_compile(self, project, chat_id):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        # Первые проекты отвечают дольше, чтобы порядок завершения отличался
+        await asyncio.sleep(0.05 * (5 - int(project[-1])))
+        self.running -= 1
+        return f"compiled {project}"
+
+    async def fake_resume_proj(self, text, chat_id):
+        return text.upper()
+
+    def test_keeps_project_order_and_limits_concurrency(self):
+        user_projects = [f"project {i}" for i in range(5)]
+
+        result = asyncio.run(bots_functions.build_projects(user_projects, 1))
+
+        self.assertEqual(result, [f"COMPILED PROJECT {i}" for i in range(5)])
+        self.assertEqual(self.max_running, 2)
+
+    def test_reports_progress_in_one_message(self):
+        asyncio.run(bots_functions.build_projects(["project 1", "project 2", "project 3"], 1))
+
+        self.mock_send_message.assert_called_once_with(1, "1/3 проектов готово")
+        self.assertEqual(self.mock_edit_message.call_count, 2)
+        self.assertEqual(self.mock_edit_message.call_args[0][0], "3/3 проектов готово")
+
+    def test_progress_is_sent_off_the_loop_thread(self):
+        threads = []
+        self.mock_edit_message.side_effect = lambda *args, **kwargs: threads.append(threading.current_thread())
+
+        async def run():
+            await bots_functions.build_projects(["project 1", "project 2"], 1)
+            return threading.current_thread()
+
+        loop_thread = asyncio.run(run())
+
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], loop_thread)
+
+
+class TestBuildProjectsWithOutbox(unittest.TestCase):
+    def test_progress_is_not_merged_into_status_message(self):
+        telegram_bot = FakeBot()
+        runtime = AsyncRuntime(10)
+        self.addCleanup(runtime.shutdown)
+        Outbox(telegram_bot, 1000, 100, 100, 4, async_runtime=runtime).install()
+
+        async def fake_compile(project, chat_id):
+            return project
+
+        async def fake_resume_proj(text, chat_id):
+            return text
+
+        with patch.object(bots_functions, 'bot', telegram_bot), \
+                patch.object(bots_functions, 'compile', fake_compile), \
+                patch.object(bots_functions, 'resume_proj', fake_resume_proj), \
+                patch.object(bots_functions, '_project_slots', None):
+            # Пока уходит первое сообщение, статус ждет в очереди, как после end()
+            telegram_bot.send_message(1, 'Спасибо!')
+            time.sleep(0.02)
+            telegram_bot.send_message(1, 'Создаю резюме...')
+            runtime.run(bots_functions.build_projects(["project 1", "project 2"], 1))
+            telegram_bot.send_message(1, 'done').result(2)
+
+        texts = [text for _, _, text, _ in telegram_bot.sent]
+        self.assertEqual(
+            texts,
+            ['Спасибо!', 'Создаю резюме...', '1/2 проектов готово', 'edit 3: 2/2 проектов готово', 'done']
+        )
+
+
+class TestBuildResume(unittest.TestCase):
+    def test_free_text_skills_and_voice_answers_are_kept(self):
+        skills = "Python, умею работать в команде и быстро обучаюсь новому"
+        render = AsyncMock(return_value=BytesIO(b'docx'))
+        with patch.object(bots_functions, 'build_projects', AsyncMock(return_value=['Проект'])), \
+                patch.object(bots_functions.renderer, 'render', render), \
+                patch('bots_functions.bot'):
+            asyncio.run(bots_functions.build_resume(1, "Иван", ["диалог"], skills, None))
+
+        model = render.call_args[0][0]
+        self.assertEqual(model.skills, ("Python", "умею работать в команде и быстро обучаюсь новому"))
+        self.assertEqual(model.achievements, '')
+        self.assertEqual(model.projects, ("Проект",))
+
+
+class TestGenerateQuestions(unittest.TestCase):
+    def test_session_is_saved_off_the_loop_thread(self):
+        threads = []
+        session = MagicMock()
+
+        @contextmanager
+        def update(user_id):
+            threads.append(threading.current_thread())
+            yield session
+
+        async def run():
+            await bots_functions.generate_questions(1, "Резюме", "Вакансия")
+            return threading.current_thread()
+
+        with patch.object(bots_functions, 'send_prompt_to_gpt', AsyncMock(return_value="1. Вопрос")), \
+                patch.object(bots_functions.sessions, 'update', update), \
+                patch('bots_functions.bot') as mock_bot:
+            loop_thread = asyncio.run(run())
+
+        self.assertEqual(session.questions, "1. Вопрос")
+        self.assertIsNot(threads[0], loop_thread)
+        mock_bot.send_message.assert_any_call(1, "Вот мои вопросы:\n\n1. Вопрос")
+
+
+if __name__ == '__main__':
+    unittest.main()
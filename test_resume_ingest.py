@@ -0,0 +1,127 @@
+import unittest
+from io import BytesIO
+from unittest.mock import MagicMock
+
+import fitz
+from docx import Document
+
+from llm_cache import TieredCache
+from resume_ingest import (
+    OLE_MAGIC,
+    ExtractionPool,
+    ExtractionTimeout,
+    UnsupportedDocument,
+    detect_format,
+    extract_text,
+    ingest_document
+)
+
+
+def make_pdf(*pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_docx(*paragraphs):
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    stream = BytesIO()
+    doc.save(stream)
+    return stream.getvalue()
+
+
+class TestResumeIngest(unittest.TestCase):
+    def setUp(self):
+        self.cache = TieredCache('resume', None, 100, 1024 * 1024)
+
+    def test_detects_format_by_content(self):
+        self.assertEqual(detect_format(make_pdf('Resume')), 'pdf')
+        self.assertEqual(detect_format(make_docx('Resume')), 'docx')
+        self.assertEqual(detect_format(OLE_MAGIC + b'\0' * 100), 'doc')
+        self.assertEqual(detect_format('Резюме'.encode('utf-8')), 'text')
+        self.assertIsNone(detect_format(b'\xff\xfe\x00\x81binary'))
+
+    def test_pdf_pages_in_order(self):
+        text = extract_text(make_pdf('First page', 'Second page'))
+        self.assertLess(text.index('First page'), text.index('Second page'))
+
+    def test_docx(self):
+        self.assertEqual(extract_text(make_docx('Иван Иванов', 'Python')), 'Иван Иванов\nPython')
+
+    def test_unsupported_formats(self):
+        with self.assertRaises(UnsupportedDocument):
+            extract_text(OLE_MAGIC + b'\0' * 100)
+        with self.assertRaises(UnsupportedDocument):
+            extract_text(b'   ')
+
+    def test_ingest_document_downloads_into_memory(self):
+        bot = MagicMock()
+        bot.download_file.return_value = make_docx('Опыт работы')
+        document = MagicMock(file_id='file-1', file_unique_id='unique-1', file_size=1000)
+
+        self.assertEqual(ingest_document(document, bot, self.cache), 'Опыт работы')
+        bot.get_file.assert_called_once_with('file-1')
+
+    def test_repeat_upload_is_served_from_cache(self):
+        bot = MagicMock()
+        bot.download_file.return_value = make_docx('Опыт работы')
+        first = MagicMock(file_id='file-1', file_unique_id='unique-1', file_size=1000)
+        # Тот же файл, присланный заново, получает новый file_id
+        again = MagicMock(file_id='file-2', file_unique_id='unique-1', file_size=1000)
+
+        ingest_document(first, bot, self.cache)
+        self.assertEqual(ingest_document(again, bot, self.cache), 'Опыт работы')
+        bot.download_file.assert_called_once()
+        self.assertEqual(self.cache.stats['hits_l1'], 1)
+
+    def test_large_file_is_not_downloaded(self):
+        bot = MagicMock()
+        document = MagicMock(file_id='file-1', file_unique_id='unique-1', file_size=100 * 1024 * 1024)
+
+        with self.assertRaises(UnsupportedDocument):
+            ingest_document(document, bot, self.cache)
+        bot.download_file.assert_not_called()
+
+
+class TestExtractionPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ExtractionPool(workers=2, timeout=20, max_pages=8, parallel_pages=2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_large_pdf_is_split_between_workers(self):
+        pages = [f'Page {number}' for number in range(5)]
+        text = extract_text(make_pdf(*pages), self.pool)
+
+        positions = [text.index(page) for page in pages]
+        self.assertEqual(positions, sorted(positions))
+        self.assertEqual(self.pool.stats['parallel'], 1)
+        self.assertEqual(self.pool.stats['documents'], 1)
+        # Процесс, посчитавший страницы, получает свой диапазон без байтов
+        self.assertLessEqual(self.pool.stats['uploads'], self.pool.workers)
+
+    def test_page_cap(self):
+        with self.assertRaises(UnsupportedDocument):
+            extract_text(make_pdf(*['Page'] * 9), self.pool)
+        self.assertEqual(self.pool.stats['failed'], 1)
+
+    def test_timeout_kills_worker_and_pool_recovers(self):
+        self.pool.timeout = 0
+        with self.assertRaises(ExtractionTimeout):
+            extract_text(make_pdf('Slow'), self.pool)
+        self.assertEqual(self.pool.stats['timeouts'], 1)
+        self.assertEqual(self.pool.stats['killed'], 1)
+
+        self.pool.timeout = 20
+        self.assertIn('Fast', extract_text(make_pdf('Fast'), self.pool))
+        self.assertIsNotNone(self.pool.snapshot()['latency_p50'])
+
+
+if __name__ == '__main__':
+    unittest.main()
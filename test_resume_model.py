@@ -0,0 +1,101 @@
+import pickle
+import unittest
+
+from resume_model import ResumeModel, analyze_resume, normalize, split_sections
+
+RESUME = """Иван   Петров
++7 (916) 123-45-67  ivan.petrov@mail.ru
+github.com/ivanp
+
+Опыт работы — 5 лет 2 месяца
+Июль 2021 — настоящее время
+2 года 3 месяца
+ООО Ромашка
+Python-разра-
+ботчик, сервисы на aiohttp
+01.2018 - 06.2021 Backend developer, Acme
+Поддержка API
+
+Ключевые навыки
+Python, aiohttp • PostgreSQL; Docker
+python
+
+Образование
+МГУ, 2017
+
+О себе:
+Люблю   асинхронность.
+"""
+
+
+class TestResumeModel(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize("a  b  \r\n\n\n\nраз-\nработка "), "a b\n\nразработка")
+
+    def test_sections(self):
+        sections = split_sections(normalize(RESUME))
+        self.assertEqual(sections['education'], ["МГУ, 2017"])
+        self.assertEqual(sections['header'][0], "Иван Петров")
+
+    def test_extracts_fields(self):
+        model = analyze_resume(RESUME)
+        self.assertEqual(model.name, "Иван Петров")
+        self.assertEqual(model.skills, ("Python", "aiohttp", "PostgreSQL", "Docker"))
+        self.assertEqual(
+            [(role.title, role.period) for role in model.roles],
+            [("ООО Ромашка", "Июль 2021 — настоящее время"), ("Backend developer, Acme", "01.2018 - 06.2021")]
+        )
+        self.assertEqual(model.roles[0].details, "Python-разработчик, сервисы на aiohttp")
+        self.assertIn(('email', 'ivan.petrov@mail.ru'), model.contacts)
+        self.assertIn(('phone', '+7 (916) 123-45-67'), model.contacts)
+        self.assertEqual(model.summary, "Люблю асинхронность.")
+        self.assertEqual(model.text, "")
+
+    def test_render_only_wanted_fields(self):
+        text = analyze_resume(RESUME).render('roles', 'skills')
+        self.assertIn("Навыки: Python, aiohttp, PostgreSQL, Docker", text)
+        self.assertIn("- ООО Ромашка (Июль 2021 — настоящее время)", text)
+        self.assertNotIn("ivan.petrov", text)
+        self.assertNotIn("МГУ", text)
+
+    def test_sections_without_dates_are_kept(self):
+        model = analyze_resume(
+            "Опыт работы\nООО Ромашка, 3 года\nПисал бэкенд\n\n"
+            "Проекты\nБот для резюме\n\nНавыки\nPython, SQL"
+        )
+        text = model.render('roles', 'experience', 'projects', 'skills')
+        self.assertEqual(model.roles, ())
+        self.assertIn("ООО Ромашка, 3 года", text)
+        self.assertIn("Писал бэкенд", text)
+        self.assertIn("Проекты: Бот для резюме", text)
+        self.assertIn("Навыки: Python, SQL", text)
+
+    def test_header_rest_and_unknown_sections_are_kept(self):
+        model = analyze_resume(
+            "Иван Петров\nPython-разработчик, Москва\nivan@mail.ru\n\n"
+            "Навыки\nPython, Django\n"
+            "Готов разбираться в чужом коде и доводить задачи до конца\n\n"
+            "Достижения\nСертификат AWS\n\n"
+            "Хобби\nШахматы, бег"
+        )
+        self.assertEqual(model.skills, ("Python", "Django"))
+        self.assertEqual(model.achievements, "Сертификат AWS")
+        self.assertEqual(model.extra, (
+            "Python-разработчик, Москва",
+            "Хобби: Шахматы, бег",
+            "Готов разбираться в чужом коде и доводить задачи до конца"
+        ))
+        self.assertIn("Дополнительно: Python-разработчик, Москва", model.render('skills', 'extra'))
+
+    def test_unstructured_text_is_kept(self):
+        model = analyze_resume("Пишу  на Python\n\n\n\nпять лет")
+        self.assertEqual(model.render('roles', 'skills'), "Пишу на Python\n\nпять лет")
+
+    def test_pickles_for_session(self):
+        model = analyze_resume(RESUME)
+        self.assertEqual(pickle.loads(pickle.dumps(model)), model)
+        self.assertEqual(ResumeModel().render('skills'), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
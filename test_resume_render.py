@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+from io import BytesIO
+
+from docx import Document
+from docx.shared import Pt
+
+from resume_model import ResumeModel, Role
+from resume_render import ResumeRenderer, render_resume
+
+MODEL = ResumeModel(
+    name="Иван Петров",
+    contacts=(('email', 'ivan@mail.ru'),),
+    skills=("Python", "Docker"),
+    roles=(Role("ООО Ромашка", "2021 — настоящее время", "Сервисы на aiohttp"),),
+    projects=("Бот для резюме\n\nСобрал очередь задач",),
+    achievements="Ускорил сборку в два раза"
+)
+
+
+def paragraphs(data):
+    return Document(BytesIO(data)).paragraphs
+
+
+class TestRenderResume(unittest.TestCase):
+    def test_title_does_not_restyle_body(self):
+        doc = Document(BytesIO(render_resume(MODEL, 'classic')))
+        title = doc.paragraphs[0]
+        self.assertEqual(title.text, "Иван Петров")
+        self.assertEqual(title.style.name, 'Resume Title')
+        self.assertTrue(title.style.font.bold)
+        self.assertEqual(doc.styles['Normal'].font.size, Pt(12))
+        self.assertIsNone(doc.styles['Normal'].font.bold)
+
+    def test_layouts_order_sections(self):
+        def headings(layout):
+            return [p.text for p in paragraphs(render_resume(MODEL, layout)) if p.style.name == 'Heading 1']
+
+        self.assertEqual(headings('classic'), ["ОПЫТ РАБОТЫ", "ПРОЕКТЫ", "НАВЫКИ", "ДОСТИЖЕНИЯ"])
+        self.assertEqual(headings('compact'), ["Навыки", "Опыт работы", "Проекты", "Достижения"])
+
+    def test_project_paragraphs_are_bullets(self):
+        bullets = [p.text for p in paragraphs(render_resume(MODEL, 'classic')) if p.style.name == 'List Bullet']
+        self.assertIn("Бот для резюме", bullets)
+        self.assertIn("Собрал очередь задач", bullets)
+
+    def test_unknown_layout(self):
+        with self.assertRaises(ValueError):
+            render_resume(MODEL, 'fancy')
+
+
+class TestResumeRenderer(unittest.TestCase):
+    def setUp(self):
+        self.renderer = ResumeRenderer(workers=1)
+
+    def tearDown(self):
+        self.renderer.close()
+
+    def test_renders_in_pool(self):
+        stream = asyncio.run(self.renderer.render(MODEL, 'compact'))
+        self.assertEqual(Document(stream).paragraphs[0].text, "Иван Петров")
+        self.assertEqual(self.renderer.stats['rendered'], 1)
+        self.assertIsNotNone(self.renderer.snapshot()['latency_p50'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+import unittest
+
+import redis
+
+from sessions import Session, SessionStore, RedisSessionStore
+
+
+class FakeRedis:
+    """Минимальная замена redis.Redis для хэшей сессий."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.revisions = {}
+        self.ttl = {}
+
+    def _touch(self, key):
+        self.revisions[key] = self.revisions.get(key, 0) + 1
+
+    def hgetall(self, key):
+        return {field.encode('utf-8'): value for field, value in self.hashes.get(key, {}).items()}
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hmget(self, key, fields):
+        return [self.hget(key, field) for field in fields]
+
+    def hset(self, key, mapping):
+        values = {
+            field: value if isinstance(value, bytes) else str(value).encode('utf-8')
+            for field, value in mapping.items()
+        }
+        self.hashes.setdefault(key, {}).update(values)
+        self._touch(key)
+
+    def expire(self, key, seconds):
+        self.ttl[key] = seconds
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+        self._touch(key)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, conn):
+        self.conn = conn
+        self.watched = {}
+        self.calls = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, key):
+        self.watched[key] = self.conn.revisions.get(key, 0)
+
+    def unwatch(self):
+        self.watched = {}
+
+    def multi(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.conn, name)
+        if self.calls is None:
+            return method
+        return lambda *args, **kwargs: self.calls.append((method, args, kwargs))
+
+    def execute(self):
+        for key, revision in self.watched.items():
+            if self.conn.revisions.get(key, 0) != revision:
+                raise redis.WatchError()
+        return [method(*args, **kwargs) for method, args, kwargs in self.calls]
+
+
+class BrokenRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise redis.ConnectionError("down")
+        return fail
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSession(unittest.TestCase):
+    def test_reset_clears_previous_mode(self):
+        session = Session(1).reset("resume")
+        session.name = "Иван"
+        session.projects.append("проект")
+        session.question_counter = 4
+
+        session.reset("cover_letter")
+        self.assertEqual(session.mode, "cover_letter")
+        self.assertEqual(session.name, "")
+        self.assertEqual(session.projects, [])
+        self.assertEqual(session.question_counter, 1)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            Session(1).reset("unknown")
+
+    def test_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            Session(1).typo = "value"
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = SessionStore(max_sessions=2, idle_ttl=10, clock=self.clock)
+
+    def test_get_returns_same_session(self):
+        self.assertIs(self.store.get(1), self.store.get(1))
+        self.assertEqual(self.store.stats['created'], 1)
+
+    def test_idle_sessions_expire(self):
+        self.store.get(1)
+        self.clock.now = 5
+        self.store.get(2)
+        self.clock.now = 12
+        self.assertIsNone(self.store.peek(1))
+        self.assertIsNotNone(self.store.peek(2))
+        self.assertEqual(self.store.stats['evicted_idle'], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        self.store.get(1)
+        self.store.get(2)
+        self.store.get(1)
+        self.store.get(3)
+        self.assertIsNone(self.store.peek(2))
+        self.assertIsNotNone(self.store.peek(1))
+        self.assertEqual(self.store.stats['evicted_lru'], 1)
+
+    def test_snapshot(self):
+        self.store.get(1).reset("resume").dialogue.answer("x" * 1000)
+        self.store.get(2)
+        snapshot = self.store.snapshot()
+        self.assertEqual(snapshot['sessions'], 2)
+        self.assertEqual(snapshot['modes'], {"resume": 1, None: 1})
+        self.assertGreater(snapshot['bytes'], 1000)
+
+
+class TestRedisSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.first = RedisSessionStore(self.redis, 100, 3600)
+        self.second = RedisSessionStore(self.redis, 100, 3600)
+
+    def test_session_survives_restart(self):
+        with self.first.update(1) as session:
+            session.reset("resume")
+            session.name = "Иван"
+            session.state = ('resume_summary', ())
+
+        with self.second.update(1) as session:
+            self.assertEqual(session.mode, "resume")
+            self.assertEqual(session.name, "Иван")
+            self.assertEqual(session.state, ('resume_summary', ()))
+        self.assertEqual(self.redis.ttl['session:1'], 3600)
+
+    def test_only_changed_fields_are_written(self):
+        with self.first.update(1) as session:
+            session.name = "Иван"
+        self.assertEqual(set(self.redis.hashes['session:1']), {'name', 'version'})
+
+        with self.first.update(1):
+            pass
+        self.assertEqual(self.redis.hashes['session:1']['version'], b'1')
+
+    def test_disjoint_writes_are_merged(self):
+        self.first.load(1)
+        self.second.load(1)
+        self.first.get(1).name = "Иван"
+        self.second.get(1).summary = "О себе"
+
+        self.assertTrue(self.first.save(self.first.get(1)))
+        self.assertTrue(self.second.save(self.second.get(1)))
+
+        session = self.first.load(1)
+        self.assertEqual((session.name, session.summary), ("Иван", "О себе"))
+        self.assertEqual(self.second.stats['merged'], 1)
+
+    def test_conflicting_write_loses(self):
+        self.first.load(1)
+        self.second.load(1)
+        self.first.get(1).name = "Иван"
+        self.second.get(1).name = "Петр"
+
+        self.assertTrue(self.first.save(self.first.get(1)))
+        self.assertFalse(self.second.save(self.second.get(1)))
+
+        self.assertEqual(self.second.stats['conflicts'], 1)
+        self.assertEqual(self.second.load(1).name, "Иван")
+
+    def test_drop_deletes_key(self):
+        with self.first.update(1) as session:
+            session.name = "Иван"
+        self.first.drop(1)
+        self.assertNotIn('session:1', self.redis.hashes)
+
+    def test_works_in_memory_without_redis(self):
+        store = RedisSessionStore(BrokenRedis(), 100, 3600)
+        with store.update(1) as session:
+            session.name = "Иван"
+        with store.update(1) as session:
+            self.assertEqual(session.name, "Иван")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import pickle
+import unittest
+
+from transcript import Transcript
+
+
+class TestTranscript(unittest.TestCase):
+    def test_renders_dialogue_format(self):
+        transcript = Transcript()
+        transcript.ask("Расскажи о проекте", 1)
+        transcript.answer("Делал бота")
+        transcript.ask("Какие инструменты?", 2)
+
+        self.assertEqual(
+            transcript.render(),
+            "Вопрос №1: Расскажи о проекте\nОтвет: Делал бота\n\nВопрос №2: Какие инструменты?"
+        )
+
+    def test_answers_without_questions(self):
+        transcript = Transcript()
+        transcript.answer("первый", 1)
+        transcript.answer("второй")
+
+        self.assertEqual(transcript.render(), "\nВопрос 1: первый\nВопрос 2: второй")
+
+    def test_voice_answer_without_text(self):
+        transcript = Transcript()
+        transcript.ask("Расскажи о проекте", 1)
+        transcript.answer(None)
+
+        self.assertEqual(transcript.render(), "Вопрос №1: Расскажи о проекте\nОтвет: \n\n")
+
+    def test_render_is_cached_until_change(self):
+        transcript = Transcript()
+        transcript.ask("Вопрос")
+        first = transcript.render()
+        self.assertIs(transcript.render(), first)
+
+        transcript.answer("Ответ")
+        self.assertIsNot(transcript.render(), first)
+
+    def test_oldest_turns_are_dropped_over_limit(self):
+        transcript = Transcript(limit=100)
+        for number in range(1, 11):
+            transcript.ask(f"вопрос {number}", number)
+            transcript.answer("ответ")
+
+        self.assertLessEqual(len(transcript.render()), 100)
+        self.assertTrue(transcript.render().endswith("Вопрос №10: вопрос 10\nОтвет: ответ\n\n"))
+
+    def test_long_answer_is_truncated(self):
+        transcript = Transcript(limit=50)
+        transcript.answer("x" * 1000)
+        self.assertEqual(len(transcript), 1)
+        self.assertLess(len(transcript.render()), 100)
+
+    def test_pickle_keeps_turns_only(self):
+        transcript = Transcript()
+        transcript.ask("Вопрос", 3)
+        transcript.answer("Ответ")
+
+        restored = pickle.loads(pickle.dumps(transcript))
+        self.assertEqual(restored, transcript)
+        self.assertEqual(restored.render(), transcript.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import threading
+import unittest
+
+import aiohttp
+import telebot
+
+from async_runtime import AsyncRuntime
+from webhook import SECRET_HEADER, WebhookServer, fake_update, send_fake_updates
+
+
+class TestWebhook(unittest.TestCase):
+    def setUp(self):
+        self.received = []
+        self.handled = threading.Event()
+        self.bot = telebot.TeleBot('123:test', threaded=False)
+
+        @self.bot.message_handler(func=lambda message: True)
+        def echo(message):
+            self.received.append((message.chat.id, message.text))
+            if len(self.received) == 2:
+                self.handled.set()
+
+        self.server = WebhookServer(self.bot, 's3cret', '/hook')
+        self.runtime = AsyncRuntime(10)
+        self.addCleanup(self.runtime.shutdown)
+        self.runtime.run(self.server.start('127.0.0.1', 0))
+        self.runtime.on_shutdown(self.server.stop)
+        port = self.server._runner.addresses[0][1]
+        self.url = f'http://127.0.0.1:{port}/hook'
+
+    def post(self, body, secret):
+        async def send():
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.url, data=body, headers={SECRET_HEADER: secret}) as response:
+                    return response.status
+        return asyncio.run(send())
+
+    def test_updates_reach_handlers_in_order(self):
+        asyncio.run(send_fake_updates(self.url, 's3cret', 5, ['/start', 'второе']))
+
+        self.assertTrue(self.handled.wait(2))
+        self.assertEqual(self.received, [(5, '/start'), (5, 'второе')])
+        self.assertEqual(self.server.stats['accepted'], 2)
+
+    def test_wrong_secret_is_rejected(self):
+        body = json.dumps(fake_update(5, 'hi'))
+        self.assertEqual(self.post(body, 'wrong'), 403)
+        self.assertEqual(self.received, [])
+
+    def test_invalid_body_is_rejected(self):
+        self.assertEqual(self.post('not json', 's3cret'), 400)
+
+    def test_secret_is_required(self):
+        with self.assertRaises(ValueError):
+            WebhookServer(self.bot, '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import sys
+
+from config import transcript_limit
+
+
+def render_turn(number, question, answer):
+    """Форматирует один ход диалога так, как он попадает в промпт.
+
+    Args:
+        number (int): Номер вопроса
+        question (str): Вопрос или None, если записан только ответ
+        answer (str): Ответ или None, если ответа еще нет
+
+    Returns:
+        str: Текст хода
+    """
+    if question is None:
+        return f"\nВопрос {number}: {answer}"
+    text = f"Вопрос №{number}: {question}"
+    if answer is not None:
+        text += f"\nОтвет: {answer}\n\n"
+    return text
+
+
+class Transcript:
+    """Диалог вопросов и ответов, который растет на ход за раз.
+
+    Ходы хранятся списком (номер, вопрос, ответ) рядом с их готовым
+    текстом, поэтому новый ход форматируется один раз, а весь текст
+    собирается одним join и кэшируется до следующего изменения. Когда
+    текст превышает limit символов, самые старые ходы отбрасываются.
+
+    Args:
+        limit (int): Максимальная длина текста диалога в символах
+    """
+
+    __slots__ = ('limit', 'turns', '_parts', '_length', '_text')
+
+    def __init__(self, limit=transcript_limit):
+        self.limit = limit
+        self.turns = []
+        self._parts = []
+        self._length = 0
+        self._text = ''
+
+    def ask(self, question, number=None):
+        """Добавляет вопрос, на который ждем ответ.
+
+        Args:
+            question (str): Текст вопроса
+            number (int): Номер вопроса; по умолчанию следующий по порядку
+        """
+        if number is None:
+            number = self._next_number()
+        self._append(number, question[:self.limit], None)
+
+    def answer(self, text, number=None):
+        """Записывает ответ на последний вопрос.
+
+        Если открытого вопроса нет, ответ добавляется отдельным ходом.
+
+        Args:
+            text (str): Текст ответа; None у голосовых сообщений
+            number (int): Номер отдельного хода; по умолчанию следующий
+        """
+        text = (text or '')[:self.limit]
+        if self.turns and self.turns[-1][1] is not None and self.turns[-1][2] is None:
+            number, question, _ = self.turns.pop()
+            self._length -= len(self._parts.pop())
+            self._append(number, question, text)
+        else:
+            self._append(number if number is not None else self._next_number(), None, text)
+
+    def clear(self):
+        """Удаляет все ходы."""
+        self.turns = []
+        self._parts = []
+        self._length = 0
+        self._text = ''
+
+    def render(self):
+        """Возвращает текст диалога для промпта.
+
+        Returns:
+            str: Все ходы подряд
+        """
+        if self._text is None:
+            self._text = ''.join(self._parts)
+        return self._text
+
+    def size(self):
+        """Возвращает примерный объем памяти диалога в байтах."""
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.turns)
+            + sum(sys.getsizeof(part) for part in self._parts)
+            + sys.getsizeof(self._text or '')
+        )
+
+    def _next_number(self):
+        return self.turns[-1][0] + 1 if self.turns else 1
+
+    def _append(self, number, question, answer):
+        part = render_turn(number, question, answer)
+        self.turns.append((number, question, answer))
+        self._parts.append(part)
+        self._length += len(part)
+        while self._length > self.limit and len(self.turns) > 1:
+            self.turns.pop(0)
+            self._length -= len(self._parts.pop(0))
+        self._text = None
+
+    def __len__(self):
+        return len(self.turns)
+
+    def __str__(self):
+        return self.render()
+
+    def __eq__(self, other):
+        return isinstance(other, Transcript) and self.turns == other.turns
+
+    def __getstate__(self):
+        # В сессию сохраняются только ходы, текст собирается заново
+        return self.limit, self.turns
+
+    def __setstate__(self, state):
+        limit, turns = state
+        self.limit = limit
+        self.clear()
+        for number, question, answer in turns:
+            self._append(number, question, answer)
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import hmac
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+from telebot import types
+
+from async_runtime import runtime
+from config import (
+    bot,
+    log,
+    webhook_url,
+    webhook_path,
+    webhook_secret,
+    webhook_host,
+    webhook_port
+)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """Прием обновлений Telegram через webhook вместо bot.polling.
+
+    Обновление проверяется по секретному токену, передается в конвейер
+    обработчиков бота в отдельном потоке, а Telegram сразу получает 200.
+    Состояние сервера не хранится, поэтому несколько реплик можно
+    поставить за балансировщик.
+
+    Args:
+        telegram_bot (telebot.TeleBot): Бот, обрабатывающий обновления
+        secret (str): Секретный токен, переданный в setWebhook
+        path (str): Путь, на который Telegram присылает обновления
+    """
+
+    def __init__(self, telegram_bot, secret, path=webhook_path):
+        if not secret:
+            raise ValueError("Для webhook нужен WEBHOOK_SECRET")
+        self.bot = telegram_bot
+        self.secret = secret
+        self.path = path
+        # Один поток сохраняет порядок передачи обновлений в бота
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='webhook')
+        self._runner = None
+        self.stats = {'accepted': 0, 'rejected': 0, 'invalid': 0}
+
+    def make_app(self):
+        """Создает aiohttp-приложение с маршрутом webhook и проверкой здоровья."""
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        app.router.add_get('/healthz', self.health)
+        return app
+
+    async def handle(self, request):
+        token = request.headers.get(SECRET_HEADER, '')
+        if not hmac.compare_digest(token, self.secret):
+            self.stats['rejected'] += 1
+            return web.Response(status=403)
+
+        try:
+            update = types.Update.de_json(await request.text())
+        except Exception as e:
+            self.stats['invalid'] += 1
+            log.warning(f"Webhook: некорректное обновление: {e}")
+            return web.Response(status=400)
+
+        self.stats['accepted'] += 1
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, self.bot.process_new_updates, [update]
+        )
+        future.add_done_callback(self._log_error)
+        return web.Response(text='ok')
+
+    def _log_error(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            log.error("Ошибка при обработке обновления", exc_info=future.exception())
+
+    async def health(self, request):
+        return web.json_response(self.stats)
+
+    async def start(self, host, port):
+        """Поднимает HTTP-сервер в текущем цикле."""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        log.info(f"Webhook server listening on http://{host}:{port}{self.path}")
+
+    async def stop(self):
+        """Останавливает сервер и дожидается переданных в бота обновлений."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        self._executor.shutdown(wait=True)
+
+
+def run_webhook():
+    """Регистрирует webhook в Telegram и обслуживает его до остановки процесса."""
+    server = WebhookServer(bot, webhook_secret)
+    if webhook_url:
+        bot.remove_webhook()
+        bot.set_webhook(url=webhook_url.rstrip('/') + webhook_path, secret_token=webhook_secret)
+    runtime.run(server.start(webhook_host, webhook_port))
+    runtime.on_shutdown(server.stop)
+    while True:
+        time.sleep(3600)
+
+
+def fake_update(chat_id, text, update_id=None):
+    """Строит минимальное обновление Telegram с текстовым сообщением.
+
+    Args:
+        chat_id (int): ID чата и пользователя
+        text (str): Текст сообщения
+        update_id (int): ID обновления
+
+    Returns:
+        dict: Тело запроса, как его присылает Telegram
+    """
+    update_id = update_id or int(time.time() * 1000)
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Test'},
+            'text': text
+        }
+    }
+
+
+async def send_fake_updates(url, secret, chat_id, texts):
+    """Отправляет на webhook сообщения так, как это делает Telegram."""
+    async with aiohttp.ClientSession() as session:
+        for text in texts:
+            async with session.post(
+                url,
+                data=json.dumps(fake_update(chat_id, text), ensure_ascii=False),
+                headers={SECRET_HEADER: secret, 'Content-Type': 'application/json'}
+            ) as response:
+                log.info(f"{text!r} -> {response.status}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Фейковый отправитель обновлений Telegram")
+    parser.add_argument('texts', nargs='+', help="Тексты сообщений по порядку")
+    parser.add_argument('--url', default=f"http://127.0.0.1:{webhook_port}{webhook_path}")
+    parser.add_argument('--secret', default=webhook_secret)
+    parser.add_argument('--chat-id', type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(send_fake_updates(args.url, args.secret, args.chat_id, args.texts))